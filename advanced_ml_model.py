@@ -1,11 +1,14 @@
 """Advanced ML model with deep learning for high-accuracy predictions."""
 
+import os
+
 import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import TimeSeriesSplit, train_test_split, cross_val_score
 import joblib
 import config
 
@@ -13,7 +16,17 @@ import config
 class AdvancedTradingModel:
     """Advanced ensemble ML model for high-accuracy trading predictions."""
     
-    def __init__(self):
+    # Engineered features read up to 20 bars back (momentum_20, volatility_20)
+    LOOKBACK_WINDOWS = {'close': 21}
+    
+    # Time-ordered cross-validation folds in train()
+    CV_SPLITS = 5
+    
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: Cores training may use (default config.TRAINING_WORKERS, else every core)
+        """
         # Create ensemble of multiple models
         self.gb_model = GradientBoostingClassifier(
             n_estimators=300,
@@ -50,15 +63,41 @@ class AdvancedTradingModel:
             voting='soft',
             weights=[2, 1, 1]  # GB gets more weight
         )
+        self.set_workers(workers)
         
         self.scaler = StandardScaler()
         self.feature_columns = None
+        self.compiled = None  # compiled_model.CompiledModel used for inference when loaded
         
-    def prepare_features(self, df):
-        """Prepare features with advanced engineering."""
+    def set_workers(self, workers=None):
+        """Set the core budget of training (see __init__)."""
+        self.workers = workers or config.TRAINING_WORKERS or os.cpu_count() or 1
+        self.model.set_params(**self.parallel_params(self.workers))
+    
+    def parallel_params(self, workers):
+        """
+        Ensemble n_jobs settings that split ``workers`` cores.
+        
+        The members are fit side by side; GB and the MLP fit on one core
+        each, so the forest builds its trees on the cores they leave.
+        """
+        members = min(workers, len(self.model.estimators))
+        return {'n_jobs': members, 'rf__n_jobs': max(1, workers - members + 1)}
+    
+    def prepare_features(self, df, columns=None):
+        """
+        Prepare features with advanced engineering.
+        
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+            columns: Trained feature columns to select (default: infer from df and record them)
+        """
         # Drop non-feature columns
         exclude_cols = ['open', 'high', 'low', 'close', 'volume', 'target', 'signal']
-        feature_cols = [col for col in df.columns if col not in exclude_cols]
+        if columns is None:
+            feature_cols = [col for col in df.columns if col not in exclude_cols]
+        else:
+            feature_cols = [col for col in columns if col in df.columns]
         
         # Add advanced features
         df_features = df[feature_cols].copy()
@@ -77,6 +116,9 @@ class AdvancedTradingModel:
         # Trend strength
         df_features['trend_strength'] = abs(df_features.get('macd', 0)) * df_features.get('adx', 0) / 100
         
+        if columns is not None:
+            return df_features[columns].dropna()
+        
         # Remove NaN
         df_clean = df_features.dropna()
         
@@ -115,6 +157,8 @@ class AdvancedTradingModel:
         """Train the advanced ensemble model."""
         print("Training advanced AI model...")
         
+        self.compiled = None
+        
         # Create target
         df['target'] = self.create_target(df)
         
@@ -142,15 +186,14 @@ class AdvancedTradingModel:
         
         # Train ensemble model
         print("Training ensemble (Gradient Boosting + Random Forest + Neural Network)...")
-        self.model.fit(X_train_scaled, y_train)
+        self._fit_model(X_train_scaled, y_train)
         
         # Evaluate
         train_score = self.model.score(X_train_scaled, y_train)
         test_score = self.model.score(X_test_scaled, y_test)
         
         # Cross-validation score
-        cv_scores = cross_val_score(self.model, X_train_scaled, y_train, cv=5)
-        cv_mean = cv_scores.mean()
+        cv_mean = self.cross_validate(X_train_scaled, y_train).mean()
         
         print(f"Training accuracy: {train_score:.4f}")
         print(f"Testing accuracy: {test_score:.4f}")
@@ -158,14 +201,71 @@ class AdvancedTradingModel:
         
         return train_score, test_score
     
+    def fit(self, X, y):
+        """
+        Fit scaler and ensemble on an already prepared feature matrix, without
+        a holdout split or cross-validation.
+        
+        Returns:
+            Training accuracy
+        """
+        self.compiled = None
+        self.feature_columns = list(X.columns)
+        X_scaled = self.scaler.fit_transform(X)
+        self._fit_model(X_scaled, y)
+        return self.model.score(X_scaled, y)
+    
+    def _fit_model(self, X_scaled, y):
+        """Fit the ensemble on the worker budget, then predict single-threaded."""
+        self.model.set_params(**self.parallel_params(self.workers))
+        self.model.fit(X_scaled, y)
+        # Live prediction is a row at a time: per-tree threads cost more than they save
+        self.model.named_estimators_['rf'].n_jobs = None
+    
+    def cross_validate(self, X_scaled, y):
+        """
+        Accuracy of the ensemble over time-ordered folds (each fold trains on
+        the bars before it), the folds fit in parallel.
+        
+        Returns:
+            Array of fold scores
+        """
+        folds = min(self.CV_SPLITS, self.workers)
+        estimator = clone(self.model).set_params(**self.parallel_params(max(1, self.workers // folds)))
+        return cross_val_score(estimator, X_scaled, y, cv=TimeSeriesSplit(n_splits=self.CV_SPLITS), n_jobs=folds)
+    
     def predict(self, df):
         """Predict trade signals - ALWAYS return a signal for aggressive scalping."""
-        X = self.prepare_features(df)
-        X_scaled = self.scaler.transform(X)
+        X = self.prepare_features(df, columns=self.feature_columns)
+        return self.predict_features(X)
+    
+    def tail_window(self, tail):
+        """Trailing bars needed to build features for the last ``tail`` bars exactly."""
+        return tail + max(self.LOOKBACK_WINDOWS.values()) - 1
+    
+    def predict_latest(self, df, n=1):
+        """
+        Predict only the last ``n`` bars (the live path: callers read the latest bar).
+        
+        Features are built from the trailing tail_window(n) bars instead of
+        the whole frame.
         
-        # Get predictions and probabilities
-        predictions = self.model.predict(X_scaled)
-        probabilities = self.model.predict_proba(X_scaled)
+        Returns:
+            (signals, confidence) arrays for the last n bars, like the tail of predict()
+        """
+        X = self.prepare_features(df.iloc[-self.tail_window(n):], columns=self.feature_columns)
+        return self.predict_features(X.iloc[-n:])
+    
+    def predict_features(self, X):
+        """Predict trade signals and confidence from a prepared feature matrix."""
+        model = self.compiled
+        if model is None:
+            model = self.model
+            X = self.scaler.transform(X)
+        
+        # One predict_proba pass over the ensemble; the class is its most probable column
+        probabilities = model.predict_proba(X)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
         
         # Get confidence (max probability)
         confidence = np.max(probabilities, axis=1)
@@ -189,4 +289,25 @@ class AdvancedTradingModel:
         self.model = data['model']
         self.scaler = data['scaler']
         self.feature_columns = data['features']
+        self.compiled = None
         print(f"Advanced model loaded from {filepath}")
+    
+    def save_compiled(self, filepath='advanced_model.compiled'):
+        """Export the fitted model to the compiled inference format (see compiled_model)."""
+        from compiled_model import export_model
+        
+        export_model(self, filepath)
+        print(f"Compiled advanced model saved to {filepath}")
+    
+    def load_compiled(self, filepath='advanced_model.compiled', mmap=True):
+        """
+        Load a compiled model for inference (memory-mapped by default).
+        
+        Predictions then go through the compiled evaluator; training
+        replaces it with a freshly fitted sklearn model.
+        """
+        from compiled_model import load_model
+        
+        self.compiled = load_model(filepath, mmap=mmap)
+        self.feature_columns = self.compiled.feature_columns
+        print(f"Compiled advanced model loaded from {filepath}")
@@ -0,0 +1,257 @@
+"""Process-wide cache of per-bar indicator frames and streaming indicator state."""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from streaming_indicators import StreamingIndicatorEngine
+
+
+def config_hash(config):
+    """Short stable hash of an engine/strategy configuration (any JSON-able value)."""
+    payload = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class AnalysisCache:
+    """
+    LRU cache of indicator state and per-bar indicator frames.
+    
+    The last bar of a fetched frame is treated as still forming. Entries
+    are keyed by (broker, symbol, timeframe, last closed bar timestamp,
+    hash of the window length, indicator columns and config) and only hold
+    closed-bar indicator rows; the forming row is recomputed on every call
+    with the stream's ``preview``, so callers always see the latest close.
+    Scores and ML predictions are read from that forming row, so callers
+    compute them per call rather than caching them here.
+    
+    Indicator state is kept per (broker, symbol, timeframe, columns,
+    config) stream up to the last closed bar, and when a new bar closes the
+    state is extended bar by bar instead of being rebuilt. Both entries and
+    streams are evicted least recently used.
+    
+    Computation runs outside the cache-wide lock: each stream has its own
+    lock, so requests for different symbols never wait on each other.
+    """
+    
+    def __init__(self, max_entries=64):
+        """
+        Args:
+            max_entries: Number of bar entries, and of indicator streams, kept
+                before evicting the least recently used
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.streams = OrderedDict()
+        self.stream_locks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.extensions = 0
+    
+    def key(self, broker, symbol, timeframe, df, config=None, columns=None):
+        """Cache key for the last closed bar of ``df`` (its last row is still forming)."""
+        settings = {'bars': len(df), 'columns': columns, 'config': config}
+        closed = df.index[-2] if len(df) > 1 else None
+        return (broker, symbol, timeframe, closed, config_hash(settings))
+    
+    @staticmethod
+    def stream_key(broker, symbol, timeframe, config=None, columns=None):
+        """Key of the indicator stream of a symbol (one per column set and config, whatever the window length)."""
+        return (broker, symbol, timeframe, config_hash({'columns': columns, 'config': config}))
+    
+    def get(self, key, name):
+        """Return a cached output or None (counts a hit or miss)."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or name not in entry:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[name]
+    
+    def put(self, key, name, value):
+        """Store an output for a bar, evicting the least recently used bars."""
+        with self.lock:
+            entry = self.entries.setdefault(key, {})
+            entry[name] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def _stream_lock(self, stream_key):
+        """Lock serializing work on one stream's indicator state."""
+        with self.lock:
+            return self.stream_locks.setdefault(stream_key, threading.Lock())
+    
+    def _store_stream(self, stream_key, stream):
+        """Insert or refresh a stream, evicting the least recently used streams."""
+        with self.lock:
+            self.streams[stream_key] = stream
+            self.streams.move_to_end(stream_key)
+            while len(self.streams) > self.max_entries:
+                evicted, _ = self.streams.popitem(last=False)
+                self.stream_locks.pop(evicted, None)
+    
+    def indicators(self, broker, symbol, timeframe, df, config=None, columns=None):
+        """
+        Indicator frame for ``df`` (same columns as IndicatorEngine.calculate(columns)).
+        
+        Closed rows come from the cache; the forming row is recomputed from
+        the current last row of ``df`` on every call.
+        
+        Args:
+            broker: Data source name (e.g. 'mt5', 'demo')
+            symbol: Instrument
+            timeframe: Bar timeframe
+            df: OHLCV DataFrame whose last row is the latest (possibly forming) bar
+            config: Extra configuration that should separate cache entries
+            columns: Indicator columns to compute, e.g. required_columns(...) (default: all)
+        
+        Returns:
+            A new frame, safe for callers to add columns to
+        """
+        key = self.key(broker, symbol, timeframe, df, config, columns)
+        stream_key = self.stream_key(broker, symbol, timeframe, config, columns)
+        closed = df.iloc[:-1]
+        with self._stream_lock(stream_key):
+            frame = self.get(key, 'indicators')
+            engine = self._advance(stream_key, closed, columns)
+            if frame is None:
+                frame = pd.DataFrame(list(engine.rows), index=closed.index, columns=engine.columns)
+                self.put(key, 'indicators', frame)
+            forming = engine.preview(df.iloc[-1], df.index[-1])
+        return self._with_forming(frame, forming)
+    
+    def indicators_batch(self, broker, timeframe, frames, config=None, columns=None):
+        """
+        Indicator frames for several symbols at once.
+        
+        Symbols with a cached bar or an extendable stream go through
+        ``indicators``; the rest are computed together in one batched NumPy
+        pass, and their streams are warmed up lazily on their next request.
+        
+        Args:
+            broker: Data source name
+            timeframe: Bar timeframe
+            frames: Dict of symbol -> OHLCV DataFrame
+            config: Extra configuration that should separate cache entries
+            columns: Indicator columns to compute (default: all)
+        
+        Returns:
+            Dict of symbol -> indicator frame, in the order of frames
+        """
+        from indicators import calculate_frames
+        
+        results = {}
+        cold = {}
+        for symbol, df in frames.items():
+            key = self.key(broker, symbol, timeframe, df, config, columns)
+            with self.lock:
+                cached = 'indicators' in self.entries.get(key, {})
+                stream = self.streams.get(self.stream_key(broker, symbol, timeframe, config, columns))
+            if cached or (stream is not None and self._can_extend(stream, df.iloc[:-1])):
+                results[symbol] = self.indicators(broker, symbol, timeframe, df, config, columns)
+            else:
+                cold[symbol] = df
+        
+        for symbol, frame in calculate_frames(cold, columns).items():
+            df = cold[symbol]
+            stream_key = self.stream_key(broker, symbol, timeframe, config, columns)
+            with self._stream_lock(stream_key):
+                with self.lock:
+                    self.misses += 1
+                self._store_stream(stream_key, {
+                    'engine': None,
+                    'pending': df.iloc[:-1],
+                    'last_bar': df.iloc[-2] if len(df) > 1 else None
+                })
+                self.put(self.key(broker, symbol, timeframe, df, config, columns), 'indicators', frame.iloc[:-1].copy())
+            results[symbol] = frame
+        
+        return {symbol: results[symbol] for symbol in frames}
+    
+    def _advance(self, stream_key, closed, columns=None):
+        """
+        Bring a stream's indicator state to the last bar of ``closed``: extend
+        it with the bars that closed since, or warm it up from scratch.
+        
+        Returns:
+            The stream's StreamingIndicatorEngine
+        """
+        with self.lock:
+            stream = self.streams.get(stream_key)
+        
+        if stream is not None and self._can_extend(stream, closed):
+            engine = stream['engine']
+            if engine is None:
+                # Stream seeded by a batch pass: replay its bars once
+                engine = stream['engine'] = StreamingIndicatorEngine(history=len(closed), columns=columns)
+                engine.warm_up(stream.pop('pending'))
+            new_bars = closed.loc[closed.index > stream['last_bar'].name]
+            for timestamp, bar in new_bars.iterrows():
+                engine.update(bar, timestamp)
+            if len(new_bars):
+                with self.lock:
+                    self.extensions += 1
+        else:
+            # New symbol, a changed window length or diverged bars: the old state is dropped
+            engine = StreamingIndicatorEngine(history=len(closed), columns=columns)
+            engine.warm_up(closed)
+            stream = {'engine': engine}
+        
+        if len(closed):
+            stream['last_bar'] = closed.iloc[-1]
+        self._store_stream(stream_key, stream)
+        return engine
+    
+    @staticmethod
+    def _with_forming(closed, forming):
+        """Closed rows plus the forming row, OBV restated from the first bar."""
+        row = pd.DataFrame([forming.reindex(closed.columns).tolist()], index=[forming.name], columns=closed.columns)
+        frame = pd.concat([closed, row]) if len(closed) else row
+        if 'obv' in frame.columns:
+            # Restate OBV as if accumulated from the first bar of df, like a full recompute
+            frame['obv'] = frame['obv'] - frame['obv'].iloc[0] + frame['volume'].iloc[0]
+        return frame
+    
+    @staticmethod
+    def _can_extend(stream, closed):
+        """The stream's last closed bar is still in the frame, unchanged, and history fits."""
+        last_bar = stream.get('last_bar')
+        if last_bar is None or last_bar.name not in closed.index:
+            return False
+        engine = stream['engine']
+        history = engine.history if engine is not None else len(stream['pending'])
+        if history != len(closed):
+            return False
+        current = closed.loc[last_bar.name, ['open', 'high', 'low', 'close']]
+        return bool((current == last_bar[['open', 'high', 'low', 'close']]).all())
+    
+    def clear(self):
+        """Drop every cached entry and indicator stream."""
+        with self.lock:
+            self.entries.clear()
+            self.streams.clear()
+            self.stream_locks.clear()
+    
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'streams': len(self.streams),
+                'hits': self.hits,
+                'misses': self.misses,
+                'extensions': self.extensions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# Global cache instance
+analysis_cache = AnalysisCache()
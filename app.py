@@ -13,6 +13,9 @@ from signal_generator import SignalGenerator
 from ml_model import TradingModel
 from risk_manager import RiskManager
 from backtester import Backtester
+from backtest_runner import make_job, run_backtests, portfolio_report
+from result_cache import cached_indicators, cached_predictions, cached_backtest
+from walk_forward import WalkForward
 import config
 
 load_dotenv()
@@ -218,8 +221,8 @@ def analyze_pair():
         signal_gen = SignalGenerator(df_indicators)
         df_signals = signal_gen.generate_signals()
         
-        # Get ML prediction
-        ml_signals, ml_confidence = ml_model.predict(df_signals)
+        # Get ML prediction (only the bars that decide the latest signal)
+        ml_signals, ml_confidence = ml_model.predict_latest(df_signals, SignalGenerator.ML_TAIL)
         
         # Combine signals
         df_final = signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence)
@@ -334,20 +337,16 @@ def run_backtest():
         # Get historical data
         df = mt5.get_historical_data(symbol, timeframe, bars=bars)
         
-        # Calculate indicators
-        indicator_engine = IndicatorEngine(df)
-        df_indicators = indicator_engine.calculate_all()
+        # Calculate indicators (stages are reused from the result cache for unchanged bars)
+        df_indicators, stage_key = cached_indicators(df)
         
         # Generate signals
         signal_gen = SignalGenerator(df_indicators)
         df_signals = signal_gen.generate_signals()
         
-        # Train ML model
+        # Train ML model and get predictions
         ml_model_temp = TradingModel()
-        ml_model_temp.train(df_signals)
-        
-        # Get predictions
-        ml_signals, ml_confidence = ml_model_temp.predict(df_signals)
+        ml_signals, ml_confidence, stage_key = cached_predictions(ml_model_temp, df_signals, stage_key)
         
         # Combine signals
         df_final = signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence)
@@ -355,7 +354,7 @@ def run_backtest():
         
         # Run backtest
         backtester = Backtester(initial_balance=10000)
-        results = backtester.run(df_final)
+        results = cached_backtest(backtester, df_final, stage_key)
         
         return jsonify(results)
         
@@ -363,6 +362,76 @@ def run_backtest():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/backtest-portfolio', methods=['POST'])
+def run_portfolio_backtest():
+    """Backtest several symbols and timeframes in parallel and report the portfolio."""
+    global mt5
+    
+    data = request.json
+    symbols = data.get('symbols', ['EURUSD'])
+    timeframes = data.get('timeframes', ['H1'])
+    bars = data.get('bars', 2000)
+    strategy = data.get('strategy', {'name': 'scalping'})
+    
+    if not mt5.connected:
+        return jsonify({'error': 'Not connected to MT5'}), 400
+    
+    try:
+        jobs = [
+            make_job(symbol, timeframe, data.get('start'), data.get('end'), strategy, data.get('costs', False))
+            for symbol in symbols
+            for timeframe in timeframes
+        ]
+        report = portfolio_report(run_backtests(jobs, bars=bars, connector=mt5))
+        
+        return jsonify({
+            'summary': report['summary'],
+            'jobs': report['jobs'].to_dict('records')
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/walk-forward', methods=['POST'])
+def run_walk_forward():
+    """Walk-forward backtest: retrain on rolling windows, trade only unseen bars."""
+    global mt5
+    
+    data = request.json
+    symbol = data.get('symbol', 'EURUSD')
+    timeframe = data.get('timeframe', 'H1')
+    bars = data.get('bars', 6000)
+    
+    if not mt5.connected:
+        return jsonify({'error': 'Not connected to MT5'}), 400
+    
+    try:
+        df = mt5.get_historical_data(symbol, timeframe, bars=bars)
+        
+        engine = WalkForward(
+            model=data.get('model', 'basic'),
+            train_bars=data.get('train_bars', 2000),
+            test_bars=data.get('test_bars', 500),
+            anchored=data.get('anchored', False),
+            retrain_every=data.get('retrain_every', 1)
+        )
+        report = engine.run(df)
+        
+        folds = report['folds'].copy()
+        for col in ('train_start', 'train_end', 'test_start', 'test_end'):
+            folds[col] = folds[col].astype(str)
+        folds = folds.astype(object).where(folds.notna(), None)
+        
+        return jsonify({
+            'summary': report['summary'],
+            'folds': folds.to_dict('records')
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/train-model', methods=['POST'])
 def train_model():
     """Train ML model on historical data."""
@@ -390,6 +459,7 @@ def train_model():
         # Train model
         train_score, test_score = ml_model.train(df_signals)
         ml_model.save('forex_model.pkl')
+        ml_model.save_compiled('forex_model.compiled')
         
         return jsonify({
             'success': True,
@@ -455,7 +525,7 @@ def trading_loop():
                 signal_gen = SignalGenerator(df_indicators)
                 df_signals = signal_gen.generate_signals()
                 
-                ml_signals, ml_confidence = ml_model.predict(df_signals)
+                ml_signals, ml_confidence = ml_model.predict_latest(df_signals, SignalGenerator.ML_TAIL)
                 df_final = signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence)
                 df_final = signal_gen.filter_signals(df_final)
                 
@@ -494,6 +564,9 @@ if __name__ == '__main__':
     # Try to load existing model
     try:
         ml_model.load('forex_model.pkl')
+        # Serve predictions from the compiled copy saved alongside it
+        if os.path.exists('forex_model.compiled'):
+            ml_model.load_compiled('forex_model.compiled')
         print("✓ Loaded existing ML model")
     except:
         print("ℹ No existing model found. Train from web interface.")
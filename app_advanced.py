@@ -10,13 +10,15 @@ import numpy as np
 
 from mt5_connector import MT5Connector
 from data_loader import DataLoader
-from indicators import IndicatorEngine
 from scalping_strategy import ScalpingStrategy
-from advanced_ml_model import AdvancedTradingModel
 from pattern_recognition import PatternRecognizer
 from risk_manager import RiskManager
 from trading_logger import trading_logger
+from analysis_cache import analysis_cache
+from indicators import required_columns
+from lookback import plan_bars
 from position_manager import PositionManager
+from training_service import ModelRegistry, TrainingService
 import config
 
 load_dotenv()
@@ -29,7 +31,8 @@ CORS(app)
 mt5 = MT5Connector()
 data_loader = DataLoader()
 scalping_strategy = ScalpingStrategy()
-ml_model = AdvancedTradingModel()
+model_registry = ModelRegistry()
+training_service = TrainingService(model_registry)
 pattern_recognizer = PatternRecognizer()
 risk_manager = None
 position_manager = None
@@ -38,6 +41,19 @@ auto_trading_thread = None
 account_info = {}
 
 
+def live_bars():
+    """Bars to fetch for live analysis (shared by every endpoint so cache entries line up)."""
+    return plan_bars(scalping_strategy, model_registry.current, pattern_recognizer)
+
+
+def on_model_published(version, model, previous):
+    """Log a newly published model going live."""
+    trading_logger.success(f"✓ Model v{version} is live")
+
+
+model_registry.on_publish(on_model_published)
+
+
 @app.route('/')
 def index():
     """Main dashboard page."""
@@ -84,7 +100,7 @@ def connect_mt5():
             
             # Initialize position manager
             global position_manager
-            position_manager = PositionManager(mt5, scalping_strategy, ml_model, data_loader)
+            position_manager = PositionManager(mt5, scalping_strategy, model_registry, data_loader)
             position_manager.start_monitoring()
             
             trading_logger.success(f"Connected to {account_type} account successfully!")
@@ -200,10 +216,11 @@ def execute_trade():
         trading_logger.info(f"Executing manual trade: {symbol} {'BUY' if signal == 1 else 'SELL'} with ${stake_usd} stake")
         
         # Get current data
+        bars = live_bars()
         if mt5.connected:
-            df = mt5.get_historical_data(symbol, 'M5', bars=100)
+            df = mt5.get_historical_data(symbol, 'M5', bars=bars)
         else:
-            df = data_loader.generate_sample_data(periods=100, pair=symbol)
+            df = data_loader.generate_sample_data(periods=bars, pair=symbol)
         
         if df is None:
             return jsonify({
@@ -211,16 +228,17 @@ def execute_trade():
                 'message': 'Failed to get market data'
             }), 400
         
-        # Calculate indicators
-        indicator_engine = IndicatorEngine(df)
-        df_indicators = indicator_engine.calculate_all()
+        # Calculate indicators (closed bars shared with other consumers, forming bar fresh)
+        broker = 'mt5' if mt5.connected else 'demo'
+        df_indicators = analysis_cache.indicators(broker, symbol, 'M5', df,
+                                                  columns=required_columns(scalping_strategy))
         
         latest = df_indicators.iloc[-1]
         close_price = latest['close']
         atr = latest['atr']
         
         # Get scores for target calculation
-        signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators)
+        signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators, tail=1)
         
         # Use proper entry price based on signal direction
         # BUY at ASK (higher), SELL at BID (lower)
@@ -364,60 +382,74 @@ def close_position(ticket):
 @app.route('/api/analyze', methods=['POST'])
 def analyze_pair():
     """Analyze pair with advanced AI."""
-    global mt5, ml_model, scalping_strategy, pattern_recognizer
+    global mt5, scalping_strategy, pattern_recognizer
     
     data = request.json
     symbol = data.get('symbol', 'EURUSD')
     timeframe = data.get('timeframe', 'M5')  # Scalping uses lower timeframes
     
+    bars = live_bars()
     if not mt5.connected:
         # Use demo data
         trading_logger.warning("Using demo data (MT5 not connected)")
-        df = data_loader.generate_sample_data(periods=500, pair=symbol)
+        df = data_loader.generate_sample_data(periods=bars, pair=symbol)
     else:
         trading_logger.info(f"Analyzing {symbol} on {timeframe}...")
-        df = mt5.get_historical_data(symbol, timeframe, bars=500)
+        df = mt5.get_historical_data(symbol, timeframe, bars=bars)
         
         if df is None:
             trading_logger.error(f"Failed to get data for {symbol}")
             return jsonify({'error': 'Failed to get data'}), 400
     
     try:
+        # One read of the active model: a swap mid-request cannot mix versions
+        version, model = model_registry.active
+        
         # Calculate indicators
         trading_logger.info("Calculating 30+ technical indicators...")
-        indicator_engine = IndicatorEngine(df)
-        df_indicators = indicator_engine.calculate_all()
+        broker = 'mt5' if mt5.connected else 'demo'
+        df_indicators = analysis_cache.indicators(broker, symbol, timeframe, df,
+                                                  columns=required_columns(scalping_strategy, model) + ['macd'])
         
         # Analyze patterns
         trading_logger.info("Analyzing chart patterns...")
-        patterns = pattern_recognizer.analyze_patterns(df_indicators)
-        bullish_score, bearish_score = pattern_recognizer.get_pattern_score(patterns)
+        bullish_score, bearish_score = pattern_recognizer.get_pattern_score(
+            pattern_recognizer.analyze_patterns(df_indicators, tail=1)
+        )
         
         # Generate scalping signals
         trading_logger.info("Generating scalping signals...")
-        signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators)
-        df_indicators['signal'] = signals
+        signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators, tail=1)
+        # Live decisions only need the latest bar
+        df_indicators['signal'] = signals.reindex(df_indicators.index, fill_value=0)
         
         # Apply filters
         trading_logger.info("Applying strict filters...")
-        df_indicators['signal'] = scalping_strategy.filter_scalping_signals(df_indicators, df_indicators['signal'])
+        filtered = scalping_strategy.filter_scalping_signals(df_indicators, signals, tail=1)
+        df_indicators['signal'] = filtered.reindex(df_indicators.index, fill_value=0)
         
         # Get ML prediction
         trading_logger.info("Running AI prediction model...")
-        try:
-            ml_signals, ml_confidence = ml_model.predict(df_indicators)
-            df_indicators['ml_signal'] = 0
-            df_indicators['ml_confidence'] = 0.0
-            df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
-            df_indicators.loc[df_indicators.index[-len(ml_confidence):], 'ml_confidence'] = ml_confidence.astype(float)
-        except:
-            trading_logger.warning("ML model not trained, training now...")
-            ml_model.train(df_indicators)
-            ml_signals, ml_confidence = ml_model.predict(df_indicators)
-            df_indicators['ml_signal'] = 0
-            df_indicators['ml_confidence'] = 0.0
-            df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
-            df_indicators.loc[df_indicators.index[-len(ml_confidence):], 'ml_confidence'] = ml_confidence.astype(float)
+        if model is None:
+            # Train in the background; until it is published the ML signal stays neutral
+            if training_service.pending():
+                trading_logger.warning("ML model not trained, training job in progress")
+            elif training_service.recently_failed(symbol):
+                trading_logger.warning("ML model not trained, last training job failed (retrying later)")
+            else:
+                train_df = training_data(symbol)
+                if train_df is None or len(train_df) < 500:
+                    trading_logger.warning("ML model not trained, not enough data for training")
+                else:
+                    job_id = training_service.submit(train_df, symbol, params=scalping_strategy.params)
+                    trading_logger.warning(f"ML model not trained, training job {job_id} queued")
+            ml_signals, ml_confidence = np.zeros(1, dtype=int), np.zeros(1)
+        else:
+            ml_signals, ml_confidence = model.predict_latest(df_indicators)
+        df_indicators['ml_signal'] = 0
+        df_indicators['ml_confidence'] = 0.0
+        df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
+        df_indicators.loc[df_indicators.index[-len(ml_confidence):], 'ml_confidence'] = ml_confidence.astype(float)
         
         # Combine signals - Only trade when both agree OR ML is very confident
         df_indicators['final_signal'] = np.where(
@@ -465,6 +497,7 @@ def analyze_pair():
             'sell_score': float(sell_score.iloc[-1]),
             'bullish_patterns': int(bullish_score),
             'bearish_patterns': int(bearish_score),
+            'model_version': version,
             'current_price': {
                 'bid': float(current_price),
                 'ask': float(current_price * 1.0001),
@@ -495,23 +528,35 @@ def get_logs():
     return jsonify(logs)
 
 
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    """Get analysis cache hit/miss counters."""
+    return jsonify(analysis_cache.stats())
+
+
+def training_data(symbol, bars=3000):
+    """Historical M5 bars to train on (MT5, or sample data when not connected)."""
+    if mt5.connected:
+        return mt5.get_historical_data(symbol, 'M5', bars=bars)
+    return data_loader.generate_sample_data(periods=bars, pair=symbol)
+
+
 @app.route('/api/train-model', methods=['POST'])
 def train_model():
-    """Train the advanced AI model."""
-    global ml_model
+    """
+    Queue training of the advanced AI model and return at once.
     
+    The job runs in the training service's worker process; poll
+    /api/train-model/<job_id> for progress. The finished model is
+    published to the registry and swapped in for every reader.
+    """
     data = request.json
     symbol = data.get('symbol', 'EURUSD')
     
     try:
         trading_logger.info("🎓 Starting AI model training...")
         trading_logger.info(f"Fetching 3000+ historical bars for {symbol}...")
-        
-        # Get historical data
-        if mt5.connected:
-            df = mt5.get_historical_data(symbol, 'M5', bars=3000)
-        else:
-            df = data_loader.generate_sample_data(periods=3000, pair=symbol)
+        df = training_data(symbol)
         
         if df is None or len(df) < 500:
             trading_logger.error("Not enough data for training")
@@ -520,29 +565,15 @@ def train_model():
                 'error': 'Not enough data for training'
             }), 400
         
-        trading_logger.info("Calculating indicators...")
-        indicator_engine = IndicatorEngine(df)
-        df_indicators = indicator_engine.calculate_all()
-        
-        trading_logger.info("Generating training signals...")
-        signals, _, _ = scalping_strategy.analyze_scalping_opportunity(df_indicators)
-        df_indicators['signal'] = signals
-        
-        trading_logger.info("Training ensemble AI model (this may take 2-3 minutes)...")
-        train_score, test_score = ml_model.train(df_indicators)
-        
-        trading_logger.success(f"✓ Training complete! Train: {train_score*100:.1f}% | Test: {test_score*100:.1f}%")
-        
-        # Save model
-        ml_model.save('advanced_model.pkl')
-        trading_logger.success("✓ Model saved successfully")
+        job_id = training_service.submit(df, symbol, params=scalping_strategy.params)
+        trading_logger.info(f"Training job {job_id} queued (ensemble training takes 2-3 minutes)")
         
         return jsonify({
             'success': True,
-            'train_score': train_score,
-            'test_score': test_score,
-            'message': 'Model trained successfully'
-        })
+            'job_id': job_id,
+            'job': training_service.status(job_id),
+            'message': 'Model training started'
+        }), 202
         
     except Exception as e:
         trading_logger.error(f"Training error: {str(e)}")
@@ -552,6 +583,25 @@ def train_model():
         }), 500
 
 
+@app.route('/api/train-model/<int:job_id>')
+def get_training_job(job_id):
+    """Get a training job's status and progress."""
+    job = training_service.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown training job'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/models')
+def get_models():
+    """Get the active model version, the kept versions and recent training jobs."""
+    return jsonify({
+        'active_version': model_registry.version,
+        'versions': model_registry.versions(),
+        'jobs': training_service.list_jobs()
+    })
+
+
 @app.route('/api/start-auto-trading', methods=['POST'])
 def start_auto_trading():
     """Start automated trading."""
@@ -593,7 +643,7 @@ def stop_auto_trading():
 
 def auto_trading_loop():
     """Main auto-trading loop with real trade execution."""
-    global trading_active, mt5, ml_model, scalping_strategy, risk_manager
+    global trading_active, mt5, scalping_strategy, risk_manager
     
     # Get all available pairs from MT5 or use defaults
     if mt5.connected:
@@ -618,32 +668,43 @@ def auto_trading_loop():
     
     while trading_active:
         try:
+            # Get data for the whole universe first
+            frames = {}
+            bars = live_bars()
             for pair in pairs:
+                if mt5.connected:
+                    df = mt5.get_historical_data(pair, 'M5', bars=bars)
+                else:
+                    df = data_loader.generate_sample_data(periods=bars, pair=pair)
+                
+                if df is not None:
+                    frames[pair] = df
+            
+            # Active model for this scan (None until one is trained)
+            model = model_registry.current
+            
+            # Analyze all pairs: cached bars are reused, the rest go through one batched pass
+            broker = 'mt5' if mt5.connected else 'demo'
+            universe = analysis_cache.indicators_batch(broker, 'M5', frames,
+                                                       columns=required_columns(scalping_strategy, model))
+            
+            for pair, df_indicators in universe.items():
                 if not trading_active:
                     break
                 
                 trading_logger.info(f"Scanning {pair}...")
                 
-                # Get data
-                if mt5.connected:
-                    df = mt5.get_historical_data(pair, 'M5', bars=500)
-                else:
-                    df = data_loader.generate_sample_data(periods=500, pair=pair)
+                signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators, tail=1)
+                # Live decisions only need the latest bar
+                df_indicators['signal'] = signals.reindex(df_indicators.index, fill_value=0)
+                filtered = scalping_strategy.filter_scalping_signals(df_indicators, signals, tail=1)
+                df_indicators['signal'] = filtered.reindex(df_indicators.index, fill_value=0)
                 
-                if df is None:
+                # ML prediction from the active model
+                if model is None:
                     continue
-                
-                # Analyze
-                indicator_engine = IndicatorEngine(df)
-                df_indicators = indicator_engine.calculate_all()
-                
-                signals, buy_score, sell_score = scalping_strategy.analyze_scalping_opportunity(df_indicators)
-                df_indicators['signal'] = signals
-                df_indicators['signal'] = scalping_strategy.filter_scalping_signals(df_indicators, df_indicators['signal'])
-                
-                # ML prediction
                 try:
-                    ml_signals, ml_confidence = ml_model.predict(df_indicators)
+                    ml_signals, ml_confidence = model.predict_latest(df_indicators)
                     df_indicators['ml_signal'] = 0
                     df_indicators['ml_confidence'] = 0.0
                     df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
@@ -738,10 +799,11 @@ if __name__ == '__main__':
     print("ADVANCED AI FOREX SCALPING SYSTEM")
     print("="*70)
     
-    # Try to load model
+    # Try to load model: the registry's current version, else a model saved before versioning
     try:
-        ml_model.load('advanced_model.pkl')
-        print("Advanced AI model loaded")
+        if model_registry.load(legacy='advanced_model.pkl') is None:
+            raise FileNotFoundError
+        print(f"Advanced AI model v{model_registry.version} loaded")
     except:
         print("No model found. Will train on first use.")
     
@@ -120,11 +120,11 @@ def analyze_pair():
         
         # Get ML prediction (train if not trained)
         try:
-            ml_signals, ml_confidence = ml_model.predict(df_signals)
+            ml_signals, ml_confidence = ml_model.predict_latest(df_signals, SignalGenerator.ML_TAIL)
         except:
             # Train model first
             ml_model.train(df_signals)
-            ml_signals, ml_confidence = ml_model.predict(df_signals)
+            ml_signals, ml_confidence = ml_model.predict_latest(df_signals, SignalGenerator.ML_TAIL)
         
         # Combine signals
         df_final = signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence)
@@ -255,7 +255,7 @@ def run_backtest():
         
         # Run backtest
         backtester = Backtester(initial_balance=10000)
-        results = backtester.run(df_final)
+        results = backtester.run_fast(df_final)
         
         return jsonify(results)
         
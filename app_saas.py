@@ -360,14 +360,14 @@ def analyze():
         
         # ML prediction
         try:
-            ml_signals, ml_confidence = ml_model.predict(df_indicators)
+            ml_signals, ml_confidence = ml_model.predict_latest(df_indicators)
             df_indicators['ml_signal'] = 0
             df_indicators['ml_confidence'] = 0.0
             df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
             df_indicators.loc[df_indicators.index[-len(ml_confidence):], 'ml_confidence'] = ml_confidence.astype(float)
         except:
             ml_model.train(df_indicators)
-            ml_signals, ml_confidence = ml_model.predict(df_indicators)
+            ml_signals, ml_confidence = ml_model.predict_latest(df_indicators)
             df_indicators['ml_signal'] = 0
             df_indicators['ml_confidence'] = 0.0
             df_indicators.loc[df_indicators.index[-len(ml_signals):], 'ml_signal'] = ml_signals
@@ -0,0 +1,477 @@
+"""Parallel multi-symbol, multi-timeframe backtest runner."""
+
+import argparse
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from analysis_cache import config_hash
+from backtester import Backtester, EXIT_REASONS
+from cost_model import CostModel, pip_size
+from data_loader import DataLoader
+from indicators import IndicatorEngine, required_columns
+from result_cache import frame_digest, indicator_settings, result_cache
+from scalping_strategy import ScalpingStrategy
+from signal_generator import SignalGenerator
+
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+STRATEGIES = ('scalping', 'signals')
+
+# Bar frequency of each MT5 timeframe, used for generated sample data
+TIMEFRAME_FREQ = {
+    'M1': '1min',
+    'M5': '5min',
+    'M15': '15min',
+    'M30': '30min',
+    'H1': 'H',
+    'H4': '4H',
+    'D1': 'D'
+}
+
+# Backtester.run_fast keyword arguments a strategy config may set
+EXIT_PARAMS = ('atr_stop_multiplier', 'atr_target_multiplier', 'trailing_activation', 'trailing_distance', 'auto_close')
+
+# Trailing settings used when a config enables trailing without choosing them
+TRAILING_DEFAULTS = {'trailing_activation': 1.0, 'trailing_distance': 0.5}
+
+# Strategy config keys read from a deployment config
+STRATEGY_KEYS = tuple(ScalpingStrategy.DEFAULT_PARAMS) + EXIT_PARAMS + ('use_trailing_stop',)
+
+# Price blocks attached by this (worker) process, by shared memory name
+_attached = {}
+
+
+def make_job(symbol, timeframe, start=None, end=None, strategy=None, costs=False):
+    """
+    Describe one backtest.
+    
+    Args:
+        symbol: Instrument
+        timeframe: Bar timeframe (M1 ... D1)
+        start: First bar to trade (anything pd.Timestamp accepts); None for the first fetched bar
+        end: Last bar to use; None for the last fetched bar
+        strategy: Strategy config dict; 'name' is one of STRATEGIES, the
+            other keys are STRATEGY_KEYS (see split_strategy)
+        costs: Charge the symbol's spread, slippage and commission (cost_model)
+    
+    Returns:
+        Job dict
+    """
+    strategy = dict(strategy or {})
+    strategy.setdefault('name', 'scalping')
+    if strategy['name'] not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy['name']}")
+    return {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'start': start,
+        'end': end,
+        'strategy': strategy,
+        'costs': costs
+    }
+
+
+def deployment_jobs(path='deployment_config.json', start=None, end=None, strategy=None, costs=False):
+    """
+    One job per trading pair and timeframe of a deployment config.
+    
+    The deployment's strategy settings (STRATEGY_KEYS) are used unless
+    ``strategy`` overrides them.
+    
+    Args:
+        path: Deployment config JSON file
+        start: First bar to trade
+        end: Last bar to use
+        strategy: Strategy config dict (default: scalping)
+        costs: Charge trading costs (see make_job)
+    
+    Returns:
+        List of job dicts
+    """
+    with open(path) as f:
+        deployment = json.load(f)
+    settings = {key: deployment[key] for key in STRATEGY_KEYS if key in deployment}
+    strategy = dict(settings, **(strategy or {}))
+    return [
+        make_job(symbol, timeframe, start, end, strategy, costs)
+        for symbol in deployment['trading_pairs']
+        for timeframe in deployment['timeframes']
+    ]
+
+
+def load_prices(symbol, timeframe, bars, connector=None):
+    """
+    Fetch OHLCV bars from MT5, or generate sample data when not connected.
+    
+    Args:
+        symbol: Instrument
+        timeframe: Bar timeframe
+        bars: Number of bars
+        connector: MT5Connector, or None for sample data
+    
+    Returns:
+        OHLCV DataFrame
+    """
+    if connector is not None and connector.connected:
+        df = connector.get_historical_data(symbol, timeframe, bars=bars)
+        if df is not None:
+            return df
+    
+    seed = zlib.crc32(f'{symbol}:{timeframe}'.encode())
+    return DataLoader().generate_sample_data(periods=bars, pair=symbol, seed=seed,
+                                             freq=TIMEFRAME_FREQ.get(timeframe, 'H'))
+
+
+def share_prices(df):
+    """
+    Copy an OHLCV frame into a new shared memory block.
+    
+    Layout: int64 timestamps (ns) followed by a (5, n) float64 array in
+    PRICE_FIELDS order. The caller owns the block and must unlink it.
+    
+    Returns:
+        (SharedMemory, spec) where spec is the small picklable handle workers attach with
+    """
+    n = len(df)
+    block = shared_memory.SharedMemory(create=True, size=max(1, 6 * n * 8))
+    timestamps, prices = _price_views(block, n)
+    timestamps[:] = pd.DatetimeIndex(df.index).asi8
+    for row, field in enumerate(PRICE_FIELDS):
+        prices[row] = df[field].to_numpy(dtype=float) if field in df.columns else 0.0
+    return block, {'name': block.name, 'length': n}
+
+
+def _price_views(block, n):
+    """Timestamp and price arrays backed by a shared memory block."""
+    timestamps = np.ndarray((n,), dtype=np.int64, buffer=block.buf)
+    prices = np.ndarray((len(PRICE_FIELDS), n), dtype=np.float64, buffer=block.buf, offset=n * 8)
+    return timestamps, prices
+
+
+def _attach(spec):
+    """Views on a shared price block, attaching once per process."""
+    if spec['name'] not in _attached:
+        block = shared_memory.SharedMemory(name=spec['name'])
+        _attached[spec['name']] = (block, _price_views(block, spec['length']))
+    return _attached[spec['name']][1]
+
+
+def release_prices(blocks):
+    """Detach and unlink shared price blocks created by share_prices."""
+    for block in blocks:
+        attached = _attached.pop(block.name, None)
+        if attached is not None:
+            attached[0].close()
+        block.close()
+        block.unlink()
+
+
+def shared_frame(spec, end=None):
+    """
+    OHLCV DataFrame (a private copy) from a shared price block.
+    
+    Args:
+        spec: Shared price block handle from share_prices
+        end: Last bar to include (anything pd.Timestamp accepts); None for all
+    """
+    timestamps, prices = _attach(spec)
+    stop = len(timestamps)
+    if end is not None:
+        stop = int(np.searchsorted(timestamps, pd.Timestamp(end).value, side='right'))
+    return pd.DataFrame(prices[:, :stop].T.copy(), columns=PRICE_FIELDS,
+                        index=pd.DatetimeIndex(timestamps[:stop].copy(), name='timestamp'))
+
+
+def split_strategy(strategy):
+    """
+    Split a strategy config into ScalpingStrategy params and run_fast exit params.
+    
+    Trailing stops are only used when 'use_trailing_stop' is set; missing
+    trailing settings then come from TRAILING_DEFAULTS.
+    
+    Returns:
+        (params, exits) dicts
+    """
+    params = {key: strategy[key] for key in ScalpingStrategy.DEFAULT_PARAMS if key in strategy}
+    exits = {key: strategy[key] for key in EXIT_PARAMS if key in strategy and strategy[key] is not None}
+    if strategy.get('use_trailing_stop'):
+        for key, value in TRAILING_DEFAULTS.items():
+            exits.setdefault(key, value)
+    else:
+        for key in TRAILING_DEFAULTS:
+            exits.pop(key, None)
+    return params, exits
+
+
+def build_signals(df, strategy):
+    """
+    Indicators and a 'final_signal' column for a strategy config.
+    
+    'scalping' scores bars with ScalpingStrategy and its filters; 'signals'
+    uses the SignalGenerator consensus and filters without the ML vote.
+    
+    Args:
+        df: OHLCV DataFrame
+        strategy: Strategy config dict
+    
+    Returns:
+        DataFrame with indicator columns, 'final_signal' and the unfiltered
+        'signal', 'buy_score' and 'sell_score' the auto-close rules read
+    """
+    if strategy['name'] == 'scalping':
+        scalper = ScalpingStrategy(split_strategy(strategy)[0])
+        df = IndicatorEngine(df, backend='numpy').calculate(required_columns(scalper))
+        if len(df) < scalper.MIN_BARS:
+            df[['signal', 'buy_score', 'sell_score', 'final_signal']] = 0
+            return df
+        df['signal'], df['buy_score'], df['sell_score'] = scalper.analyze_scalping_opportunity(df)
+        df['final_signal'] = scalper.filter_scalping_signals(df, df['signal'])
+        return df
+    
+    df = IndicatorEngine(df, backend='numpy').calculate(required_columns(SignalGenerator))
+    signal_gen = SignalGenerator(df)
+    df = signal_gen.generate_signals()
+    df['final_signal'] = df['signal']
+    return signal_gen.filter_signals(df)
+
+
+def run_job(job, spec):
+    """
+    Backtest one job against a shared price block.
+    
+    Indicators are computed on every bar up to ``end`` so the bars before
+    ``start`` serve as warm-up; only bars from ``start`` on are traded.
+    
+    Signals and backtest outputs go through the result cache, keyed by the
+    price data, so re-running a job (or one differing only in its exits)
+    skips the unchanged stages.
+    
+    Args:
+        job: Job dict from make_job
+        spec: Shared price block handle from share_prices
+    
+    Returns:
+        Dict with the job, backtest results, bar count, trades and timing
+    """
+    started = time.perf_counter()
+    df = shared_frame(spec, job['end'])
+    params, exits = split_strategy(job['strategy'])
+    signals_key = result_cache.key('signals', frame_digest(df), indicator_settings(), job['strategy']['name'], params)
+    backtest_key = result_cache.key('job', signals_key, job['symbol'], job['start'], exits, job['costs'])
+    
+    def backtest():
+        first = 0
+        if job['start'] is not None:
+            first = int(df.index.searchsorted(pd.Timestamp(job['start']), side='left'))
+        df_signals = result_cache.get_or_compute(signals_key, lambda: build_signals(df, job['strategy'])).iloc[first:]
+        
+        backtester = Backtester()
+        costs = CostModel(job['symbol']) if job['costs'] else None
+        results = backtester.run_fast(df_signals, pip_size=pip_size(job['symbol']), costs=costs, **exits)
+        trades = backtester.trade_arrays
+        return {
+            'results': results,
+            'bars': len(df_signals),
+            'trades': {
+                'entry_time': trades['entry_time'].asi8,
+                'exit_time': df_signals.index.asi8[trades['exit_index']],
+                'is_buy': trades['is_buy'],
+                'pnl': trades['pnl'],
+                'pnl_pips': trades['net_pips'] if costs is not None else trades['pnl'] / pip_size(job['symbol']),
+                'exit_reason': trades['exit_reason']
+            }
+        }
+    
+    output = result_cache.get_or_compute(backtest_key, backtest)
+    return {'job': job, **output, 'elapsed': time.perf_counter() - started}
+
+
+def run_backtests(jobs, bars=5000, workers=None, connector=None):
+    """
+    Run backtest jobs over a process pool.
+    
+    Prices are fetched once per (symbol, timeframe) in this process and
+    placed in shared memory; workers attach to the blocks instead of
+    receiving pickled DataFrames, so jobs sharing a series (different date
+    ranges or strategy configs) share one copy of it.
+    
+    Args:
+        jobs: List of job dicts
+        bars: Bars fetched per (symbol, timeframe)
+        workers: Worker processes (default: all cores); 1 runs in this process
+        connector: MT5Connector for live history, or None for sample data
+    
+    Returns:
+        List of run_job outputs, in job order
+    """
+    workers = workers or os.cpu_count() or 1
+    blocks = {}
+    specs = {}
+    try:
+        for job in jobs:
+            series = (job['symbol'], job['timeframe'])
+            if series not in blocks:
+                df = load_prices(job['symbol'], job['timeframe'], bars, connector)
+                blocks[series], specs[series] = share_prices(df)
+        
+        if workers == 1 or len(jobs) <= 1:
+            return [run_job(job, specs[(job['symbol'], job['timeframe'])]) for job in jobs]
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [pool.submit(run_job, job, specs[(job['symbol'], job['timeframe'])]) for job in jobs]
+            return [future.result() for future in futures]
+    finally:
+        release_prices(blocks.values())
+
+
+def _max_drawdown(pnl):
+    """Largest peak-to-trough fall of a cumulative P&L path starting at 0."""
+    equity = np.concatenate([[0.0], np.cumsum(pnl)])
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def portfolio_report(outcomes):
+    """
+    Aggregate job outputs into a portfolio report.
+    
+    P&L is compared across instruments in pips; the portfolio equity curve
+    books every trade at its exit time.
+    
+    Args:
+        outcomes: List of run_job outputs
+    
+    Returns:
+        Dict with 'jobs', 'by_symbol', 'by_timeframe' (DataFrames),
+        'equity' (Series of cumulative pips) and 'summary' (dict)
+    """
+    rows = []
+    trade_frames = []
+    for outcome in outcomes:
+        job = outcome['job']
+        results = outcome['results']
+        trades = outcome['trades']
+        pips = trades['pnl_pips']
+        rows.append({
+            'symbol': job['symbol'],
+            'timeframe': job['timeframe'],
+            'strategy': job['strategy']['name'],
+            'config': config_hash(job['strategy']),
+            'bars': outcome['bars'],
+            'trades': results['total_trades'],
+            'wins': int((pips > 0).sum()),
+            'win_rate': results['win_rate'],
+            'profit_factor': results.get('profit_factor', 0),
+            'pnl_pips': float(pips.sum()),
+            'max_drawdown_pips': _max_drawdown(pips),
+            'stop_losses': int((trades['exit_reason'] == EXIT_REASONS.index('stop_loss')).sum()),
+            'seconds': outcome['elapsed']
+        })
+        trade_frames.append(pd.DataFrame({
+            'symbol': job['symbol'],
+            'timeframe': job['timeframe'],
+            'exit_time': pd.to_datetime(trades['exit_time']),
+            'pnl_pips': pips
+        }))
+    
+    jobs = pd.DataFrame(rows)
+    trades = pd.concat(trade_frames, ignore_index=True) if trade_frames else pd.DataFrame(columns=['exit_time', 'pnl_pips'])
+    trades = trades.sort_values('exit_time', kind='stable')
+    equity = pd.Series(trades['pnl_pips'].to_numpy(dtype=float).cumsum(), index=trades['exit_time'].to_numpy())
+    
+    def group(by):
+        grouped = jobs.groupby(by)[['trades', 'wins', 'pnl_pips']].sum()
+        grouped['win_rate'] = (grouped['wins'] / grouped['trades'].where(grouped['trades'] > 0) * 100).fillna(0.0)
+        return grouped
+    
+    pips = trades['pnl_pips'].to_numpy(dtype=float)
+    total_trades = int(len(pips))
+    gross_win = pips[pips > 0].sum()
+    gross_loss = -pips[pips < 0].sum()
+    
+    summary = {
+        'jobs': len(jobs),
+        'total_trades': total_trades,
+        'win_rate': (pips > 0).sum() / total_trades * 100 if total_trades else 0,
+        'pnl_pips': float(pips.sum()),
+        'profit_factor': gross_win / gross_loss if gross_loss > 0 else 0,
+        'max_drawdown_pips': _max_drawdown(pips),
+        'profitable_jobs': int((jobs['pnl_pips'] > 0).sum()) if len(jobs) else 0,
+        'cpu_seconds': float(jobs['seconds'].sum()) if len(jobs) else 0.0
+    }
+    
+    return {
+        'jobs': jobs,
+        'by_symbol': group('symbol') if len(jobs) else jobs,
+        'by_timeframe': group('timeframe') if len(jobs) else jobs,
+        'equity': equity,
+        'summary': summary
+    }
+
+
+def print_report(report):
+    """Print a portfolio report."""
+    summary = report['summary']
+    print("\n" + "="*60)
+    print("PORTFOLIO BACKTEST")
+    print("="*60)
+    print(report['jobs'].drop(columns=['config']).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print("\nBy timeframe:")
+    print(report['by_timeframe'].to_string(float_format=lambda x: f"{x:.2f}"))
+    print("\n" + "-"*60)
+    print(f"Jobs: {summary['jobs']} ({summary['profitable_jobs']} profitable)")
+    print(f"Total Trades: {summary['total_trades']}")
+    print(f"Win Rate: {summary['win_rate']:.2f}%")
+    print(f"Total P&L: {summary['pnl_pips']:.1f} pips")
+    print(f"Profit Factor: {summary['profit_factor']:.2f}")
+    print(f"Max Drawdown: {summary['max_drawdown_pips']:.1f} pips")
+    print("="*60)
+
+
+def main():
+    """Validate a deployment config's whole universe from the command line."""
+    parser = argparse.ArgumentParser(description='Backtest every pair and timeframe of a deployment config.')
+    parser.add_argument('config', nargs='?', default='deployment_config.json')
+    parser.add_argument('--bars', type=int, default=5000, help='bars fetched per symbol and timeframe')
+    parser.add_argument('--start', help='first bar to trade (earlier bars only warm up indicators)')
+    parser.add_argument('--end', help='last bar to use')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='scalping')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--mt5', action='store_true', help='fetch history from MetaTrader 5 instead of sample data')
+    parser.add_argument('--costs', action='store_true', help='charge spread, slippage and commission')
+    parser.add_argument('--output', default='portfolio_backtest.csv')
+    args = parser.parse_args()
+    
+    connector = None
+    if args.mt5:
+        from mt5_connector import MT5Connector
+        connector = MT5Connector()
+        connector.connect()
+    
+    jobs = deployment_jobs(args.config, args.start, args.end, {'name': args.strategy}, args.costs)
+    print(f"Running {len(jobs)} backtests on {args.workers or os.cpu_count()} workers...")
+    
+    started = time.perf_counter()
+    outcomes = run_backtests(jobs, bars=args.bars, workers=args.workers, connector=connector)
+    report = portfolio_report(outcomes)
+    elapsed = time.perf_counter() - started
+    
+    print_report(report)
+    print(f"Finished in {elapsed:.1f}s ({report['summary']['cpu_seconds']:.1f}s of job time)")
+    
+    report['jobs'].to_csv(args.output, index=False)
+    print(f"Job results saved to '{args.output}'")
+    
+    if connector is not None:
+        connector.disconnect()
+
+
+if __name__ == "__main__":
+    main()
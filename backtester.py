@@ -2,17 +2,299 @@
 
 import pandas as pd
 import numpy as np
+from position_manager import (AUTO_CLOSE_COLUMNS, AUTO_CLOSE_RULES, CLOSE_RULES, auto_close_rules, close_bands,
+                              close_momentum)
 from risk_manager import RiskManager
 import config
 
 
+# Auto-close rule k (see position_manager.CLOSE_RULES) is exit reason 2 + k
+EXIT_REASONS = ['stop_loss', 'take_profit', 'trailing_stop'] + CLOSE_RULES
+
+# Dollars per pip per lot without a cost model, RiskManager.calculate_position_size's default
+PIP_VALUE = 10
+
+
+def first_hit(mask_fn, start, stop, chunk=16, max_chunk=65536):
+    """
+    Index of the first bar in [start, stop) where ``mask_fn(lo, hi)`` is True.
+    
+    The mask is evaluated on geometrically growing chunks, so an exit a few
+    bars away costs one small array operation and a distant one stays O(n).
+    
+    Returns:
+        Bar index, or -1 if no bar matches
+    """
+    lo = start
+    while lo < stop:
+        hi = min(lo + chunk, stop)
+        mask = mask_fn(lo, hi)
+        if mask.any():
+            return lo + int(mask.argmax())
+        lo = hi
+        chunk = min(chunk * 2, max_chunk)
+    return -1
+
+
+def trailing_exit(high, low, start, stop, buy, stop_loss, take_profit, activation, distance):
+    """
+    First stop/target hit in [start, stop) for a position with a trailing stop.
+    
+    Once the best price since entry reaches ``activation`` the stop trails it
+    at ``distance``, never loosening. The trail only uses earlier bars, so a
+    bar cannot both move the stop and hit it.
+    
+    Returns:
+        (bar index or -1, exit price, index into EXIT_REASONS)
+    """
+    # Work in long orientation: sells are mirrored by negating prices
+    sign = 1.0 if buy else -1.0
+    sl, tp, act = sign * stop_loss, sign * take_profit, sign * activation
+    state = {'peak': -np.inf}
+    
+    def hit(lo, hi):
+        best = high[lo:hi] if buy else -low[lo:hi]
+        worst = low[lo:hi] if buy else -high[lo:hi]
+        prior = np.maximum.accumulate(np.concatenate(([state['peak']], best[:-1])))
+        state['peak'] = max(state['peak'], best.max())
+        stops = np.where(prior >= act, np.maximum(sl, prior - distance), sl)
+        state['lo'], state['stops'], state['worst'] = lo, stops, worst
+        return (worst <= stops) | (best >= tp)
+    
+    exit_index = first_hit(hit, start, stop)
+    if exit_index < 0:
+        return -1, np.nan, -1
+    
+    offset = exit_index - state['lo']
+    current_stop = state['stops'][offset]
+    if state['worst'][offset] <= current_stop:
+        return exit_index, sign * current_stop, 0 if current_stop == sl else 2
+    return exit_index, take_profit, 1
+
+
+def find_exit(high, low, start, stop, buy, stop_loss, take_profit, activation=None, distance=None):
+    """
+    First stop/target hit in [start, stop) for one position; the stop wins
+    when both are inside the same bar.
+    
+    Args:
+        activation, distance: Trailing stop settings (see trailing_exit); None for a fixed stop
+    
+    Returns:
+        (bar index or -1, exit price, index into EXIT_REASONS)
+    """
+    if activation is not None:
+        return trailing_exit(high, low, start, stop, buy, stop_loss, take_profit, activation, distance)
+    
+    if buy:
+        exit_index = first_hit(lambda lo, hi: (low[lo:hi] <= stop_loss) | (high[lo:hi] >= take_profit), start, stop)
+    else:
+        exit_index = first_hit(lambda lo, hi: (high[lo:hi] >= stop_loss) | (low[lo:hi] <= take_profit), start, stop)
+    if exit_index < 0:
+        return -1, np.nan, -1
+    
+    hit_stop = low[exit_index] <= stop_loss if buy else high[exit_index] >= stop_loss
+    return (exit_index, stop_loss, 0) if hit_stop else (exit_index, take_profit, 1)
+
+
+def intrabar_target_first(sub_high, sub_low, lo, hi, buy, stop_level, take_profit):
+    """
+    Whether the take profit was touched before the stop within sub-bars [lo, hi).
+    
+    Returns:
+        True (target first), False (stop first), or None when the sub-bars
+        cannot tell (no data, or both levels inside the same sub-bar)
+    """
+    if buy:
+        index = first_hit(lambda a, b: (sub_low[a:b] <= stop_level) | (sub_high[a:b] >= take_profit), lo, hi)
+    else:
+        index = first_hit(lambda a, b: (sub_high[a:b] >= stop_level) | (sub_low[a:b] <= take_profit), lo, hi)
+    if index < 0:
+        return None
+    
+    stop_hit = sub_low[index] <= stop_level if buy else sub_high[index] >= stop_level
+    target_hit = sub_high[index] >= take_profit if buy else sub_low[index] <= take_profit
+    if stop_hit and target_hit:
+        return None
+    return bool(target_hit)
+
+
+class RunningStats:
+    """Trade statistics accumulated per trade: counts, gross profit/loss, equity high-water mark and drawdown."""
+    
+    __slots__ = ('count', 'wins', 'losses', 'gross_profit', 'gross_loss', 'equity', 'peak', 'max_drawdown')
+    
+    def __init__(self):
+        self.count = self.wins = self.losses = 0
+        self.gross_profit = self.gross_loss = 0.0
+        self.equity = self.peak = self.max_drawdown = 0.0
+    
+    def update(self, pnl):
+        """Add one closed trade."""
+        self.count += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss += pnl
+        self.equity += pnl
+        if self.equity > self.peak:
+            self.peak = self.equity
+        elif self.peak - self.equity > self.max_drawdown:
+            self.max_drawdown = self.peak - self.equity
+    
+    def extend(self, pnl):
+        """
+        Add a P&L array, in order.
+        
+        Sums are sequential (cumsum), so the result matches calling update
+        once per trade to the last bit.
+        """
+        pnl = np.asarray(pnl, dtype=float)
+        if not len(pnl):
+            return
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
+        self.count += len(pnl)
+        self.wins += len(wins)
+        self.losses += len(losses)
+        self.gross_profit = float(np.cumsum(np.concatenate(([self.gross_profit], wins)))[-1])
+        self.gross_loss = float(np.cumsum(np.concatenate(([self.gross_loss], losses)))[-1])
+        
+        equity = np.cumsum(np.concatenate(([self.equity], pnl)))[1:]
+        peak = np.maximum.accumulate(np.concatenate(([self.peak], equity)))[1:]
+        self.max_drawdown = max(self.max_drawdown, float((peak - equity).max()))
+        self.equity = float(equity[-1])
+        self.peak = float(peak[-1])
+    
+    def summary(self, initial_balance):
+        """Backtest statistics in O(1)."""
+        if not self.count:
+            return {
+                'total_trades': 0,
+                'win_rate': 0,
+                'total_pnl': 0,
+                'final_balance': initial_balance
+            }
+        
+        avg_win = self.gross_profit / self.wins if self.wins else 0
+        avg_loss = self.gross_loss / self.losses if self.losses else 0
+        final_balance = initial_balance + self.equity
+        return {
+            'total_trades': self.count,
+            'winning_trades': self.wins,
+            'losing_trades': self.losses,
+            'win_rate': self.wins / self.count * 100,
+            'total_pnl': self.equity,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
+            'max_drawdown': self.max_drawdown,
+            'final_balance': final_balance,
+            'return_pct': ((final_balance - initial_balance) / initial_balance) * 100
+        }
+
+
+class TradeLog:
+    """
+    Closed trades in preallocated NumPy columns (34 bytes per trade), with
+    RunningStats kept up to date as trades are appended.
+    
+    Timestamp entry times are stored as int64 nanoseconds; any other index
+    value (e.g. bar positions of a RangeIndex) switches the column to
+    object dtype holding the raw values.
+    """
+    
+    __slots__ = ('columns', 'count', 'stats', 'tz')
+    
+    COLUMNS = {
+        'entry_price': np.float64,
+        'exit_price': np.float64,
+        'is_buy': np.bool_,
+        'pnl': np.float64,
+        'exit_reason': np.int8,
+        'entry_time': np.int64
+    }
+    
+    def __init__(self, capacity=256):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.count = 0
+        self.stats = RunningStats()
+        self.tz = None
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self, entry_price, exit_price, is_buy, pnl, exit_reason, entry_time):
+        """
+        Record one closed trade.
+        
+        Args:
+            exit_reason: Index into EXIT_REASONS
+            entry_time: Index value of the entry bar (usually a pd.Timestamp)
+        """
+        if self.count == len(self.columns['pnl']):
+            for name, values in self.columns.items():
+                grown = np.empty(2 * len(values), dtype=values.dtype)
+                grown[:self.count] = values
+                self.columns[name] = grown
+        
+        n = self.count
+        columns = self.columns
+        columns['entry_price'][n] = entry_price
+        columns['exit_price'][n] = exit_price
+        columns['is_buy'][n] = is_buy
+        columns['pnl'][n] = pnl
+        columns['exit_reason'][n] = exit_reason
+        if columns['entry_time'].dtype == np.int64 and isinstance(entry_time, pd.Timestamp):
+            columns['entry_time'][n] = entry_time.value
+            self.tz = entry_time.tz
+        else:
+            if columns['entry_time'].dtype == np.int64:
+                boxed = np.empty(len(columns['entry_time']), dtype=object)
+                boxed[:n] = list(self._entry_times(columns['entry_time'][:n]))
+                columns['entry_time'] = boxed
+            columns['entry_time'][n] = entry_time
+        self.count += 1
+        self.stats.update(pnl)
+    
+    def arrays(self):
+        """Views of the filled part of each column."""
+        return {name: values[:self.count] for name, values in self.columns.items()}
+    
+    def _entry_times(self, values):
+        """Entry times of stored column values (nanoseconds back to Timestamps, raw values as is)."""
+        if values.dtype != np.int64:
+            return values.tolist()
+        entry_time = pd.DatetimeIndex(values)
+        if self.tz is not None:
+            entry_time = entry_time.tz_localize('UTC').tz_convert(self.tz)
+        return entry_time
+    
+    def frame(self):
+        """Trades as a DataFrame (entry_price, exit_price, type, pnl, exit_reason, entry_time)."""
+        trades = self.arrays()
+        entry_time = self._entry_times(trades['entry_time'])
+        return pd.DataFrame({
+            'entry_price': trades['entry_price'],
+            'exit_price': trades['exit_price'],
+            'type': np.where(trades['is_buy'], 'buy', 'sell'),
+            'pnl': trades['pnl'],
+            'exit_reason': np.array(EXIT_REASONS)[trades['exit_reason']],
+            'entry_time': entry_time
+        })
+
+
 class Backtester:
     """Backtest trading strategy on historical data."""
     
     def __init__(self, initial_balance=10000):
         self.initial_balance = initial_balance
         self.risk_manager = RiskManager(initial_balance)
-        self.trades = []
+        self.trade_log = TradeLog()
+        self.trade_arrays = None
+        self.intrabar_stats = None
         
     def run(self, df):
         """
@@ -26,6 +308,7 @@ class Backtester:
         """
         balance = self.initial_balance
         position = None
+        self.trade_log = TradeLog()
         
         for i in range(len(df)):
             row = df.iloc[i]
@@ -37,14 +320,14 @@ class Backtester:
                     if row['low'] <= position['stop_loss']:
                         pnl = position['stop_loss'] - position['entry']
                         balance += pnl * position['size']
-                        self._record_trade(position, position['stop_loss'], pnl, 'stop_loss')
+                        self._record_trade(position, position['stop_loss'], pnl, 0)
                         position = None
                         continue
                     # Check take profit
                     elif row['high'] >= position['take_profit']:
                         pnl = position['take_profit'] - position['entry']
                         balance += pnl * position['size']
-                        self._record_trade(position, position['take_profit'], pnl, 'take_profit')
+                        self._record_trade(position, position['take_profit'], pnl, 1)
                         position = None
                         continue
                         
@@ -52,13 +335,13 @@ class Backtester:
                     if row['high'] >= position['stop_loss']:
                         pnl = position['entry'] - position['stop_loss']
                         balance += pnl * position['size']
-                        self._record_trade(position, position['stop_loss'], pnl, 'stop_loss')
+                        self._record_trade(position, position['stop_loss'], pnl, 0)
                         position = None
                         continue
                     elif row['low'] <= position['take_profit']:
                         pnl = position['entry'] - position['take_profit']
                         balance += pnl * position['size']
-                        self._record_trade(position, position['take_profit'], pnl, 'take_profit')
+                        self._record_trade(position, position['take_profit'], pnl, 1)
                         position = None
                         continue
             
@@ -88,55 +371,244 @@ class Backtester:
         # Calculate statistics
         return self._calculate_statistics()
     
-    def _record_trade(self, position, exit_price, pnl, exit_reason):
-        """Record completed trade."""
-        self.trades.append({
-            'entry_price': position['entry'],
-            'exit_price': exit_price,
-            'type': position['type'],
-            'pnl': pnl,
-            'exit_reason': exit_reason,
-            'entry_time': position['entry_time']
-        })
-    
-    def _calculate_statistics(self):
-        """Calculate backtest statistics."""
-        if not self.trades:
-            return {
-                'total_trades': 0,
-                'win_rate': 0,
-                'total_pnl': 0,
-                'final_balance': self.initial_balance
-            }
+    def run_fast(self, df, atr_stop_multiplier=1.5, atr_target_multiplier=None,
+                 trailing_activation=None, trailing_distance=None, sub_bars=None, auto_close=None,
+                 pip_size=0.0001, costs=None):
+        """
+        Array-based equivalent of ``run``: same trades and statistics.
         
-        df_trades = pd.DataFrame(self.trades)
+        Prices, ATR and signals are pulled into NumPy once; each trade is
+        then found with a searchsorted jump to the next signal and a
+        chunked first-hit search for its stop loss / take profit.
         
-        total_trades = len(df_trades)
-        winning_trades = len(df_trades[df_trades['pnl'] > 0])
-        losing_trades = len(df_trades[df_trades['pnl'] < 0])
+        Args:
+            df: DataFrame with 'final_signal' column
+            atr_stop_multiplier: Stop distance in ATRs (RiskManager uses 1.5)
+            atr_target_multiplier: Target distance in ATRs; None for
+                config.TAKE_PROFIT_RATIO times the stop distance, as in ``run``
+            trailing_activation: Profit, in multiples of the stop distance,
+                after which the stop trails price; None disables trailing
+            trailing_distance: Trailing distance in ATRs
+            sub_bars: Optional lower-timeframe data (e.g. M1) covering df, with
+                'high'/'low' columns (or 'price' for ticks) and a DatetimeIndex.
+                When the stop and the target both lie inside an exit bar, the
+                sub-bars of that bar decide which was touched first; without
+                them (or when they cannot tell) the stop is assumed first.
+                Counts are left in ``self.intrabar_stats``.
+            auto_close: Replay PositionManager's auto-close rules at every bar
+                close after entry: True, or a dict of AUTO_CLOSE_RULES
+                overrides. Needs the AUTO_CLOSE_COLUMNS; stops and targets
+                touched inside a bar still come first.
+            pip_size: Price of one pip, for position size and dollar P&L
+            costs: Optional cost_model.CostModel for the symbol. Its spec sets
+                the pip size and pip value; spread, slippage and commission
+                are added to the trade arrays ('cost', 'net_pnl', 'pnl_usd',
+                ...) and the statistics are computed on net P&L.
+        
+        Returns:
+            Dictionary with backtest results
+        """
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        atr = df['atr'].to_numpy(dtype=float)
+        signal = df['final_signal'].to_numpy(dtype=float)
+        n = len(df)
         
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        # NaN signals count as entries, as in run()
+        entries = np.flatnonzero(signal != 0)
         
-        total_pnl = df_trades['pnl'].sum()
-        avg_win = df_trades[df_trades['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-        avg_loss = df_trades[df_trades['pnl'] < 0]['pnl'].mean() if losing_trades > 0 else 0
+        # Stop/target for every candidate entry, as RiskManager computes them
+        is_buy = signal[entries] == 1
+        entry_price = close[entries]
+        stop_distance = atr[entries] * atr_stop_multiplier
+        stop_loss = np.where(is_buy, entry_price - stop_distance, entry_price + stop_distance)
+        if atr_target_multiplier is None:
+            reward = np.abs(entry_price - stop_loss) * config.TAKE_PROFIT_RATIO
+        else:
+            reward = atr[entries] * atr_target_multiplier
+        take_profit = np.where(is_buy, entry_price + reward, entry_price - reward)
         
-        profit_factor = abs(avg_win / avg_loss) if avg_loss != 0 else 0
+        if costs is not None:
+            pip_size = costs.pip_size
+            pip_value = costs.pip_value(entry_price)
+        else:
+            pip_value = np.full(len(entries), float(PIP_VALUE))
         
-        final_balance = self.initial_balance + total_pnl
+        trailing = trailing_activation is not None and trailing_distance is not None
+        if trailing:
+            activation = np.where(is_buy, entry_price + stop_distance * trailing_activation,
+                                  entry_price - stop_distance * trailing_activation)
+            trail = atr[entries] * trailing_distance
         
-        return {
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'profit_factor': profit_factor,
-            'final_balance': final_balance,
-            'return_pct': ((final_balance - self.initial_balance) / self.initial_balance) * 100
+        # Columnar trade record, one slot per possible entry
+        capacity = len(entries)
+        trades = {
+            'entry_index': np.empty(capacity, dtype=np.int64),
+            'exit_index': np.empty(capacity, dtype=np.int64),
+            'entry_price': np.empty(capacity),
+            'exit_price': np.empty(capacity),
+            'is_buy': np.empty(capacity, dtype=bool),
+            'pnl': np.empty(capacity),
+            'size': np.empty(capacity),
+            'stop_loss': np.empty(capacity),
+            'take_profit': np.empty(capacity),
+            'exit_reason': np.empty(capacity, dtype=np.int8)
         }
+        
+        if sub_bars is not None:
+            times = pd.DatetimeIndex(df.index).asi8
+            bar_span = times[-1] - times[-2] if n > 1 else 0
+            sub_times = pd.DatetimeIndex(sub_bars.index).asi8
+            sub_high = sub_bars['high' if 'high' in sub_bars.columns else 'price'].to_numpy(dtype=float)
+            sub_low = sub_bars['low' if 'low' in sub_bars.columns else 'price'].to_numpy(dtype=float)
+            self.intrabar_stats = {'ambiguous': 0, 'target_first': 0, 'stop_first': 0, 'unresolved': 0}
+        
+        if auto_close:
+            missing = [column for column in AUTO_CLOSE_COLUMNS if column not in df.columns]
+            if missing:
+                raise ValueError(f"auto_close needs columns: {', '.join(missing)}")
+            rules = dict(AUTO_CLOSE_RULES, **(auto_close if isinstance(auto_close, dict) else {}))
+            rule_inputs = (df['signal'].to_numpy(dtype=float), df['buy_score'].to_numpy(dtype=float),
+                           df['sell_score'].to_numpy(dtype=float), close_momentum(close, rules['momentum_bars']), atr)
+            # Profit bands per bar for buys and sells; only the profit itself is per trade
+            bands = {buy: close_bands(buy, *rule_inputs, rules=rules) for buy in (True, False)}
+            closed_profit = np.empty(capacity)
+            
+            def close_hit(lo, hi, buy, entry, dollars_per_price):
+                """Bars in [lo, hi) where an auto-close rule fires for one position."""
+                upper, lower = bands[buy]
+                profit = (close[lo:hi] - entry if buy else entry - close[lo:hi]) * dollars_per_price
+                return (profit > upper[lo:hi]) | (profit < lower[lo:hi])
+        
+        count = 0
+        k = 0
+        while k < capacity:
+            i = entries[k]
+            sl, tp, buy = stop_loss[k], take_profit[k], is_buy[k]
+            
+            if trailing:
+                exit_index, exit_price, reason = find_exit(high, low, i + 1, n, buy, sl, tp, activation[k], trail[k])
+            else:
+                exit_index, exit_price, reason = find_exit(high, low, i + 1, n, buy, sl, tp)
+            size = self.risk_manager.calculate_position_size(abs(entry_price[k] - sl) / pip_size, pip_value[k])
+            
+            if auto_close:
+                # Rules run at bar closes, so only bars before the stop/target bar count
+                dollars_per_price = size * pip_value[k] / pip_size
+                end = exit_index if exit_index >= 0 else n
+                close_index = first_hit(lambda lo, hi: close_hit(lo, hi, buy, entry_price[k], dollars_per_price),
+                                        i + 1, end)
+                if close_index >= 0:
+                    # Which rule fired is classified for all auto-closed trades after the loop
+                    exit_index, exit_price, reason = close_index, close[close_index], -1
+                    closed_profit[count] = (exit_price - entry_price[k] if buy else entry_price[k] - exit_price) * dollars_per_price
+            
+            if exit_index < 0:
+                break  # Still open at the end of the data
+            
+            if sub_bars is not None and reason in (0, 2) and (high[exit_index] >= tp if buy else low[exit_index] <= tp):
+                # Stop and target both inside the exit bar: walk only this bar's sub-bars
+                bar_end = times[exit_index + 1] if exit_index + 1 < n else times[exit_index] + bar_span
+                lo, hi = np.searchsorted(sub_times, [times[exit_index], bar_end])
+                target_first = intrabar_target_first(sub_high, sub_low, lo, hi, buy, exit_price, tp)
+                self.intrabar_stats['ambiguous'] += 1
+                if target_first is None:
+                    self.intrabar_stats['unresolved'] += 1
+                elif target_first:
+                    self.intrabar_stats['target_first'] += 1
+                    exit_price, reason = tp, 1
+                else:
+                    self.intrabar_stats['stop_first'] += 1
+            
+            trades['entry_index'][count] = i
+            trades['exit_index'][count] = exit_index
+            trades['entry_price'][count] = entry_price[k]
+            trades['exit_price'][count] = exit_price
+            trades['is_buy'][count] = buy
+            trades['pnl'][count] = exit_price - entry_price[k] if buy else entry_price[k] - exit_price
+            trades['size'][count] = size
+            trades['stop_loss'][count] = sl
+            trades['take_profit'][count] = tp
+            trades['exit_reason'][count] = reason
+            count += 1
+            
+            # No entry on the exit bar; next signal after it
+            k = int(np.searchsorted(entries, exit_index + 1))
+        
+        self.trade_arrays = {name: values[:count] for name, values in trades.items()}
+        self.trade_arrays['entry_time'] = df.index[self.trade_arrays['entry_index']]
+        
+        if auto_close:
+            reason = self.trade_arrays['exit_reason']
+            closed = np.flatnonzero(reason < 0)
+            at = self.trade_arrays['exit_index'][closed]
+            reason[closed] = 2 + auto_close_rules(self.trade_arrays['is_buy'][closed], closed_profit[closed],
+                                                  *[values[at] for values in rule_inputs], rules=rules)
+        
+        if costs is None:
+            return self._calculate_statistics_arrays(self.trade_arrays['pnl'])
+        
+        times = pd.DatetimeIndex(df.index).asi8
+        self.trade_arrays.update(costs.apply(dict(self.trade_arrays,
+                                                  entry_time=times[self.trade_arrays['entry_index']],
+                                                  exit_time=times[self.trade_arrays['exit_index']])))
+        results = self._calculate_statistics_arrays(self.trade_arrays['net_pnl'])
+        results['gross_pnl'] = float(self.trade_arrays['pnl'].sum())
+        results['total_costs'] = float(self.trade_arrays['cost'].sum())
+        results['pnl_usd'] = float(self.trade_arrays['pnl_usd'].sum())
+        return results
+    
+    def _calculate_statistics_arrays(self, pnl):
+        """Same statistics as _calculate_statistics, from a P&L array."""
+        stats = RunningStats()
+        stats.extend(pnl)
+        return stats.summary(self.initial_balance)
+    
+    @property
+    def trades(self):
+        """Trades from the last run() as a list of dicts (built on demand from the trade log)."""
+        return self.trade_log.frame().to_dict('records')
+    
+    def run_signal_matrix(self, df, signals, **kwargs):
+        """
+        run_fast once per row of a signal matrix (e.g. ScalpingStrategy.signal_grid).
+        
+        Args:
+            df: DataFrame with the columns run_fast reads, aligned with the matrix columns
+            signals: Array of shape (combinations, len(df)) used as 'final_signal'
+            **kwargs: run_fast settings shared by every row
+        
+        Returns:
+            List of results dicts, one per row; trade_arrays hold the last row's trades
+        """
+        frame = df.copy()
+        results = []
+        for row in signals:
+            frame['final_signal'] = row
+            results.append(self.run_fast(frame, **kwargs))
+        return results
+    
+    def trades_frame(self):
+        """Trades from the last run_fast() as a DataFrame shaped like ``TradeLog.frame``."""
+        trades = self.trade_arrays
+        return pd.DataFrame({
+            'entry_price': trades['entry_price'],
+            'exit_price': trades['exit_price'],
+            'type': np.where(trades['is_buy'], 'buy', 'sell'),
+            'pnl': trades['pnl'],
+            'exit_reason': np.array(EXIT_REASONS)[trades['exit_reason']],
+            'entry_time': trades['entry_time']
+        })
+    
+    def _record_trade(self, position, exit_price, pnl, exit_reason):
+        """Record completed trade (exit_reason: index into EXIT_REASONS)."""
+        self.trade_log.append(position['entry'], exit_price, position['type'] == 'buy', pnl, exit_reason,
+                              position['entry_time'])
+    
+    def _calculate_statistics(self):
+        """Calculate backtest statistics from the trade log's running totals."""
+        return self.trade_log.stats.summary(self.initial_balance)
     
     def print_results(self, results):
         """Print backtest results."""
@@ -0,0 +1,1327 @@
+"""Parity checks and timings for the performance-oriented code paths.
+
+Usage:
+    python benchmark.py            # run every section
+    python benchmark.py streaming  # run one section
+"""
+
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DataLoader
+from indicators import IndicatorEngine
+
+warnings.filterwarnings('ignore')
+
+# Sections time the computations themselves, so the disk result cache is off
+# unless requested (the 'resultcache' section uses its own directory)
+os.environ.setdefault('RESULT_CACHE', '0')
+
+
+def compare_frames(expected, actual, rtol=1e-7, atol=1e-9):
+    """
+    Return the columns whose values differ between two indicator frames.
+    
+    The tolerance allows for pandas' online rolling variance, which drifts
+    by ~1e-9 relative over tens of thousands of bars.
+    """
+    mismatched = []
+    for col in expected.columns:
+        a = expected[col].to_numpy(dtype=float)
+        b = actual[col].to_numpy(dtype=float)
+        if not np.allclose(a, b, rtol=rtol, atol=atol, equal_nan=True):
+            mismatched.append(col)
+    return mismatched
+
+
+def bench_streaming(periods=1500, warm_up_bars=1000):
+    """StreamingIndicatorEngine vs calculate_all: parity and per-bar cost."""
+    from streaming_indicators import StreamingIndicatorEngine
+    
+    print("\n[streaming] StreamingIndicatorEngine vs IndicatorEngine.calculate_all")
+    df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD')
+    expected = IndicatorEngine(df).calculate_all()
+    
+    engine = StreamingIndicatorEngine()
+    start = time.perf_counter()
+    warm = engine.warm_up(df.iloc[:warm_up_bars])
+    warm_time = time.perf_counter() - start
+    
+    rows = []
+    start = time.perf_counter()
+    for timestamp, bar in df.iloc[warm_up_bars:].iterrows():
+        rows.append(engine.update(bar))
+    update_time = (time.perf_counter() - start) / (periods - warm_up_bars)
+    
+    streamed = pd.concat([warm, pd.DataFrame(rows)])
+    mismatched = compare_frames(expected, streamed)
+    
+    start = time.perf_counter()
+    IndicatorEngine(df.iloc[-500:]).calculate_all()
+    full_time = time.perf_counter() - start
+    
+    print(f"  warm_up({warm_up_bars} bars): {warm_time*1000:.1f} ms")
+    print(f"  update(): {update_time*1e6:.0f} us/bar  vs  calculate_all(500 bars): {full_time*1000:.1f} ms")
+    print(f"  parity: {'OK' if not mismatched else 'MISMATCH ' + ', '.join(mismatched)}")
+    return not mismatched
+
+
+def bench_kernels(sizes=(500, 50000, 1000000), ta_max_bars=50000):
+    """NumPy kernel backend vs ta backend: parity and speed."""
+    print("\n[kernels] IndicatorEngine backend='numpy' vs backend='ta'")
+    ok = True
+    for periods in sizes:
+        df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD')
+        
+        start = time.perf_counter()
+        fast = IndicatorEngine(df, backend='numpy').calculate_all()
+        numpy_time = time.perf_counter() - start
+        
+        if periods > ta_max_bars:
+            print(f"  {periods:>9,} bars: numpy {numpy_time:8.3f} s   ta skipped (> {ta_max_bars:,} bars)")
+            continue
+        
+        start = time.perf_counter()
+        expected = IndicatorEngine(df).calculate_all()
+        ta_time = time.perf_counter() - start
+        
+        mismatched = compare_frames(expected, fast)
+        ok = ok and not mismatched
+        print(f"  {periods:>9,} bars: numpy {numpy_time:8.3f} s   ta {ta_time:8.3f} s   "
+              f"speedup {ta_time / numpy_time:6.1f}x   parity {'OK' if not mismatched else mismatched}")
+    return ok
+
+
+def bench_selective(periods=5000):
+    """IndicatorEngine.calculate(columns) vs calculate_all for each consumer."""
+    from indicators import required_columns
+    from scalping_strategy import ScalpingStrategy
+    from signal_generator import SignalGenerator
+    
+    print("\n[selective] IndicatorEngine.calculate(required_columns(...)) vs calculate_all")
+    df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD')
+    ok = True
+    for backend in IndicatorEngine.BACKENDS:
+        start = time.perf_counter()
+        expected = IndicatorEngine(df, backend=backend).calculate_all()
+        full_time = time.perf_counter() - start
+        
+        for consumer in (ScalpingStrategy, SignalGenerator):
+            columns = required_columns(consumer)
+            start = time.perf_counter()
+            subset = IndicatorEngine(df, backend=backend).calculate(columns)
+            subset_time = time.perf_counter() - start
+            
+            mismatched = compare_frames(expected[subset.columns], subset)
+            ok = ok and not mismatched
+            print(f"  {backend:>5} {consumer.__name__:<17} {len(subset.columns) - len(df.columns):>2} cols "
+                  f"{subset_time*1000:7.1f} ms  vs  all {len(expected.columns) - len(df.columns)} cols "
+                  f"{full_time*1000:7.1f} ms   parity {'OK' if not mismatched else mismatched}")
+    return ok
+
+
+def bench_batch(n_symbols=12, periods=500):
+    """calculate_frames over a symbol universe vs one IndicatorEngine per symbol."""
+    from indicators import calculate_frames
+    
+    print(f"\n[batch] calculate_frames({n_symbols} symbols x {periods} bars) vs per-symbol calculate_all")
+    loader = DataLoader()
+    frames = {}
+    for i in range(n_symbols):
+        df = loader.generate_sample_data(periods=periods, pair='EURUSD')
+        # Distinct but reproducible series per symbol
+        rng = np.random.default_rng(i)
+        drift = np.cumprod(1 + rng.normal(0, 0.0005, periods))
+        for col in ('open', 'high', 'low', 'close'):
+            df[col] = df[col] * drift * (1 + i / 10)
+        frames[f'SYM{i:02d}'] = df
+    # A symbol without tick volume must not change the other symbols' columns
+    frames[f'SYM{n_symbols - 1:02d}']['volume'] = 0
+    
+    start = time.perf_counter()
+    expected = {symbol: IndicatorEngine(df).calculate_all() for symbol, df in frames.items()}
+    loop_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    numpy_loop = {symbol: IndicatorEngine(df, backend='numpy').calculate_all() for symbol, df in frames.items()}
+    numpy_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batched = calculate_frames(frames)
+    batch_time = time.perf_counter() - start
+    
+    mismatched = sorted(set(col for symbol in frames for col in compare_frames(expected[symbol], batched[symbol])))
+    if any(list(expected[symbol].columns) != list(batched[symbol].columns) for symbol in frames):
+        mismatched.append('column set')
+    print(f"  per-symbol ta: {loop_time*1000:.1f} ms   per-symbol numpy: {numpy_time*1000:.1f} ms   "
+          f"batch: {batch_time*1000:.1f} ms   single symbol numpy: {numpy_time/n_symbols*1000:.1f} ms")
+    print(f"  parity: {'OK' if not mismatched else 'MISMATCH ' + ', '.join(mismatched)}")
+    return not mismatched
+
+
+def bench_cache(window=500, new_bars=20, pairs=('EURUSD', 'GBPUSD', 'USDJPY')):
+    """AnalysisCache: sliding broker windows vs recomputing every request."""
+    from analysis_cache import AnalysisCache
+    from indicators import required_columns
+    from scalping_strategy import ScalpingStrategy
+    
+    print(f"\n[cache] AnalysisCache over {new_bars} new bars x {len(pairs)} pairs ({window}-bar windows)")
+    history = {pair: DataLoader().generate_sample_data(periods=window + new_bars, pair=pair) for pair in pairs}
+    cache = AnalysisCache()
+    columns = required_columns(ScalpingStrategy)
+    timings = {'batch': [], 'extend': [], 'hit': [], 'selective': [], 'recompute': []}
+    mismatched = set()
+    
+    for end in range(window, window + new_bars + 1):
+        frames = {pair: df.iloc[end - window:end] for pair, df in history.items()}
+        
+        start = time.perf_counter()
+        first = cache.indicators_batch('demo', 'H1', frames)
+        timings['batch' if end == window else 'extend'].append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for pair, df in frames.items():
+            cache.indicators('demo', pair, 'H1', df)
+        timings['hit'].append(time.perf_counter() - start)
+        
+        # Only the strategy's columns, on their own streams
+        start = time.perf_counter()
+        selective = cache.indicators_batch('demo', 'H1', frames, columns=columns)
+        timings['selective'].append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        expected = {pair: IndicatorEngine(df).calculate_all() for pair, df in frames.items()}
+        timings['recompute'].append(time.perf_counter() - start)
+        
+        # Indicators with a recursive warm-up only agree once converged
+        for pair in pairs:
+            mismatched.update(compare_frames(expected[pair].iloc[-50:], first[pair].iloc[-50:]))
+            selected = IndicatorEngine(frames[pair].iloc[:1], backend='numpy').calculate(columns).columns
+            if list(selective[pair].columns) != list(selected):
+                mismatched.add('selective column set')
+            mismatched.update(compare_frames(expected[pair][selected].iloc[-50:], selective[pair].iloc[-50:]))
+    
+    for name, values in timings.items():
+        print(f"  {name:>9}: {np.mean(values)*1000:8.2f} ms per {len(pairs)} pairs")
+    print(f"  stats: {cache.stats()}")
+    print(f"  parity (last 50 bars): {'OK' if not mismatched else 'MISMATCH ' + ', '.join(sorted(mismatched))}")
+    return not mismatched
+
+
+def bench_lookback(periods=3000, step=37):
+    """plan_bars(): latest signals from the planned fetch vs from the full history."""
+    from lookback import plan_bars
+    from scalping_strategy import ScalpingStrategy
+    from pattern_recognition import PatternRecognizer
+    from advanced_ml_model import AdvancedTradingModel
+    
+    strategy = ScalpingStrategy()
+    bars = plan_bars(strategy, AdvancedTradingModel(), PatternRecognizer())
+    print(f"\n[lookback] plan_bars(ScalpingStrategy, untrained model, patterns) = {bars} bars")
+    
+    df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD')
+    full = IndicatorEngine(df, backend='numpy').calculate_all()
+    changed = 0
+    checks = 0
+    for end in range(1000, periods, step):
+        window = IndicatorEngine(df.iloc[end - bars:end], backend='numpy').calculate_all()
+        expected = strategy.analyze_scalping_opportunity(full.iloc[:end])
+        actual = strategy.analyze_scalping_opportunity(window)
+        checks += 1
+        changed += any(e.iloc[-1] != a.iloc[-1] for e, a in zip(expected, actual))
+    
+    print(f"  latest signal/buy/sell scores changed at {changed} of {checks} bars")
+    return changed == 0
+
+
+def _double_extreme_loop(prices, window=20, mode='min'):
+    """Reference per-bar loop (the original detect_double_bottom/top scan)."""
+    rolling = prices.rolling(window).min() if mode == 'min' else prices.rolling(window).max()
+    is_extreme = prices == rolling
+    result = pd.Series(False, index=prices.index)
+    for i in range(window, len(prices)):
+        if is_extreme.iloc[i]:
+            previous = prices.iloc[i-window:i][is_extreme.iloc[i-window:i]]
+            if len(previous) > 0:
+                closest = previous.iloc[-1]
+                if abs(prices.iloc[i] - closest) / closest < 0.002:
+                    result.iloc[i] = True
+    return result
+
+
+def bench_patterns(periods=100000):
+    """Vectorized double top/bottom vs the per-bar loop, and analyze_patterns cost."""
+    from pattern_recognition import PatternRecognizer
+    
+    print(f"\n[patterns] double top/bottom on {periods:,} bars")
+    df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD').round(4)
+    recognizer = PatternRecognizer()
+    ok = True
+    for name, column, mode in (('double_bottom', 'low', 'min'), ('double_top', 'high', 'max')):
+        start = time.perf_counter()
+        expected = _double_extreme_loop(df[column], mode=mode)
+        loop_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        actual = getattr(recognizer, f'detect_{name}')(df)
+        fast_time = time.perf_counter() - start
+        
+        same = expected.equals(actual)
+        ok = ok and same
+        print(f"  {name:>13}: loop {loop_time:7.3f} s   vectorized {fast_time*1000:7.1f} ms   "
+              f"speedup {loop_time / fast_time:7.0f}x   parity {'OK' if same else 'MISMATCH'} ({int(actual.sum())} hits)")
+    
+    start = time.perf_counter()
+    recognizer.analyze_patterns(df)
+    print(f"  analyze_patterns: {(time.perf_counter() - start)*1000:.1f} ms")
+    return ok
+
+
+def bench_tail(sizes=(400, 100000), tail=1, repeat=5):
+    """Pattern/strategy scoring in tail mode vs over the whole frame."""
+    from scalping_strategy import ScalpingStrategy
+    
+    print(f"\n[tail] analyze_scalping_opportunity + filter_scalping_signals, tail={tail} vs full frame")
+    strategy = ScalpingStrategy()
+    ok = True
+    for periods in sizes:
+        df = IndicatorEngine(DataLoader().generate_sample_data(periods=periods, pair='EURUSD'),
+                             backend='numpy').calculate_all()
+        
+        start = time.perf_counter()
+        for _ in range(repeat):
+            full = strategy.analyze_scalping_opportunity(df)
+            full_filtered = strategy.filter_scalping_signals(df, full[0])
+        full_time = (time.perf_counter() - start) / repeat
+        
+        start = time.perf_counter()
+        for _ in range(repeat):
+            last = strategy.analyze_scalping_opportunity(df, tail=tail)
+            last_filtered = strategy.filter_scalping_signals(df, last[0], tail=tail)
+        tail_time = (time.perf_counter() - start) / repeat
+        
+        same = all(a.iloc[-tail:].equals(b) for a, b in zip(full, last))
+        same = same and full_filtered.iloc[-tail:].equals(last_filtered)
+        ok = ok and same
+        print(f"  {periods:>9,} bars: full {full_time*1000:8.1f} ms   tail {tail_time*1000:6.1f} ms   "
+              f"parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+def _signal_frame(periods, density=0.05, seed=0):
+    """Indicator frame with a reproducible random final_signal column."""
+    df = IndicatorEngine(DataLoader().generate_sample_data(periods=periods, pair='EURUSD'),
+                         backend='numpy').calculate_all()
+    rng = np.random.default_rng(seed)
+    df['final_signal'] = rng.choice([-1, 0, 1], len(df), p=[density / 2, 1 - density, density / 2])
+    return df
+
+
+def bench_backtest(sizes=(50000, 1000000), run_max_bars=50000):
+    """Backtester.run_fast vs Backtester.run: identical results and speed."""
+    from backtester import Backtester
+    
+    print("\n[backtest] Backtester.run_fast vs Backtester.run")
+    ok = True
+    for periods in sizes:
+        df = _signal_frame(periods)
+        
+        fast = Backtester()
+        start = time.perf_counter()
+        fast_results = fast.run_fast(df)
+        fast_time = time.perf_counter() - start
+        
+        if periods > run_max_bars:
+            print(f"  {periods:>9,} bars: run_fast {fast_time:7.3f} s   run skipped (> {run_max_bars:,} bars)   "
+                  f"{fast_results['total_trades']} trades")
+            continue
+        
+        slow = Backtester()
+        start = time.perf_counter()
+        slow_results = slow.run(df)
+        slow_time = time.perf_counter() - start
+        
+        same = slow_results == fast_results and slow.trade_log.frame().equals(fast.trades_frame())
+        ok = ok and same
+        print(f"  {periods:>9,} bars: run_fast {fast_time:7.3f} s   run {slow_time:7.3f} s   "
+              f"speedup {slow_time / fast_time:6.0f}x   {fast_results['total_trades']} trades   "
+              f"parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+def bench_runner(bars=3000):
+    """Deployment universe through backtest_runner: serial vs process pool, same report."""
+    from backtest_runner import deployment_jobs, run_backtests, portfolio_report
+    from scalping_strategy import ScalpingStrategy
+    
+    # Default entry rules: the deployment's stricter ones rarely fire on sample data
+    jobs = deployment_jobs(strategy=ScalpingStrategy.DEFAULT_PARAMS)
+    print(f"\n[runner] {len(jobs)} deployment jobs x {bars:,} bars ({os.cpu_count()} cores)")
+    reports = []
+    for count in (1, max(2, os.cpu_count() or 1)):
+        start = time.perf_counter()
+        report = portfolio_report(run_backtests(jobs, bars=bars, workers=count))
+        elapsed = time.perf_counter() - start
+        reports.append(report)
+        print(f"  workers={count:>3}: {elapsed:6.2f} s   "
+              f"{report['summary']['total_trades']} trades   {report['summary']['pnl_pips']:.1f} pips")
+    
+    first = reports[0]['jobs'].drop(columns=['seconds'])
+    same = all(first.equals(report['jobs'].drop(columns=['seconds'])) for report in reports[1:])
+    print(f"  parity {'OK' if same else 'MISMATCH'}")
+    return same
+
+
+def bench_optimizer(bars=4000, trials=30):
+    """Optimizer evaluations on cached scores vs the full per-trial pipeline."""
+    from backtest_runner import load_prices, share_prices, release_prices, build_signals, split_strategy
+    from backtester import Backtester
+    from cost_model import CostModel
+    from optimizer import sample_configs, evaluate
+    
+    print(f"\n[optimizer] {trials} configs on one {bars:,}-bar series, cached scores vs full pipeline")
+    df = load_prices('EURUSD', 'H1', bars)
+    block, spec = share_prices(df)
+    series = {'symbol': 'EURUSD', 'timeframe': 'H1', 'spec': spec, 'split': len(df)}
+    configs = sample_configs(trials, seed=0)
+    ok = True
+    try:
+        evaluate({}, series)  # Build the score cache
+        start = time.perf_counter()
+        cached = [evaluate(config, series) for config in configs]
+        cached_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        full = []
+        for config in configs:
+            backtester = Backtester()
+            costs = CostModel('EURUSD')
+            backtester.run_fast(build_signals(df, dict(config, name='scalping')), pip_size=costs.pip_size, costs=costs,
+                                **split_strategy(config)[1])
+            full.append(backtester.trade_arrays['net_pips'])
+        full_time = time.perf_counter() - start
+        
+        for metrics, net_pips in zip(cached, full):
+            ok = ok and metrics['trades'] == len(net_pips) and np.isclose(metrics['pnl_pips'], net_pips.sum())
+    finally:
+        release_prices([block])
+    
+    print(f"  cached {cached_time / trials * 1000:7.1f} ms/config   full {full_time / trials * 1000:7.1f} ms/config   "
+          f"speedup {full_time / cached_time:5.1f}x   parity {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+def bench_walkforward(periods=3500, train_bars=1000, test_bars=500):
+    """Walk-forward: features once vs per fold, and serial vs pooled folds."""
+    from walk_forward import WalkForward, make_folds
+    
+    print(f"\n[walkforward] {periods:,} bars, {train_bars} train / {test_bars} test")
+    df = DataLoader().generate_sample_data(periods=periods)
+    engine = WalkForward(train_bars=train_bars, test_bars=test_bars, retrain_every=2, workers=1)
+    
+    start = time.perf_counter()
+    engine.prepare(df)
+    once_time = time.perf_counter() - start
+    
+    folds = make_folds(len(df), train_bars, test_bars)
+    start = time.perf_counter()
+    for train_start, _, _, test_end in folds:
+        engine.prepare(df.iloc[train_start:test_end])
+    per_fold_time = time.perf_counter() - start
+    print(f"  features: once {once_time:6.3f} s   per fold {per_fold_time:6.3f} s ({len(folds)} folds)")
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        serial = engine.run(df)
+        engine.workers = max(2, os.cpu_count() or 1)
+        pooled = engine.run(df)
+    same = serial['folds'].equals(pooled['folds']) and serial['trades'].equals(pooled['trades'])
+    print(f"  folds: serial {serial['summary']['seconds']:6.2f} s   {engine.workers} workers "
+          f"{pooled['summary']['seconds']:6.2f} s   parity {'OK' if same else 'MISMATCH'}")
+    return same
+
+
+def _minute_bars(hours, seed=1):
+    """Random-walk M1 bars and the H1 bars they aggregate to."""
+    rng = np.random.default_rng(seed)
+    minutes = hours * 60
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.0004, minutes)))
+    open_ = np.r_[close[0], close[:-1]]
+    noise = np.abs(rng.normal(0, 0.0002, minutes))
+    m1 = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + noise,
+        'low': np.minimum(open_, close) - noise,
+        'close': close,
+        'volume': 1.0
+    }, index=pd.date_range('2024-01-01', periods=minutes, freq='min'))
+    h1 = m1.resample('H').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return m1, h1
+
+
+def _sub_bar_exits(trades, df, sub_bars):
+    """Reference: walk every sub-bar after each entry to its first stop/target touch."""
+    sub_high = sub_bars['high'].to_numpy()
+    sub_low = sub_bars['low'].to_numpy()
+    sub_times = sub_bars.index.asi8
+    bar_times = df.index.asi8
+    span = bar_times[1] - bar_times[0]
+    exits = []
+    for k in range(len(trades['pnl'])):
+        buy, stop, target = trades['is_buy'][k], trades['stop_loss'][k], trades['take_profit'][k]
+        for q in range(np.searchsorted(sub_times, bar_times[trades['entry_index'][k]] + span), len(sub_times)):
+            stop_hit = sub_low[q] <= stop if buy else sub_high[q] >= stop
+            if stop_hit or (sub_high[q] >= target if buy else sub_low[q] <= target):
+                exits.append((np.searchsorted(bar_times, sub_times[q], side='right') - 1, stop if stop_hit else target))
+                break
+    return exits
+
+
+def bench_intrabar(hours=5000, multiplier=0.4):
+    """run_fast with M1 sub-bars vs walking M1 from every entry: same exits."""
+    from backtester import Backtester
+    
+    print(f"\n[intrabar] {hours:,} H1 bars with M1 sub-bars, stop/target {multiplier} ATR")
+    m1, h1 = _minute_bars(hours)
+    df = IndicatorEngine(h1, backend='numpy').calculate(['atr'])
+    df['final_signal'] = np.random.default_rng(0).choice([-1, 0, 1], len(df), p=[0.05, 0.9, 0.05])
+    params = {'atr_stop_multiplier': multiplier, 'atr_target_multiplier': multiplier}
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        plain = Backtester()
+        plain_results = plain.run_fast(df, **params)
+        start = time.perf_counter()
+        intrabar = Backtester()
+        intrabar_results = intrabar.run_fast(df, sub_bars=m1, **params)
+        intrabar_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    reference = _sub_bar_exits(intrabar.trade_arrays, df, m1)
+    walk_time = time.perf_counter() - start
+    trades = intrabar.trade_arrays
+    same = reference == list(zip(trades['exit_index'].tolist(), trades['exit_price'].tolist()))
+    
+    stats = intrabar.intrabar_stats
+    print(f"  {stats['ambiguous']} ambiguous exits: {stats['target_first']} target first, "
+          f"{stats['stop_first']} stop first, {stats['unresolved']} unresolved")
+    print(f"  P&L bar-level (stop first) {plain_results['total_pnl']:.5f}   with sub-bars {intrabar_results['total_pnl']:.5f}")
+    print(f"  run_fast+sub_bars {intrabar_time:6.3f} s   M1 reference walk {walk_time:6.3f} s   "
+          f"parity {'OK' if same else 'MISMATCH'}")
+    return same
+
+
+def _event_frames(symbols, periods, density=0.05):
+    """Indicator frames with random final_signal columns, one per symbol, on a shared clock."""
+    frames = {}
+    for number, symbol in enumerate(symbols):
+        df = DataLoader().generate_sample_data(periods=periods, pair=symbol, seed=number)
+        df = IndicatorEngine(df, backend='numpy').calculate(['atr']).iloc[100:]
+        rng = np.random.default_rng(number)
+        df['final_signal'] = rng.choice([-1, 0, 1], len(df), p=[density / 2, 1 - density, density / 2])
+        frames[symbol] = df
+    return frames
+
+
+def _event_reference(frames, engine):
+    """EventBacktester rules walked bar by bar over every open position."""
+    symbols = list(frames)
+    clock = sorted(set().union(*(frame.index for frame in frames.values())))
+    partial = engine.partial_close
+    fraction = partial.get('fraction', 0.5) if partial else 0
+    positions = []
+    day_counts = {}
+    trades = []
+    for time_ in clock:
+        closed_on = set()
+        for position in list(positions):
+            df = frames[position['symbol']]
+            if time_ not in df.index:
+                continue
+            sign = position['sign']
+            best = df.at[time_, 'high'] if sign > 0 else -df.at[time_, 'low']
+            worst = df.at[time_, 'low'] if sign > 0 else -df.at[time_, 'high']
+            exit_price = None
+            if worst <= position['stop']:
+                exit_price = sign * position['stop']
+            else:
+                if position['partial'] is not None and not position['partial_done'] and best >= position['partial']:
+                    position['partial_done'] = True
+                if best >= position['target']:
+                    exit_price = sign * position['target']
+            if exit_price is not None:
+                move = sign * (exit_price - position['entry'])
+                if position['partial_done']:
+                    move = fraction * (position['partial'] - sign * position['entry']) + (1 - fraction) * move
+                trades.append((position['symbol'], position['entry_time'], time_, round(move, 10)))
+                positions.remove(position)
+                closed_on.add(position['symbol'])
+                continue
+            position['peak'] = max(position['peak'], best)
+            if position['activation'] is not None and position['peak'] >= position['activation']:
+                position['stop'] = max(position['stop'], position['peak'] - position['distance'])
+        
+        for symbol in symbols:
+            df = frames[symbol]
+            if time_ not in df.index or df.at[time_, 'final_signal'] == 0 or symbol in closed_on:
+                continue
+            if sum(p['symbol'] == symbol for p in positions) >= engine.max_per_symbol:
+                continue
+            day = time_.normalize()
+            if len(positions) >= engine.max_positions or (
+                    engine.max_trades_per_day is not None and day_counts.get(day, 0) >= engine.max_trades_per_day):
+                continue
+            buy = df.at[time_, 'final_signal'] == 1
+            entry = df.at[time_, 'close']
+            stop_loss, take_profit, activation, distance, partial_price = engine._levels(entry, df.at[time_, 'atr'], buy)
+            sign = 1.0 if buy else -1.0
+            day_counts[day] = day_counts.get(day, 0) + 1
+            positions.append({'symbol': symbol, 'entry_time': time_, 'entry': entry, 'sign': sign,
+                              'stop': sign * stop_loss, 'target': sign * take_profit, 'peak': -np.inf,
+                              'activation': None if activation is None else sign * activation, 'distance': distance,
+                              'partial': None if partial_price is None else sign * partial_price,
+                              'partial_done': False})
+    return sorted(trades, key=lambda trade: (trade[1], symbols.index(trade[0])))
+
+
+def bench_events(periods=3000, symbols=('EURUSD', 'GBPUSD', 'USDJPY', 'XAUUSD', 'AUDUSD', 'USDCAD'),
+                 scale_symbols=40, scale_periods=20000):
+    """EventBacktester vs run_fast (one position) and vs a bar-by-bar book (portfolio)."""
+    from backtester import Backtester
+    from event_backtester import EventBacktester
+    
+    print(f"\n[events] EventBacktester, {len(symbols)} symbols x {periods:,} bars")
+    ok = True
+    frames = _event_frames(symbols, periods)
+    for exits in ({}, {'trailing_activation': 1.0, 'trailing_distance': 0.5}):
+        fast = Backtester()
+        fast_results = fast.run_fast(frames['EURUSD'], **exits)
+        events = EventBacktester(max_positions=1, **exits)
+        event_results = events.run({'EURUSD': frames['EURUSD']})
+        same = (event_results['total_pnl'] == fast_results['total_pnl']
+                and np.array_equal(events.trade_arrays['exit_index'], fast.trade_arrays['exit_index']))
+        ok = ok and same
+        print(f"  single position {'trailing' if exits else 'fixed   '}: {event_results['total_trades']} trades   "
+              f"run_fast parity {'OK' if same else 'MISMATCH'}")
+    
+    settings = {'max_positions': 4, 'max_per_symbol': 2, 'max_trades_per_day': 12,
+                'trailing_activation': 1.0, 'trailing_distance': 0.8,
+                'partial_close': {'enabled': True, 'first_target': 1.0, 'second_target': 2.5}}
+    engine = EventBacktester(**settings)
+    start = time.perf_counter()
+    results = engine.run(frames)
+    event_time = time.perf_counter() - start
+    trades = engine.trades_frame()
+    actual = list(zip(trades['symbol'], trades['entry_time'], trades['exit_time'], trades['pnl'].round(10)))
+    start = time.perf_counter()
+    reference = _event_reference(frames, engine)
+    reference_time = time.perf_counter() - start
+    same = actual == reference
+    ok = ok and same
+    print(f"  portfolio: {results['total_trades']} trades, {results['partial_closes']} partial closes, "
+          f"max {results['max_open_positions']} open, {results['skipped_entries']} entries skipped")
+    print(f"  EventBacktester {event_time:6.3f} s   bar-by-bar book {reference_time:6.3f} s   "
+          f"parity {'OK' if same else 'MISMATCH'}")
+    
+    pairs = [f"SYM{number:02d}" for number in range(scale_symbols)]
+    frames = _event_frames(pairs, scale_periods, density=0.02)
+    engine = EventBacktester(**dict(settings, max_positions=scale_symbols, max_trades_per_day=None))
+    start = time.perf_counter()
+    results = engine.run(frames)
+    print(f"  {scale_symbols} symbols x {scale_periods:,} bars: {time.perf_counter() - start:6.3f} s   "
+          f"{results['total_trades']} trades, max {results['max_open_positions']} open")
+    return ok
+
+
+def _auto_close_reference(df, backtester):
+    """Bar-by-bar replay of PositionManager's original if/elif close rules over run_fast's entries."""
+    high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+    atr, signal = df['atr'].to_numpy(), df['signal'].to_numpy()
+    buy_score, sell_score = df['buy_score'].to_numpy(), df['sell_score'].to_numpy()
+    trades = backtester.trade_arrays
+    exits = []
+    for i, buy, entry, sl, tp, size in zip(trades['entry_index'], trades['is_buy'], trades['entry_price'],
+                                           trades['stop_loss'], trades['take_profit'], trades['size']):
+        for t in range(i + 1, len(df)):
+            if (low[t] <= sl) if buy else (high[t] >= sl):
+                exits.append((t, sl))
+                break
+            if (high[t] >= tp) if buy else (low[t] <= tp):
+                exits.append((t, tp))
+                break
+            profit = (close[t] - entry if buy else entry - close[t]) * 10000 * 10 * size
+            should_close = False
+            if profit > 0:
+                if buy and signal[t] == -1 or not buy and signal[t] == 1:
+                    should_close = True
+                elif profit > 2 and t >= 4 and abs(close[t] - close[t - 4]) < atr[t] * 0.3:
+                    should_close = True
+            elif profit < -10:
+                should_close = True
+            elif profit < -7:
+                if buy and signal[t] == -1 and sell_score[t] > buy_score[t] + 3:
+                    should_close = True
+                elif not buy and signal[t] == 1 and buy_score[t] > sell_score[t] + 3:
+                    should_close = True
+            if should_close:
+                exits.append((t, close[t]))
+                break
+    return exits
+
+
+def bench_autoclose(bars=100000):
+    """run_fast with PositionManager's auto-close rules vs a bar-by-bar replay; effect on P&L."""
+    from backtest_runner import build_signals
+    from backtester import Backtester
+    from scalping_strategy import ScalpingStrategy
+    
+    print(f"\n[autoclose] PositionManager auto-close rules over {bars:,} M5 bars (~{bars / 288 / 30:.0f} months)")
+    df = DataLoader().generate_sample_data(periods=bars, pair='EURUSD', freq='5min')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        df = build_signals(df, dict(ScalpingStrategy.DEFAULT_PARAMS, name='scalping'))
+    
+    plain = Backtester()
+    start = time.perf_counter()
+    plain_results = plain.run_fast(df)
+    plain_time = time.perf_counter() - start
+    backtester = Backtester()
+    start = time.perf_counter()
+    results = backtester.run_fast(df, auto_close=True)
+    fast_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    reference = _auto_close_reference(df, backtester)
+    reference_time = time.perf_counter() - start
+    trades = backtester.trade_arrays
+    same = reference == list(zip(trades['exit_index'].tolist(), trades['exit_price'].tolist()))
+    
+    reasons = backtester.trades_frame()['exit_reason'].value_counts()
+    print(f"  exits: " + ", ".join(f"{reason} {count}" for reason, count in reasons.items()))
+    print(f"  without rules: {plain_results['total_trades']} trades, win rate {plain_results['win_rate']:.1f}%, "
+          f"P&L {plain_results['total_pnl']:.5f}")
+    print(f"  with rules:    {results['total_trades']} trades, win rate {results['win_rate']:.1f}%, "
+          f"P&L {results['total_pnl']:.5f}")
+    print(f"  run_fast {plain_time:6.3f} s   run_fast+auto_close {fast_time:6.3f} s   "
+          f"bar-by-bar check {reference_time:6.3f} s   parity {'OK' if same else 'MISMATCH'}")
+    return same
+
+
+def _path_reference(paths, initial_balance, ruin_balance):
+    """Per-path float64 loop over resampled P&L rows: final balance, max drawdown (abs, %) and ruin."""
+    rows = []
+    for path in paths.astype(float):
+        balance = peak = initial_balance
+        drawdown = drawdown_pct = 0.0
+        ruined = False
+        for pnl in path:
+            balance += pnl
+            peak = max(peak, balance)
+            drawdown = max(drawdown, peak - balance)
+            drawdown_pct = max(drawdown_pct, (peak - balance) / peak * 100)
+            ruined = ruined or balance <= ruin_balance
+        rows.append((balance, drawdown, drawdown_pct, ruined))
+    return np.array(rows)
+
+
+def bench_montecarlo(sizes=((10000, 10000), (100000, 1000)), check=(600, 2000)):
+    """monte_carlo vs a per-path loop on the same draws; resampling throughput."""
+    import monte_carlo
+    
+    print("\n[montecarlo] Trade-sequence resampling")
+    pnl = np.random.default_rng(1).normal(4, 60, 10000)
+    ok = True
+    for method in monte_carlo.METHODS:
+        resamples, trades = check
+        result = monte_carlo.monte_carlo(pnl[:trades], resamples, method, initial_balance=2000, seed=3)
+        rng = np.random.default_rng(3)
+        paths = monte_carlo.resample_block(pnl[:trades].astype(np.float32), resamples, trades, method, rng)
+        reference = _path_reference(paths, 2000, 1000)
+        same = (np.allclose(result['final_balance'], reference[:, 0], rtol=1e-6)
+                and np.allclose(result['max_drawdown'], reference[:, 1], rtol=1e-4, atol=1e-2)
+                and np.allclose(result['max_drawdown_pct'], reference[:, 2], rtol=1e-4, atol=1e-4)
+                and np.array_equal(result['ruined'], reference[:, 3].astype(bool)))
+        ok = ok and same
+        print(f"  {method:<9} {resamples} x {trades} trades: risk of ruin {result['risk_of_ruin']:.1%}   "
+              f"parity {'OK' if same else 'MISMATCH'}")
+    
+    for resamples, trades in sizes:
+        for method in monte_carlo.METHODS:
+            start = time.perf_counter()
+            result = monte_carlo.monte_carlo(pnl[:trades], resamples, method, seed=0)
+            elapsed = time.perf_counter() - start
+            summary = monte_carlo.summarize(result)
+            print(f"  {method:<9} {resamples:>7,} x {trades:>6,} trades: {elapsed:6.2f} s "
+                  f"({elapsed / (resamples * trades) * 1e9:4.1f} ns/trade)   "
+                  f"max DD p50/p95 {summary['max_drawdown'][50]:7.0f}/{summary['max_drawdown'][95]:7.0f}   "
+                  f"P(loss) {summary['prob_loss']:.1%}")
+    return ok
+
+
+def _cost_reference(model, trades):
+    """Per-trade loop over CostModel's rules: (cost, net pips, USD P&L)."""
+    from cost_model import QUOTE_USD
+    
+    rows = []
+    for buy, entry_time, exit_time, exit_price, pnl, size, reason in zip(
+            trades['is_buy'], trades['entry_time'], trades['exit_time'], trades['exit_price'],
+            trades['pnl'], trades['size'], trades['exit_reason']):
+        hour = pd.Timestamp(entry_time if buy else exit_time).hour
+        cost = model.spread_pips * model.pip_size * model.session_spread[hour]
+        cost += model.slippage_pips * model.pip_size * (1 if reason == 1 else 2)
+        if model.symbol.endswith('USD'):
+            usd_per_quote = 1.0
+        elif model.symbol.startswith('USD'):
+            usd_per_quote = 1.0 / exit_price
+        else:
+            usd_per_quote = QUOTE_USD[model.symbol[3:6]]
+        usd = (pnl - cost) * model.contract_size * size * usd_per_quote - model.commission_per_lot * size
+        rows.append((cost, (pnl - cost) / model.pip_size, usd))
+    return np.array(rows)
+
+
+def bench_costs(periods=20000, trades=1000000, symbols=('EURUSD', 'USDJPY', 'XAUUSD', 'GBPJPY')):
+    """CostModel vs a per-trade loop; gross vs net results per symbol."""
+    from backtester import Backtester
+    from cost_model import CostModel
+    
+    print(f"\n[costs] Spread / slippage / commission on {trades:,} synthetic trades and {periods:,}-bar backtests")
+    rng = np.random.default_rng(0)
+    model = CostModel('USDJPY')
+    synthetic = {
+        'is_buy': rng.random(trades) < 0.5,
+        'entry_time': pd.Timestamp('2024-01-01').value + rng.integers(0, 365 * 24, trades) * 3600 * 10 ** 9,
+        'exit_price': rng.uniform(140, 160, trades),
+        'pnl': rng.normal(0, 0.2, trades),
+        'size': rng.uniform(0.01, 2, trades),
+        'exit_reason': rng.integers(0, 3, trades)
+    }
+    synthetic['exit_time'] = synthetic['entry_time'] + rng.integers(1, 48, trades) * 3600 * 10 ** 9
+    start = time.perf_counter()
+    applied = model.apply(synthetic)
+    vector_time = time.perf_counter() - start
+    sample = 20000
+    start = time.perf_counter()
+    reference = _cost_reference(model, {name: values[:sample] for name, values in synthetic.items()})
+    loop_time = (time.perf_counter() - start) * trades / sample
+    ok = (np.allclose(applied['cost'][:sample], reference[:, 0]) and np.allclose(applied['net_pips'][:sample], reference[:, 1])
+          and np.allclose(applied['pnl_usd'][:sample], reference[:, 2]))
+    print(f"  CostModel.apply {vector_time:6.3f} s   per-trade loop ~{loop_time:6.1f} s (from {sample:,} trades)   "
+          f"parity {'OK' if ok else 'MISMATCH'}")
+    
+    for number, symbol in enumerate(symbols):
+        df = IndicatorEngine(DataLoader().generate_sample_data(periods=periods, pair=symbol, seed=number),
+                             backend='numpy').calculate(['atr']).iloc[100:]
+        df['final_signal'] = np.random.default_rng(number).choice([-1, 0, 1], len(df), p=[0.025, 0.95, 0.025])
+        model = CostModel(symbol)
+        backtester = Backtester()
+        results = backtester.run_fast(df, costs=model)
+        arrays = backtester.trade_arrays
+        same = np.allclose(_cost_reference(model, dict(arrays, entry_time=df.index[arrays['entry_index']],
+                                                       exit_time=df.index[arrays['exit_index']]))[:, 2],
+                           arrays['pnl_usd'])
+        ok = ok and same
+        print(f"  {symbol}: {results['total_trades']:5} trades   gross {arrays['pnl'].sum() / model.pip_size:10.0f} pips   "
+              f"net {arrays['net_pips'].sum():10.0f} pips   cost {arrays['cost'].mean() / model.pip_size:4.2f} pips/trade   "
+              f"net ${results['pnl_usd']:12,.0f}   parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+def bench_tradelog(trades=100000):
+    """TradeLog vs a list of trade dicts: memory, statistics cost and parity."""
+    import tracemalloc
+    from backtester import Backtester, EXIT_REASONS, RunningStats, TradeLog
+    
+    print("\n[tradelog] Columnar trade log and running statistics")
+    rng = np.random.default_rng(2)
+    pnl = rng.normal(0.0002, 0.003, trades)
+    entry = 1.1 + rng.normal(0, 0.01, trades)
+    is_buy = rng.random(trades) < 0.5
+    reason = rng.integers(0, 2, trades)
+    times = pd.date_range('2020-01-01', periods=trades, freq='h', tz='UTC')
+    
+    tracemalloc.start()
+    records = []
+    for k in range(trades):
+        records.append({'entry_price': entry[k], 'exit_price': entry[k] + pnl[k],
+                        'type': 'buy' if is_buy[k] else 'sell', 'pnl': pnl[k],
+                        'exit_reason': EXIT_REASONS[reason[k]], 'entry_time': times[k]})
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    tracemalloc.start()
+    log = TradeLog()
+    for k in range(trades):
+        log.append(entry[k], entry[k] + pnl[k], is_buy[k], pnl[k], reason[k], times[k])
+    log_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    backtester = Backtester(10000)
+    backtester.trade_log = log
+    start = time.perf_counter()
+    running = backtester._calculate_statistics()
+    running_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    df_trades = pd.DataFrame(records)
+    total_pnl = df_trades['pnl'].sum()
+    winning = df_trades[df_trades['pnl'] > 0]
+    equity = df_trades['pnl'].cumsum()
+    frame_time = time.perf_counter() - start
+    
+    stats = RunningStats()
+    stats.extend(pnl)
+    same = (stats.summary(10000) == running
+            and np.isclose(total_pnl, running['total_pnl'])
+            and len(winning) == running['winning_trades']
+            and np.isclose((equity.cummax().clip(lower=0) - equity).max(), running['max_drawdown'])
+            and log.frame().equals(df_trades))
+    print(f"  {trades:,} trades: list of dicts {dict_bytes / trades:5.0f} B/trade   "
+          f"TradeLog {log_bytes / trades:3.0f} B/trade   statistics {running_time * 1e6:5.1f} us "
+          f"(DataFrame {frame_time * 1e3:5.1f} ms)   parity {'OK' if same else 'MISMATCH'}")
+    return same
+
+
+def bench_grid(bars=20000, check=24):
+    """ScalpingStrategy.signal_grid vs one analyze/filter call per combination."""
+    from backtest_runner import load_prices
+    from backtester import Backtester
+    from scalping_strategy import ScalpingStrategy
+    
+    grid = {
+        'trend_weight': [2, 3, 4],
+        'momentum_weight': [2, 2.5],
+        'pattern_weight': [1.5, 2.5],
+        'min_score_diff': [1, 2, 3],
+        'min_confirmation_score': [0, 3, 5],
+        'min_adx': [15, 20, 25],
+        'rsi_range': [(25, 75), (30, 70)],
+        'min_atr_ratio': [0.3, 0.5]
+    }
+    print(f"\n[grid] Scalping parameter grid on {bars:,} bars")
+    df = IndicatorEngine(load_prices('EURUSD', 'H1', bars), backend='numpy').calculate_all()
+    
+    start = time.perf_counter()
+    combinations, signals = ScalpingStrategy().signal_grid(df, grid)
+    grid_time = time.perf_counter() - start
+    
+    # The per-combination path on an evenly spaced sample of rows
+    rows = np.linspace(0, len(combinations) - 1, check).astype(int)
+    ok = True
+    start = time.perf_counter()
+    for row in rows:
+        scalper = ScalpingStrategy(combinations[row])
+        expected = scalper.filter_scalping_signals(df, scalper.analyze_scalping_opportunity(df)[0])
+        ok = ok and np.array_equal(expected.to_numpy(), signals[row])
+    loop_time = (time.perf_counter() - start) / check * len(combinations)
+    
+    start = time.perf_counter()
+    results = Backtester().run_signal_matrix(df, signals[:check])
+    backtest_time = time.perf_counter() - start
+    print(f"  {len(combinations)} combinations: grid {grid_time:6.2f} s   per-combination loop ~{loop_time:6.1f} s "
+          f"(from {check})   speedup {loop_time / grid_time:5.0f}x   parity {'OK' if ok else 'MISMATCH'}")
+    print(f"  run_signal_matrix: {backtest_time / check * 1000:6.1f} ms/row   "
+          f"trades per row {min(r['total_trades'] for r in results)}-{max(r['total_trades'] for r in results)}")
+    return ok
+
+
+def bench_inference(train_bars=1500, window=500, repeat=20, pairs=12):
+    """predict_latest vs predict on a live-sized window, for both models."""
+    from advanced_ml_model import AdvancedTradingModel
+    from ml_model import TradingModel
+    from signal_generator import SignalGenerator
+    
+    print(f"\n[inference] Latest-bar prediction on a {window}-bar window")
+    df = IndicatorEngine(DataLoader().generate_sample_data(periods=train_bars + window)).calculate_all()
+    df = SignalGenerator(df).generate_signals()
+    train, live = df.iloc[:train_bars].copy(), df.iloc[train_bars:]
+    ok = True
+    for model, tail in ((TradingModel(), SignalGenerator.ML_TAIL), (AdvancedTradingModel(), 1)):
+        train['target'] = model.create_target(train)
+        X = model.prepare_features(train)
+        y = train.loc[X.index, 'target']
+        model.fit(X[y != 0], y[y != 0])
+        
+        start = time.perf_counter()
+        for _ in range(repeat):
+            # The previous predict: every row, predict and predict_proba
+            X_live = model.scaler.transform(model.prepare_features(live, columns=model.feature_columns))
+            reference = model.model.predict(X_live)
+            model.model.predict_proba(X_live)
+        before_time = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            signals, confidence = model.predict(live)
+        full_time = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            latest_signals, latest_confidence = model.predict_latest(live, tail)
+        latest_time = (time.perf_counter() - start) / repeat
+        
+        if isinstance(model, TradingModel):
+            reference = np.where(confidence >= 0.7, reference, 0)
+        same = (np.array_equal(signals, reference) and np.array_equal(latest_signals, signals[-tail:])
+                and np.allclose(latest_confidence, confidence[-tail:], rtol=1e-12))
+        ok = ok and same
+        print(f"  {type(model).__name__:<21} n={tail}: previous predict {before_time * 1000:6.1f} ms   "
+              f"predict {full_time * 1000:6.1f} ms   predict_latest {latest_time * 1000:5.1f} ms   "
+              f"{pairs}-pair scan {pairs * latest_time * 1000:6.1f} ms (was {pairs * before_time * 1000:6.1f})   "
+              f"parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+class _FixedHistory:
+    """Connector stand-in serving the same sample bars on every fetch (sample data is stamped from now())."""
+    
+    connected = True
+    
+    def __init__(self):
+        self.frames = {}
+    
+    def get_historical_data(self, symbol, timeframe, bars=1000):
+        from backtest_runner import load_prices
+        
+        key = (symbol, timeframe, bars)
+        if key not in self.frames:
+            self.frames[key] = load_prices(symbol, timeframe, bars)
+        return self.frames[key]
+
+
+def bench_resultcache(periods=2000, max_kb=64):
+    """main.py's pipeline and an optimizer search, cold vs from the disk result cache; eviction bound."""
+    import shutil
+    import tempfile
+    import optimizer
+    import result_cache as rc
+    from backtester import Backtester
+    from ml_model import TradingModel
+    from signal_generator import SignalGenerator
+    
+    print("\n[resultcache] Content-addressed disk cache of pipeline stages")
+    directory = tempfile.mkdtemp(prefix='result_cache_')
+    df = DataLoader().generate_sample_data(periods=periods, pair='EURUSD')
+    
+    def pipeline(cache):
+        frame, key = rc.cached_indicators(df, cache)
+        signal_gen = SignalGenerator(frame)
+        df_signals = signal_gen.generate_signals()
+        ml_signals, ml_confidence, key = rc.cached_predictions(TradingModel(), df_signals, key, cache)
+        df_final = signal_gen.filter_signals(signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence))
+        return rc.cached_backtest(Backtester(10000), df_final, key, cache)
+    
+    ok = True
+    try:
+        cache = rc.ResultCache(directory, enabled=True)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            results = pipeline(cache)
+            timings.append((time.perf_counter() - start, results))
+        reference = pipeline(rc.ResultCache(directory, enabled=False))
+        same = timings[0][1] == timings[1][1] == reference
+        ok = ok and same and cache.hits == 3
+        print(f"  main.py pipeline, {periods:,} bars: cold {timings[0][0]:6.2f} s   cached {timings[1][0] * 1000:6.1f} ms   "
+              f"{cache.stats()['bytes'] / 1024:6.0f} KB   parity {'OK' if same else 'MISMATCH'}")
+        
+        # The optimizer uses the global instance: point it at the scratch directory
+        history = _FixedHistory()
+        saved = rc.result_cache.directory, rc.result_cache.enabled
+        rc.result_cache.directory, rc.result_cache.enabled = directory, True
+        try:
+            runs = []
+            for _ in range(2):
+                start = time.perf_counter()
+                report = optimizer.optimize(['EURUSD', 'GBPUSD'], ['H1'], trials=12, bars=2000, workers=1,
+                                            connector=history, seed=0)
+                runs.append((time.perf_counter() - start, report))
+        finally:
+            rc.result_cache.directory, rc.result_cache.enabled = saved
+        same = all(runs[0][1][name] == runs[1][1][name] for name in ('best', 'train', 'test', 'baseline'))
+        ok = ok and same
+        print(f"  optimizer search: cold {runs[0][0] * 1000:6.1f} ms   repeated {runs[1][0] * 1000:6.1f} ms   "
+              f"parity {'OK' if same else 'MISMATCH'}")
+        
+        small = rc.ResultCache(directory, max_bytes=max_kb * 1024, enabled=True)
+        for k in range(200):
+            small.put(small.key('filler', k), np.random.default_rng(k).random(256))
+        size = small.stats()['bytes']
+        bounded = size <= max_kb * 1024
+        ok = ok and bounded
+        print(f"  eviction: {size / 1024:5.1f} KB kept of a {max_kb} KB bound after 200 puts "
+              f"({small.evictions} evicted)   {'OK' if bounded else 'OVER BOUND'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return ok
+
+
+def bench_compiled(train_bars=1500, window=500, repeat=20):
+    """Compiled model files vs joblib pickles: size, load time, latest-bar latency, probability parity."""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    import joblib
+    from advanced_ml_model import AdvancedTradingModel
+    from ml_model import TradingModel
+    from signal_generator import SignalGenerator
+    
+    print(f"\n[compiled] Compiled inference format vs sklearn pickles on a {window}-bar window")
+    df = IndicatorEngine(DataLoader().generate_sample_data(periods=train_bars + window)).calculate_all()
+    df = SignalGenerator(df).generate_signals()
+    train, live = df.iloc[:train_bars].copy(), df.iloc[train_bars:]
+    directory = tempfile.mkdtemp(prefix='compiled_model_')
+    ok = True
+    try:
+        for model in (TradingModel(), AdvancedTradingModel()):
+            train['target'] = model.create_target(train)
+            X = model.prepare_features(train)
+            y = train.loc[X.index, 'target']
+            model.fit(X[y != 0], y[y != 0])
+            pickle_path = os.path.join(directory, 'model.pkl')
+            compiled_path = os.path.join(directory, 'model.compiled')
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.save(pickle_path)
+                model.save_compiled(compiled_path)
+            
+            start = time.perf_counter()
+            joblib.load(pickle_path)
+            pickle_load = time.perf_counter() - start
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.load_compiled(compiled_path)
+            compiled_load = time.perf_counter() - start
+            compiled = model.compiled
+            
+            X_live = model.prepare_features(live, columns=model.feature_columns)
+            reference = model.model.predict_proba(model.scaler.transform(X_live))
+            probabilities = compiled.predict_proba(X_live)
+            
+            timings = {}
+            for label, engine in (('sklearn', None), ('compiled', compiled)):
+                model.compiled = engine
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    latest = model.predict_latest(live)
+                timings[label] = ((time.perf_counter() - start) / repeat, latest)
+            
+            same = (np.allclose(probabilities, reference, rtol=1e-12, atol=1e-15)
+                    and np.array_equal(compiled.predict(X_live), model.model.predict(model.scaler.transform(X_live)))
+                    and np.array_equal(timings['sklearn'][1][0], timings['compiled'][1][0]))
+            ok = ok and same
+            print(f"  {type(model).__name__:<21} file {os.path.getsize(pickle_path) / 1024:7.0f} KB -> "
+                  f"{os.path.getsize(compiled_path) / 1024:7.0f} KB   load {pickle_load * 1000:6.1f} -> "
+                  f"{compiled_load * 1000:5.1f} ms   predict_latest {timings['sklearn'][0] * 1000:5.1f} -> "
+                  f"{timings['compiled'][0] * 1000:5.1f} ms   max |dp| {np.abs(probabilities - reference).max():.1e}   "
+                  f"parity {'OK' if same else 'MISMATCH'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return ok
+
+
+def bench_training(train_bars=1200, window=500):
+    """Background training job: submit latency and reader latency while the model trains and is swapped in."""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    from signal_generator import SignalGenerator
+    from training_service import ModelRegistry, TrainingService, train_job
+    
+    print(f"\n[training] Background training of AdvancedTradingModel on {train_bars:,} bars")
+    df = DataLoader().generate_sample_data(periods=train_bars)
+    live = SignalGenerator(IndicatorEngine(DataLoader().generate_sample_data(periods=window)).calculate_all()).generate_signals()
+    directory = tempfile.mkdtemp(prefix='model_registry_')
+    registry = ModelRegistry(directory)
+    service = TrainingService(registry)
+    ok = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            model, train_score, test_score = train_job(0, df)
+            inline_time = time.perf_counter() - start
+            registry.publish(model, {'train_score': train_score, 'test_score': test_score})
+            
+            start = time.perf_counter()
+            job_id = service.submit(df, 'EURUSD')
+            submit_time = time.perf_counter() - start
+            
+            # A reader predicting the latest bar for as long as the job runs
+            latencies, versions = [], []
+            while service.status(job_id)['status'] not in ('done', 'failed'):
+                start = time.perf_counter()
+                version, model = registry.active
+                model.predict_latest(live)
+                latencies.append(time.perf_counter() - start)
+                versions.append(version)
+            version, model = registry.active
+            model.predict_latest(live)
+            versions.append(version)
+        job = service.status(job_id)
+    finally:
+        service.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    
+    latencies = np.array(latencies) * 1000
+    swapped = job['status'] == 'done' and versions[0] == 1 and versions[-1] == 2 and versions == sorted(versions)
+    ok = ok and swapped
+    print(f"  inline train {inline_time:6.1f} s (request blocked)   submit {submit_time * 1000:5.1f} ms   "
+          f"job {job['status']} as v{job['version']}")
+    print(f"  reader during training: {len(latencies)} predictions, p50 {np.median(latencies):5.1f} ms   "
+          f"max {latencies.max():6.1f} ms   versions seen {sorted(set(versions))}   swap {'OK' if swapped else 'FAILED'}")
+    return ok
+
+
+def bench_ensemble(bars=1200, budgets=(1, 4)):
+    """AdvancedTradingModel fit + cross-validation: previous serial 5-fold vs parallel time-series folds."""
+    from sklearn.model_selection import cross_val_score
+    from advanced_ml_model import AdvancedTradingModel
+    from scalping_strategy import ScalpingStrategy
+    
+    print(f"\n[ensemble] Ensemble fit and cross-validation on {bars:,} bars ({os.cpu_count()} cores)")
+    df = IndicatorEngine(DataLoader().generate_sample_data(periods=bars)).calculate_all()
+    df['signal'] = ScalpingStrategy().analyze_scalping_opportunity(df)[0]
+    template = AdvancedTradingModel(workers=1)
+    df['target'] = template.create_target(df)
+    X = template.prepare_features(df)
+    y = df.loc[X.index, 'target']
+    X, y = X[y != 0], y[y != 0]
+    X_scaled = template.scaler.fit_transform(X)
+    
+    # The previous train(): serial fit, then cross_val_score(cv=5) refitting the ensemble serially
+    start = time.perf_counter()
+    template.model.set_params(n_jobs=None, rf__n_jobs=None)
+    template.model.fit(X_scaled, y)
+    cross_val_score(template.model, X_scaled, y, cv=5)
+    before = time.perf_counter() - start
+    reference = template.model.predict_proba(X_scaled)
+    print(f"  previous: serial fit + 5-fold CV {before:6.1f} s")
+    
+    ok = True
+    for workers in budgets:
+        model = AdvancedTradingModel(workers=workers)
+        start = time.perf_counter()
+        model.fit(X, y)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scores = model.cross_validate(model.scaler.transform(X), y)
+        cv_time = time.perf_counter() - start
+        same = np.array_equal(model.model.predict_proba(model.scaler.transform(X)), reference)
+        ok = ok and same
+        print(f"  workers={workers}: fit {fit_time:5.1f} s   time-series CV {cv_time:5.1f} s ({len(scores)} folds, "
+              f"mean {scores.mean():.3f})   total {fit_time + cv_time:5.1f} s   model parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+def bench_online(train_bars=1500, stream=500, resume_at=300):
+    """OnlineTradingModel: initial fit vs batch retraining, per-bar update cost, prequential accuracy, checkpoint resume."""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    from advanced_ml_model import AdvancedTradingModel
+    from online_ml_model import OnlineTradingModel
+    
+    print(f"\n[online] Online model: {train_bars:,} training bars, then {stream} closed bars one at a time")
+    df = IndicatorEngine(DataLoader().generate_sample_data(periods=train_bars + stream)).calculate_all()
+    directory = tempfile.mkdtemp(prefix='online_model_')
+    checkpoint = os.path.join(directory, 'online_model.pkl')
+    ok = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = AdvancedTradingModel(workers=1)
+            start = time.perf_counter()
+            batch.train(df.iloc[:train_bars].copy())
+            batch_time = time.perf_counter() - start
+            
+            model = OnlineTradingModel(checkpoint_path=checkpoint, checkpoint_every=100)
+            frozen = OnlineTradingModel(checkpoint_path=None)
+            start = time.perf_counter()
+            model.train(df.iloc[:train_bars].copy())
+            online_time = time.perf_counter() - start
+            frozen.train(df.iloc[:train_bars].copy())
+            
+            # Predict each bar as it closes, learn the bars whose labels matured
+            latencies, predicted, held = [], [], []
+            resumed = None
+            for end in range(train_bars + 1, train_bars + stream + 1):
+                history = df.iloc[:end]
+                predicted.append(model.predict_latest(history)[0][-1])
+                held.append(frozen.predict_latest(history)[0][-1])
+                start = time.perf_counter()
+                model.update(history)
+                latencies.append(time.perf_counter() - start)
+                if end == train_bars + resume_at:
+                    model.save(checkpoint)
+                    resumed = OnlineTradingModel(checkpoint_path=None)
+                    resumed.load(checkpoint)
+                elif resumed is not None:
+                    resumed.update(history)
+        
+        target = model.create_target(df)[train_bars:]
+        labelled = target[:stream - model.forward_periods] != 0
+        online_accuracy = np.mean((np.array(predicted) == target[:stream])[:stream - model.forward_periods][labelled])
+        frozen_accuracy = np.mean((np.array(held) == target[:stream])[:stream - model.forward_periods][labelled])
+        X = model.prepare_features(df.iloc[-100:], columns=model.feature_columns)
+        same = np.array_equal(model.predict_features(X)[1], resumed.predict_features(X)[1])
+        ok = ok and same and model.last_learned == df.index[-model.forward_periods - 1]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    
+    latencies = np.array(latencies) * 1000
+    print(f"  initial fit: batch AdvancedTradingModel {batch_time:6.1f} s   online {online_time:5.2f} s")
+    print(f"  update per closed bar: p50 {np.median(latencies):5.1f} ms   max {latencies.max():5.1f} ms   "
+          f"({model.learned:,} bars learned)")
+    print(f"  prequential accuracy over {labelled.sum()} labelled bars: online {online_accuracy:.3f}   "
+          f"frozen {frozen_accuracy:.3f}")
+    print(f"  checkpoint at bar {resume_at} resumed: parity {'OK' if same else 'MISMATCH'}")
+    return ok
+
+
+SECTIONS = {
+    'streaming': bench_streaming,
+    'kernels': bench_kernels,
+    'selective': bench_selective,
+    'batch': bench_batch,
+    'cache': bench_cache,
+    'lookback': bench_lookback,
+    'patterns': bench_patterns,
+    'tail': bench_tail,
+    'backtest': bench_backtest,
+    'runner': bench_runner,
+    'optimizer': bench_optimizer,
+    'walkforward': bench_walkforward,
+    'intrabar': bench_intrabar,
+    'events': bench_events,
+    'autoclose': bench_autoclose,
+    'montecarlo': bench_montecarlo,
+    'costs': bench_costs,
+    'tradelog': bench_tradelog,
+    'resultcache': bench_resultcache,
+    'grid': bench_grid,
+    'inference': bench_inference,
+    'compiled': bench_compiled,
+    'training': bench_training,
+    'ensemble': bench_ensemble,
+    'online': bench_online,
+}
+
+
+def main():
+    """Run the requested benchmark sections."""
+    names = sys.argv[1:] or list(SECTIONS)
+    ok = True
+    for name in names:
+        # Sections without a parity check return None; NumPy booleans count like bools
+        result = SECTIONS[name]()
+        ok = (result is None or bool(result)) and ok
+    print("\nAll parity checks passed" if ok else "\nParity check FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
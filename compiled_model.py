@@ -0,0 +1,276 @@
+"""Compiled inference format for the trading models' tree ensembles."""
+
+import json
+import os
+
+import numpy as np
+from scipy.special import expit, logsumexp
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.neural_network import MLPClassifier
+
+
+MAGIC = b'FXMODEL1'
+ALIGNMENT = 64
+
+# Rows evaluated together: rows x trees node indices stay small
+CHUNK_ROWS = 4096
+
+
+def flatten_trees(trees, values):
+    """
+    Concatenate fitted sklearn trees into one node table.
+    
+    Leaves point both children at themselves (feature 0, threshold +inf),
+    so every tree can be walked for the same number of steps.
+    
+    Args:
+        trees: sklearn Tree objects (estimator.tree_)
+        values: Per-tree arrays of leaf outputs, one row per node
+    
+    Returns:
+        Dict of arrays: feature, threshold, left, right, value, roots, plus the max depth
+    """
+    roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+    feature, threshold, left, right = [], [], [], []
+    for tree, root in zip(trees, roots):
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, np.inf, tree.threshold))
+        left.append(root + np.where(leaf, nodes, tree.children_left))
+        right.append(root + np.where(leaf, nodes, tree.children_right))
+    return {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': roots.astype(np.int32),
+        'depth': max(tree.max_depth for tree in trees)
+    }
+
+
+def _export_member(name, estimator, n_features):
+    """Arrays and metadata of one ensemble member."""
+    if isinstance(estimator, GradientBoostingClassifier):
+        # Stage-major (stage, class) trees; values pre-multiplied like predict_stages
+        stages = estimator.estimators_
+        trees = [tree.tree_ for tree in stages.ravel()]
+        table = flatten_trees(trees, [estimator.learning_rate * tree.value[:, 0, 0] for tree in trees])
+        init = estimator._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+        meta = {'type': 'gb', 'classes_per_stage': stages.shape[1], 'depth': table.pop('depth')}
+        table['init'] = init.astype(np.float64)
+    elif isinstance(estimator, RandomForestClassifier):
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        values = []
+        for tree in trees:
+            counts = tree.value[:, 0, :estimator.n_classes_]
+            normalizer = counts.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(counts / normalizer)
+        table = flatten_trees(trees, values)
+        meta = {'type': 'rf', 'depth': table.pop('depth')}
+    elif isinstance(estimator, MLPClassifier):
+        table = {}
+        for layer, (coef, intercept) in enumerate(zip(estimator.coefs_, estimator.intercepts_)):
+            table[f'coef_{layer}'] = coef
+            table[f'intercept_{layer}'] = intercept
+        meta = {'type': 'nn', 'layers': len(estimator.coefs_), 'activation': estimator.activation,
+                'out_activation': estimator.out_activation_}
+        if estimator.activation not in ('relu', 'logistic', 'tanh', 'identity'):
+            raise ValueError(f"Unsupported MLP activation: {estimator.activation}")
+    else:
+        raise ValueError(f"Cannot compile {type(estimator).__name__}")
+    meta['name'] = name
+    return meta, {f'{name}.{key}': value for key, value in table.items()}
+
+
+def export_model(model, filepath):
+    """
+    Write a fitted TradingModel / AdvancedTradingModel as flat arrays.
+    
+    The file is a JSON header followed by 64-byte aligned raw arrays
+    (scaler, tree node tables, MLP weights), so load_model can memory-map it.
+    
+    Args:
+        model: Model with fitted ``model`` (GradientBoostingClassifier or a
+            soft VotingClassifier of GB / RF / MLP), ``scaler`` and ``feature_columns``
+        filepath: Output path
+    """
+    estimator = model.model
+    n_features = len(model.feature_columns)
+    if isinstance(estimator, VotingClassifier):
+        if estimator.voting != 'soft':
+            raise ValueError("Only soft voting can be compiled")
+        names = [name for name, member in estimator.estimators if member != 'drop']
+        members = list(zip(names, estimator.estimators_))
+        weights = estimator._weights_not_none
+    else:
+        members = [('model', estimator)]
+        weights = None
+    
+    arrays = {'scaler.mean': model.scaler.mean_, 'scaler.scale': model.scaler.scale_}
+    meta = []
+    for name, member in members:
+        member_meta, member_arrays = _export_member(name, member, n_features)
+        meta.append(member_meta)
+        arrays.update(member_arrays)
+    
+    header = {
+        'source': type(model).__name__,
+        'features': list(model.feature_columns),
+        'classes': estimator.classes_.tolist(),
+        'weights': None if weights is None else list(map(float, weights)),
+        'members': meta,
+        'arrays': {}
+    }
+    offset = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        arrays[name] = values
+        header['arrays'][name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    
+    encoded = json.dumps(header).encode()
+    start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+    temp = f"{filepath}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        for name, values in arrays.items():
+            f.seek(start + header['arrays'][name]['offset'])
+            f.write(values.tobytes())
+        f.truncate(start + offset)
+    os.replace(temp, filepath)
+
+
+class CompiledModel:
+    """
+    Vectorized evaluator of an exported model: the scaler, then every tree
+    of every ensemble member walked together, level by level, over a block
+    of rows, then the MLP as matrix products.
+    
+    Mirrors the predict_proba / classes_ interface the trading models use,
+    and matches sklearn's arithmetic (float32 tree inputs, stage-ordered
+    sums), so probabilities agree with the source model to rounding.
+    """
+    
+    def __init__(self, header, arrays):
+        self.header = header
+        self.arrays = arrays
+        self.source = header['source']
+        self.feature_columns = header['features']
+        self.classes_ = np.array(header['classes'])
+        self.weights = header['weights']
+        self.members = header['members']
+    
+    def transform(self, X):
+        """StandardScaler.transform."""
+        X = np.array(X, dtype=np.float64)
+        X -= self.arrays['scaler.mean']
+        X /= self.arrays['scaler.scale']
+        return X
+    
+    def _walk(self, name, depth, X32):
+        """Leaf node index of every (row, tree) for one member's node table."""
+        feature = self.arrays[f'{name}.feature']
+        threshold = self.arrays[f'{name}.threshold']
+        left = self.arrays[f'{name}.left']
+        right = self.arrays[f'{name}.right']
+        node = np.repeat(self.arrays[f'{name}.roots'][np.newaxis, :].astype(np.intp), len(X32), axis=0)
+        rows = np.arange(len(X32))[:, np.newaxis]
+        for _ in range(depth):
+            node = np.where(X32[rows, feature[node]] <= threshold[node], left[node], right[node])
+        return node
+    
+    def _member_proba(self, member, X):
+        """predict_proba of one member on scaled rows."""
+        name = member['name']
+        if member['type'] == 'gb':
+            values = self.arrays[f'{name}.value'][self._walk(name, member['depth'], X.astype(np.float32))]
+            K = member['classes_per_stage']
+            values = values.reshape(len(X), -1, K)
+            init = np.broadcast_to(self.arrays[f'{name}.init'], (len(X), 1, K))
+            # Sequential sum over stages, as predict_stages accumulates them
+            raw = np.cumsum(np.concatenate([init, values], axis=1), axis=1)[:, -1]
+            if K == 1:
+                proba = np.ones((len(X), 2))
+                proba[:, 1] = expit(raw.ravel())
+                proba[:, 0] -= proba[:, 1]
+                return proba
+            return np.nan_to_num(np.exp(raw - logsumexp(raw, axis=1)[:, np.newaxis]))
+        if member['type'] == 'rf':
+            values = self.arrays[f'{name}.value'][self._walk(name, member['depth'], X.astype(np.float32))]
+            zero = np.zeros((len(X), 1, values.shape[2]))
+            total = np.cumsum(np.concatenate([zero, values], axis=1), axis=1)[:, -1]
+            return total / values.shape[1]
+        
+        activation = X
+        hidden = {'relu': lambda a: np.maximum(a, 0, out=a), 'tanh': lambda a: np.tanh(a, out=a),
+                  'logistic': lambda a: expit(a, out=a), 'identity': lambda a: a}[member['activation']]
+        for layer in range(member['layers']):
+            activation = activation @ self.arrays[f'{name}.coef_{layer}']
+            activation += self.arrays[f'{name}.intercept_{layer}']
+            if layer != member['layers'] - 1:
+                hidden(activation)
+        if member['out_activation'] == 'logistic':
+            p = expit(activation).ravel()
+            return np.vstack([1 - p, p]).T
+        activation = activation - activation.max(axis=1)[:, np.newaxis]
+        np.exp(activation, out=activation)
+        activation /= activation.sum(axis=1)[:, np.newaxis]
+        return activation
+    
+    def predict_proba(self, X):
+        """
+        Class probabilities of unscaled feature rows (DataFrame or array, trained column order).
+        
+        Returns:
+            (rows, classes) array in the order of ``classes_``
+        """
+        X = self.transform(X)
+        if not len(X):
+            return np.empty((0, len(self.classes_)))
+        blocks = []
+        for start in range(0, len(X), CHUNK_ROWS):
+            block = X[start:start + CHUNK_ROWS]
+            probas = [self._member_proba(member, block) for member in self.members]
+            if self.weights is None:
+                blocks.append(probas[0])
+            else:
+                blocks.append(np.average(np.asarray(probas), axis=0, weights=self.weights))
+        return np.concatenate(blocks)
+    
+    def predict(self, X):
+        """Most probable class of each row."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_model(filepath, mmap=True):
+    """
+    Open a file written by export_model.
+    
+    Args:
+        filepath: Path to the compiled model
+        mmap: Memory-map the arrays (read-only, paged in on use) instead of reading them
+    
+    Returns:
+        CompiledModel
+    """
+    with open(filepath, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a compiled model: {filepath}")
+        length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(length))
+    start = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+    
+    if mmap:
+        raw = np.memmap(filepath, dtype=np.uint8, mode='r')
+    else:
+        raw = np.fromfile(filepath, dtype=np.uint8)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        offset = start + spec['offset']
+        arrays[name] = raw[offset:offset + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return CompiledModel(header, arrays)
@@ -18,6 +18,22 @@ ATR_PERIOD = 14
 LOOKBACK_PERIOD = 100
 TRAIN_TEST_SPLIT = 0.8
 MIN_CONFIDENCE = 0.7  # Minimum prediction confidence for trade
+TRAINING_WORKERS = None  # Cores for ensemble training and cross-validation (None: every core)
 
 # Currency pairs and commodities
 CURRENCY_PAIRS = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'XAUUSD']  # Added GOLD
+
+# Symbol specifications: pip size, contract size (units per lot), typical
+# spread in pips and round-turn commission in USD per lot
+SYMBOL_SPECS = {
+    'EURUSD': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.0, 'commission_per_lot': 7.0},
+    'GBPUSD': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.4, 'commission_per_lot': 7.0},
+    'USDJPY': {'pip_size': 0.01, 'contract_size': 100000, 'spread_pips': 1.2, 'commission_per_lot': 7.0},
+    'AUDUSD': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.3, 'commission_per_lot': 7.0},
+    'USDCAD': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.6, 'commission_per_lot': 7.0},
+    'USDCHF': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.6, 'commission_per_lot': 7.0},
+    'NZDUSD': {'pip_size': 0.0001, 'contract_size': 100000, 'spread_pips': 1.8, 'commission_per_lot': 7.0},
+    'EURJPY': {'pip_size': 0.01, 'contract_size': 100000, 'spread_pips': 1.8, 'commission_per_lot': 7.0},
+    'GBPJPY': {'pip_size': 0.01, 'contract_size': 100000, 'spread_pips': 2.5, 'commission_per_lot': 7.0},
+    'XAUUSD': {'pip_size': 0.1, 'contract_size': 100, 'spread_pips': 3.0, 'commission_per_lot': 7.0}
+}
@@ -0,0 +1,119 @@
+"""Trading costs per symbol: session-dependent spread, slippage and commission."""
+
+import numpy as np
+
+import config
+
+
+# Spread multiplier by UTC hour: widest around the 21-22h rollover, wide in
+# the Asian session, tightest in the London / New York overlap
+SESSION_SPREAD = np.array([
+    1.6, 1.5, 1.4, 1.3, 1.3, 1.2, 1.1, 1.0,    # 00-07 Asia
+    0.9, 0.9, 0.9, 0.9, 0.8, 0.8, 0.8, 0.8,    # 08-15 London, overlap from 13
+    0.9, 1.0, 1.1, 1.2, 1.5, 2.5, 3.0, 2.0     # 16-23 New York close, rollover
+])
+
+# Approximate USD per unit of a quote currency, for crosses (USD-quoted and
+# USD-based symbols convert at their own price)
+QUOTE_USD = {'EUR': 1.08, 'GBP': 1.27, 'JPY': 1 / 150, 'CHF': 1.12, 'CAD': 0.73, 'AUD': 0.66, 'NZD': 0.60}
+
+# Exit reasons filled at a limit price, without slippage (backtester.EXIT_REASONS)
+LIMIT_EXITS = (1,)
+
+
+def symbol_spec(symbol):
+    """
+    Specification of a symbol from config.SYMBOL_SPECS.
+    
+    Symbols missing from the table get FX defaults, with the pip size read
+    from the name (JPY quotes: 0.01, XAU: 0.1).
+    """
+    spec = config.SYMBOL_SPECS.get(symbol)
+    if spec is not None:
+        return dict(spec)
+    if symbol.startswith('XAU'):
+        return {'pip_size': 0.1, 'contract_size': 100, 'spread_pips': 3.0, 'commission_per_lot': 7.0}
+    return {'pip_size': 0.01 if 'JPY' in symbol else 0.0001, 'contract_size': 100000,
+            'spread_pips': 2.0, 'commission_per_lot': 7.0}
+
+
+def pip_size(symbol):
+    """Price change of one pip for a symbol."""
+    return symbol_spec(symbol)['pip_size']
+
+
+def quote_to_usd(symbol, price):
+    """USD per unit of the symbol's quote currency, at the symbol's own ``price`` (array)."""
+    price = np.asarray(price, dtype=float)
+    base, quote = symbol[:3], symbol[3:6]
+    if quote == 'USD':
+        return np.ones_like(price)
+    if base == 'USD':
+        return 1 / price
+    return np.full_like(price, QUOTE_USD.get(quote, 1.0))
+
+
+class CostModel:
+    """Spread, slippage and commission for one symbol, applied to whole trade arrays."""
+    
+    def __init__(self, symbol, spread_pips=None, slippage_pips=0.2, commission_per_lot=None,
+                 session_spread=SESSION_SPREAD):
+        """
+        Args:
+            symbol: Instrument (see symbol_spec)
+            spread_pips: Typical spread; None for the symbol spec's
+            slippage_pips: Slippage per market fill (entries and stop exits)
+            commission_per_lot: Round-turn commission in USD; None for the symbol spec's
+            session_spread: 24 spread multipliers by UTC hour
+        """
+        self.symbol = symbol
+        self.spec = symbol_spec(symbol)
+        self.pip_size = self.spec['pip_size']
+        self.contract_size = self.spec['contract_size']
+        self.spread_pips = self.spec['spread_pips'] if spread_pips is None else spread_pips
+        self.slippage_pips = slippage_pips
+        self.commission_per_lot = self.spec['commission_per_lot'] if commission_per_lot is None else commission_per_lot
+        self.session_spread = np.asarray(session_spread, dtype=float)
+    
+    def spread(self, times):
+        """Spread in price at datetime64[ns] / int64 nanosecond ``times``."""
+        hours = (np.asarray(times).astype(np.int64) // 3600000000000) % 24
+        return self.spread_pips * self.pip_size * self.session_spread[hours]
+    
+    def pip_value(self, price):
+        """USD value of one pip per lot at ``price``."""
+        return self.pip_size * self.contract_size * quote_to_usd(self.symbol, price)
+    
+    def apply(self, trades):
+        """
+        Costs of a set of trades.
+        
+        Bars are bid prices: buys pay the spread on entry (filled at the
+        ask), sells on exit. Entries and exits other than take profits are
+        market fills and slip by ``slippage_pips``.
+        
+        Args:
+            trades: Dict of arrays: is_buy, entry_price, exit_price, pnl
+                (price move), size (lots), exit_reason, entry_time and
+                exit_time (int64 ns or datetime64)
+        
+        Returns:
+            Dict of arrays: 'cost' (price), 'net_pnl' (price), 'net_pips',
+            'commission' (USD) and 'pnl_usd' (net of all costs)
+        """
+        is_buy = np.asarray(trades['is_buy'], dtype=bool)
+        spread = np.where(is_buy, self.spread(trades['entry_time']), self.spread(trades['exit_time']))
+        market_fills = 2 - np.isin(trades['exit_reason'], LIMIT_EXITS)
+        cost = spread + market_fills * self.slippage_pips * self.pip_size
+        net_pnl = np.asarray(trades['pnl'], dtype=float) - cost
+        
+        size = np.asarray(trades['size'], dtype=float)
+        commission = self.commission_per_lot * size
+        pnl_usd = net_pnl * self.contract_size * size * quote_to_usd(self.symbol, trades['exit_price']) - commission
+        return {
+            'cost': cost,
+            'net_pnl': net_pnl,
+            'net_pips': net_pnl / self.pip_size,
+            'commission': commission,
+            'pnl_usd': pnl_usd
+        }
@@ -2,7 +2,7 @@
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 
 
 class DataLoader:
@@ -33,18 +33,20 @@ class DataLoader:
         
         return df
     
-    def generate_sample_data(self, periods=1000, pair='EURUSD'):
+    def generate_sample_data(self, periods=1000, pair='EURUSD', seed=42, freq='H'):
         """
         Generate sample forex data for testing.
         
         Args:
             periods: Number of data points
             pair: Currency pair name
+            seed: Random seed
+            freq: Bar frequency of the timestamp index (pandas offset alias)
         
         Returns:
             DataFrame with OHLCV data
         """
-        np.random.seed(42)
+        np.random.seed(seed)
         
         # Starting price
         if pair == 'EURUSD':
@@ -53,6 +55,10 @@ class DataLoader:
             start_price = 1.3000
         elif pair == 'USDJPY':
             start_price = 110.00
+        elif pair in ('EURJPY', 'GBPJPY'):
+            start_price = 140.00
+        elif pair == 'XAUUSD':
+            start_price = 1900.00
         else:
             start_price = 1.0000
         
@@ -79,8 +85,8 @@ class DataLoader:
         df = pd.DataFrame(data)
         
         # Add timestamp index
-        start_date = datetime.now() - timedelta(hours=periods)
-        df.index = pd.date_range(start=start_date, periods=periods, freq='H')
+        start_date = datetime.now() - pd.Timedelta(pd.tseries.frequencies.to_offset(freq)) * periods
+        df.index = pd.date_range(start=start_date, periods=periods, freq=freq)
         df.index.name = 'timestamp'
         
         return df
@@ -0,0 +1,280 @@
+"""Event-driven portfolio backtester with concurrent positions."""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester, EXIT_REASONS, PIP_VALUE, find_exit, first_hit
+from cost_model import CostModel, pip_size
+from risk_manager import RiskManager
+import config
+
+
+class PositionBook:
+    """Open positions keyed by symbol, with exits queued by time."""
+    
+    def __init__(self):
+        self.by_symbol = {}
+        self.exits = []
+        self.count = 0
+        self.last_exit = {}
+    
+    def open(self, symbol, exit_time, exit_index, trade_id):
+        """Add a position whose (precomputed) exit is at ``exit_time``; None means never."""
+        self.by_symbol.setdefault(symbol, set()).add(trade_id)
+        self.count += 1
+        if exit_time is not None:
+            heapq.heappush(self.exits, (exit_time, trade_id, symbol, exit_index))
+    
+    def close_until(self, time):
+        """Close every position exiting at or before ``time``."""
+        while self.exits and self.exits[0][0] <= time:
+            _, trade_id, symbol, exit_index = heapq.heappop(self.exits)
+            self.by_symbol[symbol].discard(trade_id)
+            self.count -= 1
+            self.last_exit[symbol] = max(self.last_exit.get(symbol, -1), exit_index)
+    
+    def open_on(self, symbol):
+        """Number of open positions on a symbol."""
+        return len(self.by_symbol.get(symbol, ()))
+
+
+class EventBacktester:
+    """
+    Portfolio backtest with several concurrent positions, trailing stops and
+    partial closes.
+    
+    Events are entry signals (merged across symbols in time order) and
+    position exits (a heap keyed by exit time). Positions never interact, so
+    when one is opened its whole life is resolved at once from its symbol's
+    arrays: the trailing stop and partial close are evaluated per bar with
+    the same vectorized first-hit search as Backtester.run_fast. The book
+    then only has to release positions when their exit time passes, which
+    keeps the cost per signal independent of how many positions are open.
+    
+    Per bar and position the order is: stop (fixed or trailing, set from
+    earlier bars), then partial close, then take profit. With one symbol,
+    one position and no partial close it trades exactly like run_fast.
+    """
+    
+    def __init__(self, initial_balance=10000, max_positions=3, max_per_symbol=1, max_trades_per_day=None,
+                 atr_stop_multiplier=1.5, atr_target_multiplier=None, trailing_activation=None,
+                 trailing_distance=None, partial_close=None, costs=False):
+        """
+        Args:
+            initial_balance: Starting balance
+            max_positions: Concurrent positions across all symbols (RiskManager.can_open_trade)
+            max_per_symbol: Concurrent positions per symbol
+            max_trades_per_day: Entries per calendar day across all symbols; None for no limit
+            atr_stop_multiplier: Stop distance in ATRs
+            atr_target_multiplier: Target distance in ATRs; None for
+                config.TAKE_PROFIT_RATIO times the stop distance
+            trailing_activation: Profit, in multiples of the stop distance,
+                after which the stop trails price; None disables trailing
+            trailing_distance: Trailing distance in ATRs
+            partial_close: optimized_parameters.json style dict: 'enabled',
+                'first_target' (R multiple where 'fraction', default 0.5, is
+                closed) and 'second_target' (R multiple of the final target)
+            costs: Charge each symbol's spread, slippage and commission
+                (cost_model.CostModel with the symbol's spec)
+        """
+        self.initial_balance = initial_balance
+        self.risk_manager = RiskManager(initial_balance)
+        self.max_positions = max_positions
+        self.max_per_symbol = max_per_symbol
+        self.max_trades_per_day = max_trades_per_day
+        self.atr_stop_multiplier = atr_stop_multiplier
+        self.atr_target_multiplier = atr_target_multiplier
+        self.trailing_activation = trailing_activation
+        self.trailing_distance = trailing_distance
+        self.partial_close = partial_close if partial_close and partial_close.get('enabled', True) else None
+        self.costs = costs
+        self.symbols = []
+        self.trade_arrays = None
+        self.book_stats = None
+    
+    def _levels(self, entry, atr, buy):
+        """Stop, target, trailing activation/distance and partial price for an entry."""
+        stop_distance = atr * self.atr_stop_multiplier
+        stop_loss = entry - stop_distance if buy else entry + stop_distance
+        if self.partial_close is not None and 'second_target' in self.partial_close:
+            reward = stop_distance * self.partial_close['second_target']
+        elif self.atr_target_multiplier is None:
+            reward = abs(entry - stop_loss) * config.TAKE_PROFIT_RATIO
+        else:
+            reward = atr * self.atr_target_multiplier
+        take_profit = entry + reward if buy else entry - reward
+        
+        activation = distance = None
+        if self.trailing_activation is not None and self.trailing_distance is not None:
+            activation = entry + stop_distance * self.trailing_activation if buy else entry - stop_distance * self.trailing_activation
+            distance = atr * self.trailing_distance
+        
+        partial_price = None
+        if self.partial_close is not None:
+            move = stop_distance * self.partial_close.get('first_target', 1.5)
+            partial_price = entry + move if buy else entry - move
+        return stop_loss, take_profit, activation, distance, partial_price
+    
+    def run(self, frames):
+        """
+        Run the portfolio backtest.
+        
+        Args:
+            frames: Dict of symbol -> DataFrame with high, low, close, atr and
+                final_signal columns and a DatetimeIndex
+        
+        Returns:
+            Dictionary with backtest results (Backtester statistics on price
+            P&L, plus pips, partial closes and book usage)
+        """
+        symbols = list(frames)
+        models = {symbol: CostModel(symbol) for symbol in symbols} if self.costs else {}
+        arrays = {}
+        candidates = []
+        for order, symbol in enumerate(symbols):
+            df = frames[symbol]
+            signal = df['final_signal'].to_numpy(dtype=float)
+            arrays[symbol] = {
+                'high': df['high'].to_numpy(dtype=float),
+                'low': df['low'].to_numpy(dtype=float),
+                'close': df['close'].to_numpy(dtype=float),
+                'atr': df['atr'].to_numpy(dtype=float),
+                'signal': signal,
+                'times': pd.DatetimeIndex(df.index).asi8
+            }
+            # NaN signals count as entries, as in Backtester.run
+            entries = np.flatnonzero(signal != 0)
+            candidates.append(np.column_stack([arrays[symbol]['times'][entries],
+                                               np.full(len(entries), order), entries]))
+        
+        # Time-ordered entry events; ties go to the symbol listed first
+        events = np.concatenate(candidates) if candidates else np.empty((0, 3), dtype=np.int64)
+        events = events[np.lexsort((events[:, 1], events[:, 0]))]
+        
+        book = PositionBook()
+        trades = {name: [] for name in ('symbol', 'entry_index', 'exit_index', 'entry_time', 'exit_time', 'is_buy',
+                                        'entry_price', 'exit_price', 'stop_loss', 'take_profit', 'size', 'pnl',
+                                        'pnl_pips', 'partial_index', 'exit_reason')}
+        day_counts = {}
+        skipped = 0
+        open_at_end = 0
+        max_open = 0
+        
+        for time, order, i in events:
+            symbol = symbols[order]
+            data = arrays[symbol]
+            book.close_until(time)
+            
+            if book.last_exit.get(symbol) == i:
+                continue  # No entry on a bar where this symbol just closed a position
+            if book.open_on(symbol) >= self.max_per_symbol:
+                continue
+            day = time // 86400000000000
+            if book.count >= self.max_positions or (
+                    self.max_trades_per_day is not None and day_counts.get(day, 0) >= self.max_trades_per_day):
+                skipped += 1
+                continue
+            
+            buy = data['signal'][i] == 1
+            entry = data['close'][i]
+            stop_loss, take_profit, activation, distance, partial_price = self._levels(entry, data['atr'][i], buy)
+            high, low = data['high'], data['low']
+            n = len(high)
+            
+            exit_index, exit_price, reason = find_exit(high, low, i + 1, n, buy, stop_loss, take_profit,
+                                                       activation, distance)
+            trade_id = len(trades['symbol'])
+            day_counts[day] = day_counts.get(day, 0) + 1
+            if exit_index < 0:
+                # Still open at the end of the data: holds its slot, never recorded
+                book.open(symbol, None, -1, -1 - open_at_end)
+                open_at_end += 1
+                max_open = max(max_open, book.count)
+                continue
+            book.open(symbol, data['times'][exit_index], exit_index, trade_id)
+            max_open = max(max_open, book.count)
+            
+            move = exit_price - entry if buy else entry - exit_price
+            partial_index = -1
+            if partial_price is not None:
+                if buy:
+                    partial_index = first_hit(lambda lo, hi: high[lo:hi] >= partial_price, i + 1, exit_index + 1)
+                else:
+                    partial_index = first_hit(lambda lo, hi: low[lo:hi] <= partial_price, i + 1, exit_index + 1)
+                # A stop on the same bar comes first, so that bar cannot also close the partial
+                if partial_index == exit_index and reason != 1:
+                    partial_index = -1
+                if partial_index >= 0:
+                    fraction = self.partial_close.get('fraction', 0.5)
+                    move = fraction * abs(partial_price - entry) + (1 - fraction) * move
+            
+            trades['symbol'].append(order)
+            trades['entry_index'].append(i)
+            trades['exit_index'].append(exit_index)
+            trades['entry_time'].append(time)
+            trades['exit_time'].append(data['times'][exit_index])
+            trades['is_buy'].append(buy)
+            trades['entry_price'].append(entry)
+            trades['exit_price'].append(exit_price)
+            trades['stop_loss'].append(stop_loss)
+            trades['take_profit'].append(take_profit)
+            pip_value = float(models[symbol].pip_value(entry)) if self.costs else PIP_VALUE
+            trades['size'].append(self.risk_manager.calculate_position_size(abs(entry - stop_loss) / pip_size(symbol),
+                                                                            pip_value))
+            trades['pnl'].append(move)
+            trades['pnl_pips'].append(move / pip_size(symbol))
+            trades['partial_index'].append(partial_index)
+            trades['exit_reason'].append(reason)
+        
+        self.symbols = symbols
+        self.trade_arrays = {name: np.array(values) for name, values in trades.items()}
+        self.book_stats = {'max_open_positions': max_open, 'skipped_entries': skipped, 'open_at_end': open_at_end}
+        
+        pnl = self.trade_arrays['pnl']
+        if self.costs:
+            self._apply_costs(models)
+            pnl = self.trade_arrays['net_pnl']
+            self.trade_arrays['pnl_pips'] = self.trade_arrays['net_pips']
+        
+        results = Backtester(self.initial_balance)._calculate_statistics_arrays(pnl)
+        results['pnl_pips'] = float(self.trade_arrays['pnl_pips'].sum()) if len(self.trade_arrays['pnl_pips']) else 0.0
+        results['partial_closes'] = int((self.trade_arrays['partial_index'] >= 0).sum()) if trades['symbol'] else 0
+        results.update(self.book_stats)
+        if self.costs:
+            results['gross_pnl'] = float(self.trade_arrays['pnl'].sum())
+            results['pnl_usd'] = float(self.trade_arrays['pnl_usd'].sum())
+        return results
+    
+    def _apply_costs(self, models):
+        """Add each symbol's CostModel output to the trade arrays, one vectorized call per symbol."""
+        trades = self.trade_arrays
+        columns = {name: np.zeros(len(trades['pnl'])) for name in ('cost', 'net_pnl', 'net_pips', 'commission', 'pnl_usd')}
+        for order, symbol in enumerate(self.symbols):
+            mask = trades['symbol'] == order
+            if not mask.any():
+                continue
+            applied = models[symbol].apply({name: values[mask] for name, values in trades.items()})
+            for name, values in applied.items():
+                columns[name][mask] = values
+        trades.update(columns)
+    
+    def trades_frame(self):
+        """Trades from the last run, ordered by entry time."""
+        trades = self.trade_arrays
+        if not len(trades['pnl']):
+            return pd.DataFrame(columns=['symbol', 'entry_time', 'exit_time', 'type', 'entry_price', 'exit_price',
+                                         'pnl', 'pnl_pips', 'partial', 'exit_reason'])
+        return pd.DataFrame({
+            'symbol': np.array(self.symbols)[trades['symbol']],
+            'entry_time': pd.to_datetime(trades['entry_time']),
+            'exit_time': pd.to_datetime(trades['exit_time']),
+            'type': np.where(trades['is_buy'], 'buy', 'sell'),
+            'entry_price': trades['entry_price'],
+            'exit_price': trades['exit_price'],
+            'pnl': trades['pnl'],
+            'pnl_pips': trades['pnl_pips'],
+            'partial': trades['partial_index'] >= 0,
+            'exit_reason': np.array(EXIT_REASONS)[trades['exit_reason']]
+        })
@@ -0,0 +1,572 @@
+"""Pure-NumPy indicator kernels used by ``IndicatorEngine(df, backend='numpy')``.
+
+Every kernel works along the last axis, so the same code handles a single
+series of shape (bars,) or a batch of symbols of shape (symbols, bars).
+Values reproduce the ``ta`` library implementations used by
+``IndicatorEngine.calculate_all`` (including its warm-up quirks).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+CHUNK_SIZE = 1 << 15  # windows reduced per block (bounds temporary memory)
+SCAN_BLOCK = 128      # block length of the linear-recurrence scan
+
+
+def shift(x, periods=1):
+    """Shift along the last axis, filling with NaN."""
+    out = np.full(x.shape, np.nan)
+    if periods < x.shape[-1]:
+        out[..., periods:] = x[..., :-periods]
+    return out
+
+
+def _reduce(block, how):
+    """Reduce the trailing window axis of ``block``."""
+    if how == 'mean':
+        return block.mean(axis=-1)
+    if how == 'sum':
+        return block.sum(axis=-1)
+    if how == 'max':
+        return block.max(axis=-1)
+    if how == 'min':
+        return block.min(axis=-1)
+    if how == 'std':
+        return block.std(axis=-1)
+    if how == 'std1':
+        return block.std(axis=-1, ddof=1)
+    if how == 'mad':
+        return np.abs(block - block.mean(axis=-1, keepdims=True)).mean(axis=-1)
+    raise ValueError(f"Unknown rolling reduction: {how}")
+
+
+def _rolling_extreme(x, window, how):
+    """
+    Rolling max/min in O(n) with the van Herk/Gil-Werman block algorithm.
+    
+    Returns values for complete windows only (positions window-1 onwards).
+    """
+    ufunc = np.maximum if how == 'max' else np.minimum
+    fill = -np.inf if how == 'max' else np.inf
+    n = x.shape[-1]
+    n_blocks = -(-n // window)
+    padded = np.full(x.shape[:-1] + (n_blocks * window,), fill)
+    padded[..., :n] = x
+    blocks = padded.reshape(x.shape[:-1] + (n_blocks, window))
+    prefix = ufunc.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    return ufunc(suffix[..., :n - window + 1], prefix[..., window - 1:n])
+
+
+def rolling(x, window, how='mean', min_periods=None):
+    """
+    Rolling reduction along the last axis (pandas ``rolling`` semantics).
+    
+    Args:
+        x: Input array (..., bars)
+        window: Window length
+        how: 'mean', 'sum', 'max', 'min', 'std' (ddof=0), 'std1' (ddof=1) or 'mad'
+        min_periods: Minimum observations for a value (defaults to window)
+    
+    Returns:
+        Array shaped like ``x`` with NaN where the window is incomplete
+    """
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if min_periods is None:
+        min_periods = window
+    
+    if n >= window and how in ('max', 'min'):
+        out[..., window - 1:] = _rolling_extreme(x, window, how)
+    elif n >= window:
+        view = sliding_window_view(x, window, axis=-1)
+        for start in range(0, view.shape[-2], CHUNK_SIZE):
+            block = view[..., start:start + CHUNK_SIZE, :]
+            pos = window - 1 + start
+            out[..., pos:pos + block.shape[-2]] = _reduce(block, how)
+    
+    # Partial windows at the start when min_periods < window
+    for i in range(max(min_periods, 1) - 1, min(window - 1, n)):
+        out[..., i] = _reduce(x[..., :i + 1], how)
+    
+    return out
+
+
+def linear_recurrence(u, w, y0):
+    """
+    Solve ``y[t] = w * y[t-1] + u[t]`` along the last axis with ``y[-1] = y0``.
+    
+    Uses a blocked scan: each block is solved in closed form with a cumulative
+    sum, and the block carries are solved by the same recurrence one level up.
+    
+    Args:
+        u: Input array (rows, m)
+        w: Decay factor (0 < w < 1)
+        y0: Initial state per row, shape (rows,)
+    
+    Returns:
+        Array (rows, m)
+    """
+    rows, m = u.shape
+    y0 = np.asarray(y0, dtype=float).reshape(rows)
+    if m == 0:
+        return u.copy()
+    
+    # Keep w**-block well inside float range
+    block = int(max(1, min(SCAN_BLOCK, 300 / -np.log(w))))
+    if block == 1:
+        out = np.empty((rows, m))
+        state = y0
+        for t in range(m):
+            state = w * state + u[:, t]
+            out[:, t] = state
+        return out
+    
+    n_blocks = -(-m // block)
+    padded = np.zeros((rows, n_blocks * block))
+    padded[:, :m] = u
+    padded = padded.reshape(rows, n_blocks, block)
+    
+    k = np.arange(block)
+    local = np.cumsum(padded * w ** -k, axis=-1) * w ** k
+    
+    if n_blocks == 1:
+        carries = y0[:, None]
+    else:
+        ends = linear_recurrence(local[:, :-1, -1], w ** block, y0)
+        carries = np.concatenate([y0[:, None], ends], axis=1)
+    
+    out = local + carries[:, :, None] * w ** (k + 1)
+    return out.reshape(rows, -1)[:, :m]
+
+
+def ema(x, alpha, min_periods):
+    """
+    Exponential moving average matching ``Series.ewm(alpha=..., adjust=False)``.
+    
+    Leading NaNs are skipped (the average is seeded with the first valid value).
+    """
+    shape = x.shape
+    n = shape[-1]
+    flat = x.reshape(-1, n)
+    out = np.full(flat.shape, np.nan)
+    valid = ~np.isnan(flat)
+    firsts = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+    
+    for first in np.unique(firsts):
+        if first >= n:
+            continue
+        rows = firsts == first
+        segment = flat[rows, first:]
+        smoothed = linear_recurrence(alpha * segment, 1 - alpha, segment[:, 0])
+        smoothed[:, :max(min_periods - 1, 0)] = np.nan
+        out[rows, first:] = smoothed
+    
+    return out.reshape(shape)
+
+
+def ema_span(x, span, min_periods=None):
+    """EMA parameterised by span (``ta.utils._ema``)."""
+    return ema(x, 2.0 / (span + 1), span if min_periods is None else min_periods)
+
+
+def wilder_atr(true_range, window=14):
+    """ATR as computed by ``ta.volatility.AverageTrueRange`` (zeros during warm-up)."""
+    n = true_range.shape[-1]
+    flat = true_range.reshape(-1, n)
+    atr = np.zeros(flat.shape)
+    if n >= window:
+        seed = flat[:, :window].mean(axis=1)
+        atr[:, window - 1] = seed
+        atr[:, window:] = linear_recurrence(
+            flat[:, window:] / float(window), (window - 1) / float(window), seed)
+    return atr.reshape(true_range.shape)
+
+
+def adx(high, low, true_range, window=14):
+    """ADX, +DI and -DI as computed by ``ta.trend.ADXIndicator``."""
+    n = high.shape[-1]
+    shape = high.shape
+    adx_out = np.zeros(shape).reshape(-1, n)
+    pos_out = np.zeros(shape).reshape(-1, n)
+    neg_out = np.zeros(shape).reshape(-1, n)
+    if n < 2 * window + 1:
+        return adx_out.reshape(shape), pos_out.reshape(shape), neg_out.reshape(shape)
+    
+    high = high.reshape(-1, n)
+    low = low.reshape(-1, n)
+    true_range = true_range.reshape(-1, n)
+    
+    diff_up = high - shift(high)
+    diff_down = shift(low) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+    
+    decay = (window - 1) / float(window)
+    
+    def smooth(values):
+        smoothed = np.empty((values.shape[0], n - window))
+        smoothed[:, 0] = values[:, 1:window + 1].sum(axis=1)
+        smoothed[:, 1:] = linear_recurrence(values[:, window + 1:], decay, smoothed[:, 0])
+        return smoothed
+    
+    trs = smooth(true_range)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dip = np.where(trs != 0, 100 * (smooth(pos) / trs), 0.0)
+        din = np.where(trs != 0, 100 * (smooth(neg) / trs), 0.0)
+        dx = np.where(dip + din != 0, 100 * np.abs((dip - din) / (dip + din)), 0.0)
+    
+    # dx[:, j] belongs to bar window + j
+    seed = dx[:, :window].mean(axis=1)
+    adx_out[:, 2 * window - 1] = seed
+    adx_out[:, 2 * window:] = linear_recurrence(dx[:, window:] / float(window), decay, seed)
+    
+    # ta leaves +DI/-DI at zero on the first smoothed bar
+    pos_out[:, window + 1:] = dip[:, 1:]
+    neg_out[:, window + 1:] = din[:, 1:]
+    
+    return adx_out.reshape(shape), pos_out.reshape(shape), neg_out.reshape(shape)
+
+
+def psar(high, low, close, step=0.02, max_step=0.20):
+    """Parabolic SAR as computed by ``ta.trend.PSARIndicator``."""
+    shape = close.shape
+    n = shape[-1]
+    highs = high.reshape(-1, n)
+    lows = low.reshape(-1, n)
+    closes = close.reshape(-1, n)
+    out = closes.astype(float).copy()
+    
+    for row in range(closes.shape[0]):
+        h = highs[row].tolist()
+        l = lows[row].tolist()
+        sar = closes[row].tolist()
+        up_trend = True
+        af = step
+        up_trend_high = h[0]
+        down_trend_low = l[0]
+        
+        for i in range(2, n):
+            reversal = False
+            if up_trend:
+                value = sar[i - 1] + (af * (up_trend_high - sar[i - 1]))
+                if l[i] < value:
+                    reversal = True
+                    value = up_trend_high
+                    down_trend_low = l[i]
+                    af = step
+                else:
+                    if h[i] > up_trend_high:
+                        up_trend_high = h[i]
+                        af = af + step if af + step < max_step else max_step
+                    if l[i - 2] < value:
+                        value = l[i - 2]
+                    elif l[i - 1] < value:
+                        value = l[i - 1]
+            else:
+                value = sar[i - 1] - (af * (sar[i - 1] - down_trend_low))
+                if h[i] > value:
+                    reversal = True
+                    value = down_trend_low
+                    up_trend_high = h[i]
+                    af = step
+                else:
+                    if l[i] < down_trend_low:
+                        down_trend_low = l[i]
+                        af = af + step if af + step < max_step else max_step
+                    if h[i - 2] > value:
+                        value = h[i - 2]
+                    elif h[i - 1] > value:
+                        value = h[i - 1]
+            sar[i] = value
+            up_trend = up_trend != reversal
+        
+        out[row] = sar
+    
+    return out.reshape(shape)
+
+
+class KernelContext:
+    """Price arrays plus the shared intermediate series declared in DEPENDENCIES."""
+    
+    def __init__(self, open_, high, low, close, volume=None):
+        self.open = np.asarray(open_, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.close = np.asarray(close, dtype=float)
+        self.volume = None if volume is None else np.asarray(volume, dtype=float)
+        self.intermediates = {}
+    
+    def prepare(self, names):
+        """Compute intermediates once each, in the given order (prerequisites first)."""
+        for name in names:
+            if name not in self.intermediates:
+                self.intermediates[name] = INTERMEDIATES[name](self)
+    
+    def __getitem__(self, name):
+        """A prepared intermediate; a KeyError means a kernel reads one it does not declare."""
+        return self.intermediates[name]
+
+
+def _true_range(ctx):
+    """max(high, prev_close) - min(low, prev_close); high - low on the first bar."""
+    prev_close = ctx['_prev_close']
+    tr = np.maximum(ctx.high, prev_close) - np.minimum(ctx.low, prev_close)
+    tr[..., 0] = ctx.high[..., 0] - ctx.low[..., 0]
+    return tr
+
+
+def _errstate():
+    return np.errstate(divide='ignore', invalid='ignore')
+
+
+# --- Kernels: each returns a list of arrays in the order of its columns ---
+
+def _k_sma(window):
+    return lambda ctx: [ctx[f'_close_mean_{window}']]
+
+
+def _k_ema(span):
+    return lambda ctx: [ctx[f'_close_ema_{span}']]
+
+
+def _k_macd(ctx):
+    macd = ctx['_close_ema_12'] - ctx['_close_ema_26']
+    signal = ema_span(macd, 9)
+    return [macd, signal, macd - signal]
+
+
+def _k_adx(ctx):
+    return list(adx(ctx.high, ctx.low, ctx['_true_range']))
+
+
+def _k_cci(ctx):
+    tp = ctx['_typical_price']
+    mean = rolling(tp, 20, 'mean')
+    mad = rolling(tp, 20, 'mad')
+    with _errstate():
+        return [(tp - mean) / (0.015 * mad)]
+
+
+def _k_ichimoku(ctx):
+    conv = 0.5 * (rolling(ctx.high, 9, 'max') + rolling(ctx.low, 9, 'min'))
+    base = 0.5 * (rolling(ctx.high, 26, 'max') + rolling(ctx.low, 26, 'min'))
+    span_b = 0.5 * (rolling(ctx.high, 52, 'max', 0) + rolling(ctx.low, 52, 'min', 0))
+    return [0.5 * (conv + base), span_b]
+
+
+def _k_psar(ctx):
+    return [psar(ctx.high, ctx.low, ctx.close)]
+
+
+def _k_rsi(ctx, window=14):
+    diff = ctx['_close_diff']
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    emaup = ema(up, 1.0 / window, window)
+    emadn = ema(down, 1.0 / window, window)
+    with _errstate():
+        return [np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))]
+
+
+def _k_stoch(ctx):
+    smin = ctx['_low_min_14']
+    smax = ctx['_high_max_14']
+    with _errstate():
+        stoch_k = 100 * (ctx.close - smin) / (smax - smin)
+    return [stoch_k, rolling(stoch_k, 3, 'mean')]
+
+
+def _k_williams_r(ctx):
+    highest = ctx['_high_max_14']
+    lowest = ctx['_low_min_14']
+    with _errstate():
+        return [-100 * (highest - ctx.close) / (highest - lowest)]
+
+
+def _k_roc(ctx, window=12):
+    prev = shift(ctx.close, window)
+    return [((ctx.close - prev) / prev) * 100]
+
+
+def _k_tsi(ctx):
+    diff = ctx['_close_diff']
+    smoothed = ema_span(ema_span(diff, 25), 13)
+    smoothed_abs = ema_span(ema_span(np.abs(diff), 25), 13)
+    with _errstate():
+        return [(smoothed / smoothed_abs) * 100]
+
+
+def _k_bollinger(ctx):
+    mavg = ctx['_close_mean_20']
+    mstd = rolling(ctx.close, 20, 'std')
+    hband = mavg + 2 * mstd
+    lband = mavg - 2 * mstd
+    with _errstate():
+        wband = ((hband - lband) / mavg) * 100
+    return [hband, mavg, lband, wband]
+
+
+def _k_atr(ctx):
+    return [wilder_atr(ctx['_true_range'])]
+
+
+def _k_keltner(ctx):
+    high, low, close = ctx.high, ctx.low, ctx.close
+    tp_high = rolling(((4 * high) - (2 * low) + close) / 3.0, 20, 'mean', 0)
+    tp_low = rolling(((-2 * high) + (4 * low) + close) / 3.0, 20, 'mean', 0)
+    return [tp_high, tp_low]
+
+
+def _k_donchian(ctx):
+    return [rolling(ctx.high, 20, 'max'), rolling(ctx.low, 20, 'min')]
+
+
+def _k_obv(ctx):
+    signed = np.where(ctx.close < ctx['_prev_close'], -ctx.volume, ctx.volume)
+    return [np.cumsum(signed, axis=-1)]
+
+
+def _k_cmf(ctx):
+    with _errstate():
+        mfv = ((ctx.close - ctx.low) - (ctx.high - ctx.close)) / (ctx.high - ctx.low)
+        mfv = np.where(np.isnan(mfv), 0.0, mfv) * ctx.volume
+        return [rolling(mfv, 20, 'sum') / rolling(ctx.volume, 20, 'sum')]
+
+
+def _k_force_index(ctx):
+    return [ema_span(ctx['_close_diff'] * ctx.volume, 13)]
+
+
+def _k_mfi(ctx, window=14):
+    tp = ctx['_typical_price']
+    prev_tp = shift(tp)
+    up_down = np.where(tp > prev_tp, 1, np.where(tp < prev_tp, -1, 0))
+    mfr = tp * ctx.volume * up_down
+    positive = rolling(np.where(mfr >= 0.0, mfr, 0.0), window, 'sum')
+    negative = np.abs(rolling(np.where(mfr < 0.0, mfr, 0.0), window, 'sum'))
+    with _errstate():
+        return [100 - (100 / (1 + positive / negative))]
+
+
+def _k_price_momentum(ctx, periods=10):
+    return [ctx.close / shift(ctx.close, periods) - 1]
+
+
+def _k_volatility(ctx):
+    return [rolling(ctx.close, 20, 'std1')]
+
+
+# (group, output columns, kernel) in calculate_all column order
+KERNELS = [
+    ('sma_20', ['sma_20'], _k_sma(20)),
+    ('sma_50', ['sma_50'], _k_sma(50)),
+    ('sma_200', ['sma_200'], _k_sma(200)),
+    ('ema_12', ['ema_12'], _k_ema(12)),
+    ('ema_26', ['ema_26'], _k_ema(26)),
+    ('macd', ['macd', 'macd_signal', 'macd_diff'], _k_macd),
+    ('adx', ['adx', 'adx_pos', 'adx_neg'], _k_adx),
+    ('cci', ['cci'], _k_cci),
+    ('ichimoku', ['ichimoku_a', 'ichimoku_b'], _k_ichimoku),
+    ('psar', ['psar'], _k_psar),
+    ('rsi', ['rsi'], _k_rsi),
+    ('stoch', ['stoch_k', 'stoch_d'], _k_stoch),
+    ('williams_r', ['williams_r'], _k_williams_r),
+    ('roc', ['roc'], _k_roc),
+    ('tsi', ['tsi'], _k_tsi),
+    ('bollinger', ['bb_high', 'bb_mid', 'bb_low', 'bb_width'], _k_bollinger),
+    ('atr', ['atr'], _k_atr),
+    ('keltner', ['kc_high', 'kc_low'], _k_keltner),
+    ('donchian', ['dc_high', 'dc_low'], _k_donchian),
+    ('obv', ['obv'], _k_obv),
+    ('cmf', ['cmf'], _k_cmf),
+    ('fi', ['fi'], _k_force_index),
+    ('mfi', ['mfi'], _k_mfi),
+    ('price_momentum', ['price_momentum'], _k_price_momentum),
+    ('volatility', ['volatility'], _k_volatility),
+]
+
+VOLUME_GROUPS = {'obv', 'cmf', 'fi', 'mfi'}
+
+# Intermediate series shared between kernels (names start with '_'), in an
+# order where every prerequisite comes before the series that uses it
+INTERMEDIATES = {
+    '_prev_close': lambda ctx: shift(ctx.close),
+    '_close_diff': lambda ctx: ctx.close - ctx['_prev_close'],
+    '_true_range': _true_range,
+    '_typical_price': lambda ctx: (ctx.high + ctx.low + ctx.close) / 3.0,
+    '_close_mean_20': lambda ctx: rolling(ctx.close, 20, 'mean'),
+    '_close_mean_50': lambda ctx: rolling(ctx.close, 50, 'mean'),
+    '_close_mean_200': lambda ctx: rolling(ctx.close, 200, 'mean'),
+    '_close_ema_12': lambda ctx: ema_span(ctx.close, 12),
+    '_close_ema_26': lambda ctx: ema_span(ctx.close, 26),
+    '_high_max_14': lambda ctx: rolling(ctx.high, 14, 'max'),
+    '_low_min_14': lambda ctx: rolling(ctx.low, 14, 'min'),
+}
+
+# Prerequisites of each group and intermediate: the only intermediates a
+# kernel may read, each computed once per pass however many groups share it
+DEPENDENCIES = {
+    'sma_20': ['_close_mean_20'],
+    'sma_50': ['_close_mean_50'],
+    'sma_200': ['_close_mean_200'],
+    'ema_12': ['_close_ema_12'],
+    'ema_26': ['_close_ema_26'],
+    'macd': ['_close_ema_12', '_close_ema_26'],
+    'adx': ['_true_range'],
+    'cci': ['_typical_price'],
+    'rsi': ['_close_diff'],
+    'stoch': ['_high_max_14', '_low_min_14'],
+    'williams_r': ['_high_max_14', '_low_min_14'],
+    'tsi': ['_close_diff'],
+    'bollinger': ['_close_mean_20'],
+    'atr': ['_true_range'],
+    'obv': ['_prev_close'],
+    'fi': ['_close_diff'],
+    'mfi': ['_typical_price'],
+    '_close_diff': ['_prev_close'],
+    '_true_range': ['_prev_close'],
+}
+
+
+def compute_indicators(open_, high, low, close, volume=None, include_volume=None, groups=None,
+                       intermediates=None):
+    """
+    Compute calculate_all indicators into one preallocated array.
+    
+    Args:
+        open_, high, low, close, volume: Arrays shaped (bars,) or (symbols, bars)
+        include_volume: Compute volume indicators: a bool, or one bool per
+            symbol (default: per symbol, volume present and non-zero).
+            Symbols without volume get NaN in the volume columns, which
+            exist as soon as one symbol has volume
+        groups: Kernel groups to run (default: all)
+        intermediates: Intermediates the groups need, prerequisites first
+            (see indicators.resolve_groups; default: all of INTERMEDIATES)
+    
+    Returns:
+        (values, columns) where values has shape (..., bars, len(columns))
+    """
+    ctx = KernelContext(open_, high, low, close, volume)
+    ctx.prepare(INTERMEDIATES if intermediates is None else intermediates)
+    if include_volume is None:
+        include_volume = ctx.volume is not None and ctx.volume.sum(axis=-1) > 0
+    include_volume = np.asarray(include_volume, dtype=bool)
+    
+    kernels = [k for k in KERNELS
+               if (include_volume.any() or k[0] not in VOLUME_GROUPS)
+               and (groups is None or k[0] in groups)]
+    columns = [col for _, cols, _ in kernels for col in cols]
+    
+    # Column-major buffer: each kernel writes a contiguous slice
+    buffer = np.empty((len(columns),) + ctx.close.shape)
+    pos = 0
+    for group, cols, kernel in kernels:
+        for result in kernel(ctx):
+            buffer[pos] = result
+            if group in VOLUME_GROUPS and not include_volume.all():
+                buffer[pos][~include_volume] = np.nan
+            pos += 1
+    
+    return np.moveaxis(buffer, 0, -1), columns
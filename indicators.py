@@ -10,86 +10,370 @@ from ta.volatility import (BollingerBands, AverageTrueRange,
                            KeltnerChannel, DonchianChannel)
 from ta.volume import (OnBalanceVolumeIndicator, ChaikinMoneyFlowIndicator,
                        ForceIndexIndicator, MFIIndicator)
+import indicator_kernels
+
+
+# Indicator groups in calculate_all column order: (group, output columns)
+INDICATOR_GROUPS = [(group, columns) for group, columns, _ in indicator_kernels.KERNELS]
+
+INDICATOR_COLUMNS = [col for _, columns in INDICATOR_GROUPS for col in columns]
+
+VOLUME_GROUPS = indicator_kernels.VOLUME_GROUPS
+
+# Prerequisites of each group. Names starting with '_' are shared
+# intermediate series that are never returned as columns; the NumPy
+# backend computes each one once and kernels can only read declared ones.
+INDICATOR_DEPENDENCIES = indicator_kernels.DEPENDENCIES
+
+_COLUMN_GROUPS = {col: group for group, columns in INDICATOR_GROUPS for col in columns}
+
+_GROUP_NAMES = set(group for group, _ in INDICATOR_GROUPS)
+
+_BASE_COLUMNS = {'open', 'high', 'low', 'close', 'volume'}
+
+
+def resolve_groups(columns=None):
+    """
+    Resolve requested columns to the indicator groups that produce them.
+    
+    Args:
+        columns: Indicator column or group names (default: everything);
+            OHLCV column names are accepted and ignored
+    
+    Returns:
+        (groups, intermediates): group names in calculate_all order and the
+        shared intermediate series they need, prerequisites first
+    """
+    if columns is None:
+        wanted = set(_GROUP_NAMES)
+    else:
+        wanted = set()
+        for col in columns:
+            if col in _BASE_COLUMNS:
+                continue
+            group = _COLUMN_GROUPS.get(col, col)
+            if group not in _GROUP_NAMES:
+                raise ValueError(f"Unknown indicator column: {col}")
+            wanted.add(group)
+    groups = [group for group, _ in INDICATOR_GROUPS if group in wanted]
+    
+    # Walk the dependency graph depth first, so prerequisites come out first
+    intermediates = []
+    seen = set()
+    
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for prerequisite in INDICATOR_DEPENDENCIES.get(name, []):
+            visit(prerequisite)
+        if name.startswith('_'):
+            intermediates.append(name)
+    
+    for group in groups:
+        visit(group)
+    return groups, intermediates
+
+
+def required_columns(strategy=None, model=None):
+    """
+    Indicator columns a pipeline needs from a strategy and/or ML model.
+    
+    Args:
+        strategy: Object (or class) with a REQUIRED_COLUMNS attribute
+        model: ML model; its feature_columns are used once trained or loaded,
+            otherwise every column is required so it can be trained on the frame
+    
+    Returns:
+        List of indicator columns in calculate_all order
+    """
+    if strategy is None and model is None:
+        return list(INDICATOR_COLUMNS)
+    
+    needed = set()
+    if strategy is not None:
+        needed.update(strategy.REQUIRED_COLUMNS)
+    if model is not None:
+        if getattr(model, 'feature_columns', None) is None:
+            return list(INDICATOR_COLUMNS)
+        needed.update(model.feature_columns)
+    
+    return [col for col in INDICATOR_COLUMNS if col in needed]
 
 
 class IndicatorEngine:
     """Calculate 30+ technical indicators for forex trading."""
     
-    def __init__(self, df):
+    BACKENDS = ('ta', 'numpy')
+    
+    def __init__(self, df, backend='ta'):
         """
         Initialize with OHLCV dataframe.
         
         Args:
             df: DataFrame with columns ['open', 'high', 'low', 'close', 'volume']
+            backend: 'ta' (per-indicator ta objects) or 'numpy' (shared NumPy kernels)
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown indicator backend: {backend}")
         self.df = df.copy()
+        self.backend = backend
         
     def calculate_all(self):
         """Calculate all indicators and return enhanced dataframe."""
+        return self.calculate()
+    
+    def calculate(self, columns=None):
+        """
+        Calculate only the requested indicators and their prerequisites.
+        
+        Args:
+            columns: Indicator columns (or group names) to compute; None computes all
+        
+        Returns:
+            DataFrame with the OHLCV data plus every column of the resolved groups
+        """
+        groups, intermediates = resolve_groups(columns)
+        if self.backend == 'numpy':
+            return self._calculate_numpy(groups, intermediates)
+        
         df = self.df
         
         # Trend Indicators
-        df['sma_20'] = SMAIndicator(df['close'], window=20).sma_indicator()
-        df['sma_50'] = SMAIndicator(df['close'], window=50).sma_indicator()
-        df['sma_200'] = SMAIndicator(df['close'], window=200).sma_indicator()
-        df['ema_12'] = EMAIndicator(df['close'], window=12).ema_indicator()
-        df['ema_26'] = EMAIndicator(df['close'], window=26).ema_indicator()
+        if 'sma_20' in groups:
+            df['sma_20'] = SMAIndicator(df['close'], window=20).sma_indicator()
+        if 'sma_50' in groups:
+            df['sma_50'] = SMAIndicator(df['close'], window=50).sma_indicator()
+        if 'sma_200' in groups:
+            df['sma_200'] = SMAIndicator(df['close'], window=200).sma_indicator()
+        if 'ema_12' in groups:
+            df['ema_12'] = EMAIndicator(df['close'], window=12).ema_indicator()
+        if 'ema_26' in groups:
+            df['ema_26'] = EMAIndicator(df['close'], window=26).ema_indicator()
         
-        macd = MACD(df['close'])
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-        df['macd_diff'] = macd.macd_diff()
+        if 'macd' in groups:
+            macd = MACD(df['close'])
+            df['macd'] = macd.macd()
+            df['macd_signal'] = macd.macd_signal()
+            df['macd_diff'] = macd.macd_diff()
         
-        adx = ADXIndicator(df['high'], df['low'], df['close'])
-        df['adx'] = adx.adx()
-        df['adx_pos'] = adx.adx_pos()
-        df['adx_neg'] = adx.adx_neg()
+        if 'adx' in groups:
+            adx = ADXIndicator(df['high'], df['low'], df['close'])
+            df['adx'] = adx.adx()
+            df['adx_pos'] = adx.adx_pos()
+            df['adx_neg'] = adx.adx_neg()
         
-        df['cci'] = CCIIndicator(df['high'], df['low'], df['close']).cci()
+        if 'cci' in groups:
+            df['cci'] = CCIIndicator(df['high'], df['low'], df['close']).cci()
         
-        ichimoku = IchimokuIndicator(df['high'], df['low'])
-        df['ichimoku_a'] = ichimoku.ichimoku_a()
-        df['ichimoku_b'] = ichimoku.ichimoku_b()
+        if 'ichimoku' in groups:
+            ichimoku = IchimokuIndicator(df['high'], df['low'])
+            df['ichimoku_a'] = ichimoku.ichimoku_a()
+            df['ichimoku_b'] = ichimoku.ichimoku_b()
         
-        df['psar'] = PSARIndicator(df['high'], df['low'], df['close']).psar()
+        if 'psar' in groups:
+            df['psar'] = PSARIndicator(df['high'], df['low'], df['close']).psar()
         
         # Momentum Indicators
-        df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
+        if 'rsi' in groups:
+            df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
         
-        stoch = StochasticOscillator(df['high'], df['low'], df['close'])
-        df['stoch_k'] = stoch.stoch()
-        df['stoch_d'] = stoch.stoch_signal()
+        if 'stoch' in groups:
+            stoch = StochasticOscillator(df['high'], df['low'], df['close'])
+            df['stoch_k'] = stoch.stoch()
+            df['stoch_d'] = stoch.stoch_signal()
         
-        df['williams_r'] = WilliamsRIndicator(df['high'], df['low'], df['close']).williams_r()
-        df['roc'] = ROCIndicator(df['close']).roc()
-        df['tsi'] = TSIIndicator(df['close']).tsi()
+        if 'williams_r' in groups:
+            df['williams_r'] = WilliamsRIndicator(df['high'], df['low'], df['close']).williams_r()
+        if 'roc' in groups:
+            df['roc'] = ROCIndicator(df['close']).roc()
+        if 'tsi' in groups:
+            df['tsi'] = TSIIndicator(df['close']).tsi()
         
         # Volatility Indicators
-        bb = BollingerBands(df['close'])
-        df['bb_high'] = bb.bollinger_hband()
-        df['bb_mid'] = bb.bollinger_mavg()
-        df['bb_low'] = bb.bollinger_lband()
-        df['bb_width'] = bb.bollinger_wband()
+        if 'bollinger' in groups:
+            bb = BollingerBands(df['close'])
+            df['bb_high'] = bb.bollinger_hband()
+            df['bb_mid'] = bb.bollinger_mavg()
+            df['bb_low'] = bb.bollinger_lband()
+            df['bb_width'] = bb.bollinger_wband()
         
-        df['atr'] = AverageTrueRange(df['high'], df['low'], df['close']).average_true_range()
+        if 'atr' in groups:
+            df['atr'] = AverageTrueRange(df['high'], df['low'], df['close']).average_true_range()
         
-        kc = KeltnerChannel(df['high'], df['low'], df['close'])
-        df['kc_high'] = kc.keltner_channel_hband()
-        df['kc_low'] = kc.keltner_channel_lband()
+        if 'keltner' in groups:
+            kc = KeltnerChannel(df['high'], df['low'], df['close'])
+            df['kc_high'] = kc.keltner_channel_hband()
+            df['kc_low'] = kc.keltner_channel_lband()
         
-        dc = DonchianChannel(df['high'], df['low'], df['close'])
-        df['dc_high'] = dc.donchian_channel_hband()
-        df['dc_low'] = dc.donchian_channel_lband()
+        if 'donchian' in groups:
+            dc = DonchianChannel(df['high'], df['low'], df['close'])
+            df['dc_high'] = dc.donchian_channel_hband()
+            df['dc_low'] = dc.donchian_channel_lband()
         
         # Volume Indicators (if volume available)
         if 'volume' in df.columns and df['volume'].sum() > 0:
-            df['obv'] = OnBalanceVolumeIndicator(df['close'], df['volume']).on_balance_volume()
-            df['cmf'] = ChaikinMoneyFlowIndicator(df['high'], df['low'], df['close'], df['volume']).chaikin_money_flow()
-            df['fi'] = ForceIndexIndicator(df['close'], df['volume']).force_index()
-            df['mfi'] = MFIIndicator(df['high'], df['low'], df['close'], df['volume']).money_flow_index()
+            if 'obv' in groups:
+                df['obv'] = OnBalanceVolumeIndicator(df['close'], df['volume']).on_balance_volume()
+            if 'cmf' in groups:
+                df['cmf'] = ChaikinMoneyFlowIndicator(df['high'], df['low'], df['close'], df['volume']).chaikin_money_flow()
+            if 'fi' in groups:
+                df['fi'] = ForceIndexIndicator(df['close'], df['volume']).force_index()
+            if 'mfi' in groups:
+                df['mfi'] = MFIIndicator(df['high'], df['low'], df['close'], df['volume']).money_flow_index()
         
         # Custom indicators
-        df['price_momentum'] = df['close'].pct_change(periods=10)
-        df['volatility'] = df['close'].rolling(window=20).std()
+        if 'price_momentum' in groups:
+            df['price_momentum'] = df['close'].pct_change(periods=10)
+        if 'volatility' in groups:
+            df['volatility'] = df['close'].rolling(window=20).std()
         
         return df
+    
+    def _calculate_numpy(self, groups, intermediates):
+        """Calculate indicators with the NumPy kernels in one preallocated array."""
+        df = self.df
+        volume = df['volume'].to_numpy(dtype=float) if 'volume' in df.columns else None
+        include_volume = 'volume' in df.columns and df['volume'].sum() > 0
+        
+        values, columns = indicator_kernels.compute_indicators(
+            df['open'].to_numpy(dtype=float),
+            df['high'].to_numpy(dtype=float),
+            df['low'].to_numpy(dtype=float),
+            df['close'].to_numpy(dtype=float),
+            volume,
+            include_volume=include_volume,
+            groups=groups,
+            intermediates=intermediates
+        )
+        
+        indicators = pd.DataFrame(values, index=df.index, columns=columns)
+        return pd.concat([df.drop(columns=columns, errors='ignore'), indicators], axis=1)
+
+
+class IndicatorBatch:
+    """Indicators for several symbols computed in one pass, viewable per symbol."""
+    
+    def __init__(self, symbols, indexes, ohlcv, values, columns, has_volume=None):
+        """
+        Args:
+            symbols: Symbol names, one per row of the arrays
+            indexes: Per-symbol bar index
+            ohlcv: Dict of input name -> (symbols, bars) array
+            values: (symbols, bars, len(columns)) indicator array
+            columns: Indicator column names
+            has_volume: Per-symbol flags; symbols without volume leave out
+                the volume columns (default: every symbol has volume)
+        """
+        self.symbols = list(symbols)
+        self.indexes = indexes
+        self.ohlcv = ohlcv
+        self.values = values
+        self.columns = columns
+        self.has_volume = np.ones(len(self.symbols), dtype=bool) if has_volume is None else has_volume
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self._volume_columns = [col for group, cols in INDICATOR_GROUPS if group in VOLUME_GROUPS
+                                for col in cols if col in columns]
+    
+    def __len__(self):
+        return len(self.symbols)
+    
+    def __iter__(self):
+        return iter(self.symbols)
+    
+    def __contains__(self, symbol):
+        return symbol in self._rows
+    
+    def __getitem__(self, symbol):
+        """Per-symbol frame laid out like IndicatorEngine.calculate()."""
+        row = self._rows[symbol]
+        index = self.indexes[row]
+        prices = pd.DataFrame({name: values[row] for name, values in self.ohlcv.items()}, index=index)
+        indicators = pd.DataFrame(self.values[row], index=index, columns=self.columns)
+        if not self.has_volume[row]:
+            # Same columns as IndicatorEngine on this symbol alone
+            indicators = indicators.drop(columns=self._volume_columns)
+        return pd.concat([prices, indicators], axis=1)
+    
+    def items(self):
+        for symbol in self.symbols:
+            yield symbol, self[symbol]
+    
+    def latest(self):
+        """Last-bar indicator values for every symbol, one row per symbol."""
+        return pd.DataFrame(self.values[:, -1, :], index=self.symbols, columns=self.columns)
+
+
+def calculate_batch(symbols, open_, high, low, close, volume=None, index=None, columns=None):
+    """
+    Calculate indicators for N symbols at once with the NumPy kernels.
+    
+    Args:
+        symbols: N symbol names
+        open_, high, low, close, volume: Aligned (N, bars) arrays
+        index: Bar index shared by all symbols, or a list of N per-symbol indexes
+        columns: Indicator columns to compute (default: all)
+    
+    Returns:
+        IndicatorBatch
+    
+    Volume indicators are decided per symbol: symbols without volume get
+    frames without the volume columns, as with IndicatorEngine.
+    """
+    ohlcv = {'open': open_, 'high': high, 'low': low, 'close': close}
+    if volume is not None:
+        ohlcv['volume'] = volume
+    ohlcv = {name: np.asarray(values, dtype=float) for name, values in ohlcv.items()}
+    
+    n_symbols, n_bars = ohlcv['close'].shape
+    if index is None:
+        index = pd.RangeIndex(n_bars)
+    indexes = list(index) if isinstance(index, (list, tuple)) else [index] * n_symbols
+    
+    groups, intermediates = resolve_groups(columns)
+    values, names = indicator_kernels.compute_indicators(
+        ohlcv['open'], ohlcv['high'], ohlcv['low'], ohlcv['close'], ohlcv.get('volume'),
+        groups=groups, intermediates=intermediates
+    )
+    has_volume = ohlcv['volume'].sum(axis=1) > 0 if 'volume' in ohlcv else np.zeros(n_symbols, dtype=bool)
+    return IndicatorBatch(symbols, indexes, ohlcv, values, names, has_volume)
+
+
+def calculate_frames(frames, columns=None):
+    """
+    Calculate indicators for a dict of symbol -> OHLCV DataFrame in batches.
+    
+    Frames of equal length are stacked into one (symbols x bars) pass, so
+    a universe fetched with the same bar count costs a single batch.
+    
+    Args:
+        frames: Dict of symbol -> DataFrame with OHLCV columns
+        columns: Indicator columns to compute (default: all)
+    
+    Returns:
+        Dict of symbol -> indicator DataFrame, in the order of frames
+    """
+    by_length = {}
+    for symbol, df in frames.items():
+        by_length.setdefault(len(df), []).append(symbol)
+    
+    results = {}
+    for symbols in by_length.values():
+        group = [frames[symbol] for symbol in symbols]
+        
+        def stack(name):
+            return np.stack([df[name].to_numpy(dtype=float) if name in df.columns else np.zeros(len(df))
+                             for df in group])
+        
+        volume = stack('volume') if any('volume' in df.columns for df in group) else None
+        batch = calculate_batch(
+            symbols, stack('open'), stack('high'), stack('low'), stack('close'), volume,
+            index=[df.index for df in group], columns=columns
+        )
+        for symbol, df in zip(symbols, group):
+            frame = batch[symbol]
+            if volume is not None and 'volume' not in df.columns:
+                frame = frame.drop(columns='volume')
+            results[symbol] = frame
+    
+    return {symbol: results[symbol] for symbol in frames}
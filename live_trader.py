@@ -1,5 +1,6 @@
 """Live trading module (template for broker integration)."""
 
+import os
 import time
 from datetime import datetime
 from data_loader import DataLoader
@@ -17,6 +18,8 @@ class LiveTrader:
         self.risk_manager = RiskManager(account_balance)
         self.ml_model = TradingModel()
         self.ml_model.load('forex_model.pkl')
+        if os.path.exists('forex_model.compiled'):
+            self.ml_model.load_compiled('forex_model.compiled')
         self.active_trades = []
         
     def get_live_data(self, pair, periods=200):
@@ -40,8 +43,8 @@ class LiveTrader:
         signal_gen = SignalGenerator(df_indicators)
         df_signals = signal_gen.generate_signals()
         
-        # Get ML prediction
-        ml_signals, ml_confidence = self.ml_model.predict(df_signals)
+        # Get ML prediction (only the bars that decide the latest signal)
+        ml_signals, ml_confidence = self.ml_model.predict_latest(df_signals, SignalGenerator.ML_TAIL)
         
         # Combine signals
         df_final = signal_gen.combine_with_ml(df_signals, ml_signals, ml_confidence)
@@ -0,0 +1,120 @@
+"""Lookback planner: how many bars a pipeline has to fetch."""
+
+import math
+
+from indicators import INDICATOR_GROUPS, resolve_groups, required_columns
+
+
+# Weight an EMA's seed may still carry before it counts as converged
+EMA_TOLERANCE = 1e-6
+
+# Parabolic SAR is path dependent and never fully forgets its start; it
+# settles after its first reversal, which this allowance comfortably covers
+PSAR_LOOKBACK = 200
+
+_BASE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def ema_warmup(alpha, tolerance=EMA_TOLERANCE):
+    """Bars until an EMA's seed carries less than ``tolerance`` weight."""
+    return int(math.ceil(math.log(tolerance) / math.log(1 - alpha)))
+
+
+def indicator_lookback(tolerance=EMA_TOLERANCE):
+    """
+    Bars of history each indicator group needs for its latest value.
+    
+    Recursive indicators (EMA, Wilder smoothing) add the bars needed for
+    their seed to decay below ``tolerance``; chained smoothers add up.
+    Cumulative indicators (obv) have no finite lookback and report 1: their
+    level is relative to the first fetched bar, as it always was.
+    
+    Returns:
+        Dict of group name -> bars
+    """
+    def span(n):
+        return ema_warmup(2 / (n + 1), tolerance)
+    
+    wilder = ema_warmup(1 / 14, tolerance)
+    ema_26 = max(26, span(26)) + 1
+    
+    lookback = {
+        'sma_20': 20,
+        'sma_50': 50,
+        'sma_200': 200,
+        'ema_12': max(12, span(12)) + 1,
+        'ema_26': ema_26,
+        'macd': ema_26 + span(9),
+        'adx': 2 * 14 + 2 * wilder,
+        'cci': 20,
+        'ichimoku': 52,
+        'psar': PSAR_LOOKBACK,
+        'rsi': 14 + wilder + 1,
+        'stoch': 14 + 3 - 1,
+        'williams_r': 14,
+        'roc': 12 + 1,
+        'tsi': 1 + 25 + span(25) + 13 + span(13),
+        'bollinger': 20,
+        'atr': 14 + wilder,
+        'keltner': 20,
+        'donchian': 20,
+        'obv': 1,
+        'cmf': 20,
+        'fi': 1 + 13 + span(13),
+        'mfi': 14 + 1,
+        'price_momentum': 10 + 1,
+        'volatility': 20,
+    }
+    assert set(lookback) == set(group for group, _ in INDICATOR_GROUPS)
+    return lookback
+
+
+def column_lookback(column, tolerance=EMA_TOLERANCE):
+    """Bars of history needed for the latest value of one OHLCV or indicator column."""
+    if column in _BASE_COLUMNS:
+        return 1
+    groups, _ = resolve_groups([column])
+    lookback = indicator_lookback(tolerance)
+    return max(lookback[group] for group in groups)
+
+
+def plan_bars(strategy=None, model=None, patterns=None, tail=1, tolerance=EMA_TOLERANCE):
+    """
+    Minimum number of bars to fetch so the last ``tail`` bars of a pipeline
+    come out the same as with unlimited history.
+    
+    Consumers declare what they read: ``REQUIRED_COLUMNS`` (indicator
+    columns), ``LOOKBACK_WINDOWS`` (column -> rolling window applied on top
+    of it; '*' means a window over the consumer's own output) and an
+    optional ``MIN_BARS`` guard.
+    
+    Args:
+        strategy: Strategy object or class (ScalpingStrategy, SignalGenerator)
+        model: ML model; an untrained one needs every column (it may be fit on the frame)
+        patterns: PatternRecognizer (object or class) if patterns are analysed
+        tail: Trailing bars whose values must be exact
+        tolerance: EMA convergence tolerance
+    
+    Returns:
+        Number of bars
+    """
+    bars = 1
+    for consumer in (strategy, model, patterns):
+        if consumer is None:
+            continue
+        
+        if consumer is model:
+            columns = required_columns(model=model)
+        else:
+            columns = list(getattr(consumer, 'REQUIRED_COLUMNS', []))
+        
+        windows = dict(getattr(consumer, 'LOOKBACK_WINDOWS', {}))
+        own_window = windows.pop('*', 1)
+        needed = max([column_lookback(col, tolerance) for col in columns] or [1])
+        for col, window in windows.items():
+            needed = max(needed, column_lookback(col, tolerance) + window - 1)
+        needed += own_window - 1
+        
+        bars = max(bars, needed, getattr(consumer, 'MIN_BARS', 0))
+    
+    return bars + tail - 1
@@ -2,7 +2,7 @@
 
 import pandas as pd
 from data_loader import DataLoader
-from indicators import IndicatorEngine
+from result_cache import cached_indicators, cached_predictions, cached_backtest
 from signal_generator import SignalGenerator
 from ml_model import TradingModel
 from backtester import Backtester
@@ -26,8 +26,7 @@ def main():
     
     # Step 2: Calculate indicators
     print("\n[2/6] Calculating 30+ technical indicators...")
-    indicator_engine = IndicatorEngine(df)
-    df_with_indicators = indicator_engine.calculate_all()
+    df_with_indicators, stage_key = cached_indicators(df)
     print(f"Calculated {len(df_with_indicators.columns) - 5} indicators")
     
     # Step 3: Generate signals from indicators
@@ -35,16 +34,13 @@ def main():
     signal_gen = SignalGenerator(df_with_indicators)
     df_with_signals = signal_gen.generate_signals()
     
-    # Step 4: Train ML model
+    # Step 4: Train ML model and predict (reused from the result cache for unchanged data and model settings)
     print("\n[4/6] Training machine learning model...")
     ml_model = TradingModel()
-    train_score, test_score = ml_model.train(df_with_signals)
+    ml_signals, ml_confidence, stage_key = cached_predictions(ml_model, df_with_signals, stage_key)
     
-    # Step 5: Get ML predictions
-    print("\n[5/6] Generating ML predictions...")
-    ml_signals, ml_confidence = ml_model.predict(df_with_signals)
-    
-    # Combine indicator signals with ML
+    # Step 5: Combine indicator signals with ML predictions
+    print("\n[5/6] Combining ML predictions with indicator signals...")
     df_final = signal_gen.combine_with_ml(df_with_signals, ml_signals, ml_confidence)
     df_final = signal_gen.filter_signals(df_final)
     
@@ -56,11 +52,12 @@ def main():
     # Step 6: Backtest strategy
     print("\n[6/6] Running backtest...")
     backtester = Backtester(initial_balance=10000)
-    results = backtester.run(df_final)
+    results = cached_backtest(backtester, df_final, stage_key)
     backtester.print_results(results)
     
     # Save model
     ml_model.save('forex_model.pkl')
+    ml_model.save_compiled('forex_model.compiled')
     
     # Save results
     df_final.to_csv('trading_signals.csv')
@@ -21,9 +21,19 @@ class TradingModel:
         )
         self.scaler = StandardScaler()
         self.feature_columns = None
+        self.compiled = None  # compiled_model.CompiledModel used for inference when loaded
+        
+    def prepare_features(self, df, columns=None):
+        """
+        Prepare features for ML model.
+        
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+            columns: Trained feature columns to select (default: infer from df and record them)
+        """
+        if columns is not None:
+            return df[columns].dropna()
         
-    def prepare_features(self, df):
-        """Prepare features for ML model."""
         # Drop non-feature columns
         exclude_cols = ['open', 'high', 'low', 'close', 'volume', 'target', 'signal']
         feature_cols = [col for col in df.columns if col not in exclude_cols]
@@ -58,6 +68,8 @@ class TradingModel:
     
     def train(self, df):
         """Train the model on historical data."""
+        self.compiled = None
+        
         # Create target
         df['target'] = self.create_target(df)
         
@@ -91,14 +103,43 @@ class TradingModel:
         
         return train_score, test_score
     
+    def fit(self, X, y):
+        """
+        Fit scaler and model on an already prepared feature matrix, without a holdout split.
+        
+        Returns:
+            Training accuracy
+        """
+        self.compiled = None
+        self.feature_columns = list(X.columns)
+        X_scaled = self.scaler.fit_transform(X)
+        self.model.fit(X_scaled, y)
+        return self.model.score(X_scaled, y)
+    
     def predict(self, df):
         """Predict trade signals with confidence."""
-        X = self.prepare_features(df)
-        X_scaled = self.scaler.transform(X)
+        X = self.prepare_features(df, columns=self.feature_columns)
+        return self.predict_features(X)
+    
+    def predict_latest(self, df, n=1):
+        """
+        Predict only the last ``n`` bars (the live path: callers read the latest bar).
+        
+        Returns:
+            (signals, confidence) arrays for the last n bars, like the tail of predict()
+        """
+        return self.predict(df.iloc[-n:])
+    
+    def predict_features(self, X):
+        """Predict trade signals with confidence from a prepared feature matrix."""
+        model = self.compiled
+        if model is None:
+            model = self.model
+            X = self.scaler.transform(X)
         
-        # Get predictions and probabilities
-        predictions = self.model.predict(X_scaled)
-        probabilities = self.model.predict_proba(X_scaled)
+        # One predict_proba pass; the predicted class is its most probable column
+        probabilities = model.predict_proba(X)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
         
         # Get confidence (max probability)
         confidence = np.max(probabilities, axis=1)
@@ -123,4 +164,25 @@ class TradingModel:
         self.model = data['model']
         self.scaler = data['scaler']
         self.feature_columns = data['features']
+        self.compiled = None
         print(f"Model loaded from {filepath}")
+    
+    def save_compiled(self, filepath='model.compiled'):
+        """Export the fitted model to the compiled inference format (see compiled_model)."""
+        from compiled_model import export_model
+        
+        export_model(self, filepath)
+        print(f"Compiled model saved to {filepath}")
+    
+    def load_compiled(self, filepath='model.compiled', mmap=True):
+        """
+        Load a compiled model for inference (memory-mapped by default).
+        
+        Predictions then go through the compiled evaluator; training
+        replaces it with a freshly fitted sklearn model.
+        """
+        from compiled_model import load_model
+        
+        self.compiled = load_model(filepath, mmap=mmap)
+        self.feature_columns = self.compiled.feature_columns
+        print(f"Compiled model loaded from {filepath}")
@@ -0,0 +1,125 @@
+"""Monte Carlo resampling of backtest trade sequences."""
+
+import numpy as np
+
+
+# Path values per block (float32): small enough to stay in cache between passes
+BLOCK_VALUES = 2 ** 20
+
+METHODS = ('bootstrap', 'permute')
+
+
+def resample_block(pnl, paths, trades, method, rng):
+    """
+    One block of resampled P&L sequences.
+    
+    Args:
+        pnl: float32 trade P&L array
+        paths: Number of sequences
+        trades: Trades per sequence (bootstrap only; permutations keep len(pnl))
+        method: 'bootstrap' (draw with replacement) or 'permute' (shuffle the order)
+        rng: numpy Generator
+    
+    Returns:
+        (paths, trades) float32 array
+    """
+    if method == 'bootstrap':
+        return pnl[rng.integers(0, len(pnl), (paths, trades), dtype=np.int32)]
+    return rng.permuted(np.broadcast_to(pnl, (paths, len(pnl))), axis=1)
+
+
+def path_stats(block, initial_balance, ruin_balance):
+    """
+    Final P&L, max drawdown and ruin flag of each row of a P&L block.
+    
+    The block is overwritten.
+    
+    Returns:
+        (final_pnl, max_drawdown, max_drawdown_pct, ruined) arrays, one value per row
+    """
+    final = block.sum(axis=1, dtype=np.float64)
+    equity = np.cumsum(block, axis=1, out=block)
+    ruined = equity.min(axis=1) + initial_balance <= ruin_balance
+    
+    # Drawdown from the running peak, which starts at the initial balance
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 0, out=peak)
+    drawdown = np.subtract(peak, equity, out=equity)
+    max_drawdown = drawdown.max(axis=1).astype(float)
+    peak += initial_balance
+    max_drawdown_pct = np.divide(drawdown, peak, out=drawdown).max(axis=1).astype(float) * 100
+    return final, max_drawdown, max_drawdown_pct, ruined
+
+
+def monte_carlo(pnl, resamples=10000, method='bootstrap', trades=None, initial_balance=10000,
+                ruin_fraction=0.5, seed=None):
+    """
+    Distribution of outcomes over resampled trade sequences.
+    
+    Sequences are built and evaluated a block of rows at a time, each block
+    in a handful of NumPy passes (gather, cumsum, running max), in float32
+    to halve memory traffic.
+    
+    Args:
+        pnl: Trade P&L in account currency (e.g. Backtester.trade_arrays['pnl'])
+        resamples: Number of sequences
+        method: 'bootstrap' or 'permute' (see resample_block)
+        trades: Trades per bootstrap sequence (default: len(pnl))
+        initial_balance: Starting balance
+        ruin_fraction: Share of the initial balance whose loss counts as ruin
+        seed: Random seed
+    
+    Returns:
+        Dict with per-sequence arrays 'final_balance', 'max_drawdown',
+        'max_drawdown_pct' (of the peak balance) and 'ruined', plus
+        'risk_of_ruin' (share of ruined sequences) and the run settings
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    pnl = np.asarray(pnl, dtype=np.float32)
+    if not len(pnl):
+        raise ValueError("No trades to resample")
+    trades = len(pnl) if method == 'permute' or trades is None else trades
+    
+    rng = np.random.default_rng(seed)
+    ruin_balance = initial_balance * (1 - ruin_fraction)
+    rows = max(1, BLOCK_VALUES // trades)
+    final = np.empty(resamples)
+    drawdown = np.empty(resamples)
+    drawdown_pct = np.empty(resamples)
+    ruined = np.empty(resamples, dtype=bool)
+    
+    for start in range(0, resamples, rows):
+        stop = min(start + rows, resamples)
+        block = resample_block(pnl, stop - start, trades, method, rng)
+        (final[start:stop], drawdown[start:stop], drawdown_pct[start:stop],
+         ruined[start:stop]) = path_stats(block, initial_balance, ruin_balance)
+    
+    return {
+        'final_balance': initial_balance + final,
+        'max_drawdown': drawdown,
+        'max_drawdown_pct': drawdown_pct,
+        'ruined': ruined,
+        'risk_of_ruin': float(ruined.mean()),
+        'initial_balance': initial_balance,
+        'resamples': resamples,
+        'trades': trades,
+        'method': method
+    }
+
+
+def summarize(result, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Percentiles of a monte_carlo result.
+    
+    Returns:
+        Dict with 'final_balance', 'max_drawdown' and 'max_drawdown_pct'
+        (each percentile -> value), 'prob_loss' and 'risk_of_ruin'
+    """
+    summary = {
+        key: dict(zip(percentiles, np.percentile(result[key], percentiles)))
+        for key in ('final_balance', 'max_drawdown', 'max_drawdown_pct')
+    }
+    summary['prob_loss'] = float((result['final_balance'] < result['initial_balance']).mean())
+    summary['risk_of_ruin'] = result['risk_of_ruin']
+    return summary
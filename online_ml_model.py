@@ -0,0 +1,225 @@
+"""Online variant of the advanced model, updated bar by bar with partial_fit."""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from advanced_ml_model import AdvancedTradingModel
+
+
+class OnlineEnsemble:
+    """
+    Soft-voting ensemble of partial_fit estimators: a logistic-loss linear
+    model and a small MLP.
+    
+    Mirrors the predict_proba / classes_ / score interface of the
+    VotingClassifier that AdvancedTradingModel predicts through.
+    """
+    
+    def __init__(self, classes=(-1, 1), weights=(1, 1)):
+        """
+        Args:
+            classes: Every class the model will see (partial_fit needs them up front)
+            weights: Voting weights of the linear model and the MLP
+        """
+        self.classes_ = np.array(classes)
+        self.weights = list(weights)
+        self.estimators = [
+            ('sgd', SGDClassifier(loss='log_loss', alpha=1e-4, learning_rate='adaptive', eta0=0.01,
+                                  random_state=42)),
+            ('nn', MLPClassifier(hidden_layer_sizes=(64, 32), activation='relu', solver='adam',
+                                 learning_rate_init=0.001, random_state=42))
+        ]
+    
+    def partial_fit(self, X_scaled, y):
+        """One incremental step of every member on scaled rows."""
+        for _, estimator in self.estimators:
+            estimator.partial_fit(X_scaled, y, classes=self.classes_)
+        return self
+    
+    def predict_proba(self, X_scaled):
+        """Weighted average of the members' class probabilities."""
+        probas = [estimator.predict_proba(X_scaled) for _, estimator in self.estimators]
+        return np.average(np.asarray(probas), axis=0, weights=self.weights)
+    
+    def predict(self, X_scaled):
+        """Most probable class of each row."""
+        return self.classes_[np.argmax(self.predict_proba(X_scaled), axis=1)]
+    
+    def score(self, X_scaled, y):
+        """Accuracy on scaled rows."""
+        return float(np.mean(self.predict(X_scaled) == np.asarray(y)))
+
+
+class OnlineTradingModel(AdvancedTradingModel):
+    """
+    AdvancedTradingModel features and targets with a model that keeps
+    learning after deployment.
+    
+    ``update`` is called once per closed bar: a bar's label (see
+    create_target) is known ``forward_periods`` bars after it closes, so
+    each call learns the bars whose labels have matured since the last
+    call, updating the scaler statistics and both members in place. The
+    state is checkpointed every ``checkpoint_every`` learned bars.
+    """
+    
+    def __init__(self, forward_periods=2, checkpoint_path='online_model.pkl', checkpoint_every=288, epochs=5):
+        """
+        Args:
+            forward_periods: Bars until a label is known (create_target look-ahead)
+            checkpoint_path: Checkpoint file; None disables checkpoints
+            checkpoint_every: Learned bars between checkpoints (288 M5 bars = one day)
+            epochs: Passes over the history in the initial train()
+        """
+        self.forward_periods = forward_periods
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.epochs = epochs
+        self.model = OnlineEnsemble()
+        self.scaler = StandardScaler()
+        self.feature_columns = None
+        self.compiled = None
+        self.workers = 1
+        self.last_learned = None  # Timestamp of the newest bar learned
+        self.learned = 0
+        self.since_checkpoint = 0
+    
+    def set_workers(self, workers=None):
+        """partial_fit steps are too small to split across cores."""
+        self.workers = 1
+    
+    def create_target(self, df, forward_periods=None, profit_threshold=0.0002):
+        """AdvancedTradingModel.create_target over this model's look-ahead."""
+        return super().create_target(df, forward_periods or self.forward_periods, profit_threshold)
+    
+    def _learn(self, X, y):
+        """Update scaler and members on prepared rows, skipping neutral labels."""
+        mask = np.asarray(y) != 0
+        if not mask.any():
+            return 0
+        X, y = X[mask], np.asarray(y)[mask]
+        self.scaler.partial_fit(X)
+        self.model.partial_fit(self.scaler.transform(X), y)
+        return len(y)
+    
+    def train(self, df):
+        """
+        Initial fit on a history: partial_fit passes over the older 80%, scored
+        on the rest (the held-out bars are then learned too, as live updates would).
+        
+        Returns:
+            (train accuracy, test accuracy)
+        """
+        print("Training online AI model...")
+        self.compiled = None
+        df['target'] = self.create_target(df)
+        X = self.prepare_features(df)
+        y = df.loc[X.index, 'target']
+        X, y = X[y != 0], y[y != 0]
+        
+        if len(X) < 100:
+            print("Not enough data for training")
+            return 0, 0
+        
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+        self.scaler = StandardScaler()
+        self.model = OnlineEnsemble()
+        for _ in range(self.epochs):
+            self._learn(X_train, y_train)
+        train_score = self.model.score(self.scaler.transform(X_train), y_train)
+        test_score = self.model.score(self.scaler.transform(X_test), y_test)
+        self._learn(X_test, y_test)
+        
+        # Bars whose labels were still open are learned by update()
+        self.last_learned = df.index[-self.forward_periods - 1]
+        self.learned = len(X)
+        
+        print(f"Training accuracy: {train_score:.4f}")
+        print(f"Testing accuracy: {test_score:.4f}")
+        return train_score, test_score
+    
+    def fit(self, X, y):
+        """
+        Fit a fresh model on an already prepared feature matrix (``epochs`` passes).
+        
+        Returns:
+            Training accuracy
+        """
+        self.compiled = None
+        self.feature_columns = list(X.columns)
+        self.scaler = StandardScaler()
+        self.model = OnlineEnsemble()
+        for _ in range(self.epochs):
+            self._learn(X, y)
+        self.last_learned = X.index[-1]
+        self.learned = len(X)
+        return self.model.score(self.scaler.transform(X), y)
+    
+    def update(self, df):
+        """
+        Learn every bar whose label matured since the last update.
+        
+        Args:
+            df: Indicator frame of closed bars, oldest first (the live
+                history; only its tail is used)
+        
+        Returns:
+            Number of bars learned
+        """
+        if self.feature_columns is None:
+            raise ValueError("Train or load the model before updating it")
+        
+        # Bars with forward_periods later bars have a final label
+        matured = df.index[:-self.forward_periods]
+        new = matured if self.last_learned is None else matured[matured > self.last_learned]
+        if not len(new):
+            return 0
+        
+        # Features read tail_window bars back from the first new bar, labels forward_periods past the last
+        first = max(0, df.index.get_loc(new[0]) - self.tail_window(1) + 1)
+        window = df.iloc[first:]
+        X = self.prepare_features(window, columns=self.feature_columns)
+        X = X[(X.index >= new[0]) & (X.index <= new[-1])]
+        y = pd.Series(self.create_target(window), index=window.index)[X.index]
+        learned = self._learn(X, y)
+        
+        self.last_learned = new[-1]
+        self.learned += learned
+        self.since_checkpoint += learned
+        if self.checkpoint_path and self.since_checkpoint >= self.checkpoint_every:
+            self.save(self.checkpoint_path)
+        return learned
+    
+    def save(self, filepath='online_model.pkl'):
+        """Checkpoint the model, scaler statistics and learning position (atomic write)."""
+        temp = f"{filepath}.tmp"
+        joblib.dump({
+            'model': self.model,
+            'scaler': self.scaler,
+            'features': self.feature_columns,
+            'forward_periods': self.forward_periods,
+            'last_learned': self.last_learned,
+            'learned': self.learned
+        }, temp)
+        os.replace(temp, filepath)
+        self.since_checkpoint = 0
+        print(f"Online model saved to {filepath}")
+    
+    def load(self, filepath='online_model.pkl'):
+        """Resume from a checkpoint."""
+        data = joblib.load(filepath)
+        self.model = data['model']
+        self.scaler = data['scaler']
+        self.feature_columns = data['features']
+        self.forward_periods = data['forward_periods']
+        self.last_learned = data['last_learned']
+        self.learned = data['learned']
+        self.compiled = None
+        self.since_checkpoint = 0
+        print(f"Online model loaded from {filepath}")
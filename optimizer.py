@@ -0,0 +1,291 @@
+"""Parallel strategy parameter search with successive halving."""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analysis_cache import config_hash
+from backtest_runner import load_prices, share_prices, shared_frame, release_prices, split_strategy
+from cost_model import CostModel
+from backtester import Backtester
+from indicators import IndicatorEngine, required_columns
+from result_cache import frame_digest, indicator_settings, result_cache
+from scalping_strategy import ScalpingStrategy
+
+
+# Candidate values per knob; configs are drawn uniformly from the grid
+SEARCH_SPACE = {
+    'min_confirmation_score': [0, 2.5, 3, 4, 5, 6],
+    'min_adx': [15, 20, 22, 25, 30],
+    'rsi_range': [(25, 75), (30, 70), (35, 65)],
+    'atr_stop_multiplier': [1.0, 1.2, 1.5, 2.0],
+    'atr_target_multiplier': [1.5, 2.0, 2.5, 3.0, 4.0],
+    'use_trailing_stop': [False, True],
+    'trailing_activation': [0.5, 1.0, 1.5],
+    'trailing_distance': [0.5, 1.0, 1.5]
+}
+
+# Configs with fewer trades than this per evaluated series are ranked last
+MIN_TRADES_PER_SERIES = 5
+
+# Indicator frames and score component masks per shared price block, per process
+_scores = {}
+
+# Result cache keys of the scores per shared price block, per process
+_keys = {}
+
+
+def sample_configs(count, seed=None):
+    """
+    Draw distinct configs from SEARCH_SPACE.
+    
+    Trailing settings are dropped from configs that do not trail, so
+    equivalent configs are not drawn twice.
+    
+    Args:
+        count: Number of configs (fewer if the space is smaller)
+        seed: Random seed
+    
+    Returns:
+        List of config dicts
+    """
+    rng = random.Random(seed)
+    configs = {}
+    attempts = 0
+    while len(configs) < count and attempts < count * 50:
+        attempts += 1
+        config = {knob: rng.choice(values) for knob, values in SEARCH_SPACE.items()}
+        if not config['use_trailing_stop']:
+            del config['trailing_activation'], config['trailing_distance']
+        configs.setdefault(config_hash(config), config)
+    return list(configs.values())
+
+
+def _series_key(series):
+    """Result cache key of a series' score components, from a digest of its prices, computed once per process."""
+    name = series['spec']['name']
+    if name not in _keys:
+        _keys[name] = result_cache.key('components', frame_digest(shared_frame(series['spec'])), indicator_settings())
+    return _keys[name]
+
+
+def _series_scores(series):
+    """Indicator frame and (buy, sell) component masks of a series, computed once per process (and result-cached across runs)."""
+    name = series['spec']['name']
+    if name not in _scores:
+        def score():
+            scalper = ScalpingStrategy()
+            df = IndicatorEngine(shared_frame(series['spec']), backend='numpy').calculate(required_columns(scalper))
+            buy_masks, sell_masks = scalper.component_masks(df)
+            return df, buy_masks, sell_masks
+        
+        _scores[name] = result_cache.get_or_compute(_series_key(series), score)
+    return _scores[name]
+
+
+def evaluate(config, series, segment='train'):
+    """
+    Backtest a config on the in-sample ('train') or out-of-sample ('test') bars of a series.
+    
+    Only the score weights, signal thresholds, filters and exits are
+    re-run: indicators and score components do not depend on the config
+    and are reused. Trades are charged the symbol's spread, slippage and
+    commission (cost_model), the same costs the validation backtest uses.
+    Metrics are result-cached by series prices, config and segment, so a
+    repeated or overlapping search only backtests new (config, series) pairs.
+    
+    Args:
+        config: Strategy config dict (STRATEGY_KEYS)
+        series: Dict with 'symbol', 'spec' (shared price block) and 'split' (first test bar)
+        segment: 'train' or 'test'
+    
+    Returns:
+        Metrics dict (see combine)
+    """
+    key = result_cache.key('evaluation', _series_key(series), series['symbol'], series['split'], config, segment,
+                           'net')
+    return result_cache.get_or_compute(key, lambda: _evaluate(config, series, segment))
+
+
+def _evaluate(config, series, segment):
+    """Backtest behind evaluate."""
+    df, buy_masks, sell_masks = _series_scores(series)
+    params, exits = split_strategy(config)
+    scalper = ScalpingStrategy(params)
+    buy_score, sell_score = scalper.scores_from_masks(buy_masks, sell_masks, df.index)
+    signals = scalper.filter_scalping_signals(df, scalper.signals_from_scores(buy_score, sell_score))
+    
+    lo, hi = (0, series['split']) if segment == 'train' else (series['split'], len(df))
+    frame = df[['high', 'low', 'close', 'atr']].iloc[lo:hi].assign(final_signal=signals.iloc[lo:hi])
+    
+    costs = CostModel(series['symbol'])
+    backtester = Backtester()
+    backtester.run_fast(frame, pip_size=costs.pip_size, costs=costs, **exits)
+    trades = backtester.trade_arrays
+    
+    # Net P&L in multiples of the initial risk is comparable across symbols
+    risk = np.abs(trades['entry_price'] - trades['stop_loss'])
+    r_multiple = np.divide(trades['net_pnl'], risk, out=np.zeros(len(risk)), where=risk > 0)
+    return {
+        'series': 1,
+        'trades': len(r_multiple),
+        'wins': int((r_multiple > 0).sum()),
+        'total_r': float(r_multiple.sum()),
+        'gross_win_r': float(r_multiple[r_multiple > 0].sum()),
+        'gross_loss_r': float(-r_multiple[r_multiple < 0].sum()),
+        'pnl_pips': float(trades['net_pips'].sum())
+    }
+
+
+def _evaluate_task(task):
+    """Pool entry point: (config, series, segment) -> metrics."""
+    return evaluate(*task)
+
+
+def combine(metrics):
+    """
+    Sum per-series metrics and derive rates.
+    
+    Returns:
+        Dict with series, trades, wins, win_rate, total_r, expectancy_r,
+        profit_factor (gross win R / gross loss R) and pnl_pips
+    """
+    total = {key: 0 for key in ('series', 'trades', 'wins', 'total_r', 'gross_win_r', 'gross_loss_r', 'pnl_pips')}
+    for item in metrics:
+        for key in total:
+            total[key] += item[key]
+    total['win_rate'] = total['wins'] / total['trades'] * 100 if total['trades'] else 0
+    total['expectancy_r'] = total['total_r'] / total['trades'] if total['trades'] else 0
+    total['profit_factor'] = total['gross_win_r'] / total['gross_loss_r'] if total['gross_loss_r'] > 0 else 0
+    return total
+
+
+def objective(metrics):
+    """Search objective: total R, with too-thin samples ranked last."""
+    if metrics['trades'] < MIN_TRADES_PER_SERIES * metrics['series']:
+        return -math.inf
+    return metrics['total_r']
+
+
+def successive_halving(configs, series, run_tasks, eta=3, min_series=2):
+    """
+    Successive halving over series: every config is scored on a few series,
+    the best 1/eta move on to eta times as many, until all series are used.
+    
+    Args:
+        configs: List of config dicts
+        series: List of series dicts (see evaluate)
+        run_tasks: Callable mapping a list of (config, series, segment) tasks to metrics
+        eta: Reduction factor per rung
+        min_series: Series in the first rung
+    
+    Returns:
+        (ranked list of (config, in-sample metrics), list of rung summaries)
+    """
+    results = {}
+    survivors = list(range(len(configs)))
+    budget = min(min_series, len(series))
+    rungs = []
+    
+    while True:
+        pending = [(c, s) for c in survivors for s in range(budget) if (c, s) not in results]
+        outputs = run_tasks([(configs[c], series[s], 'train') for c, s in pending])
+        results.update(zip(pending, outputs))
+        
+        scored = {c: combine(results[(c, s)] for s in range(budget)) for c in survivors}
+        ranked = sorted(survivors, key=lambda c: objective(scored[c]), reverse=True)
+        rungs.append({'configs': len(survivors), 'series': budget, 'evaluations': len(pending),
+                      'best_total_r': scored[ranked[0]]['total_r']})
+        
+        if budget == len(series):
+            return [(configs[c], scored[c]) for c in ranked], rungs
+        survivors = ranked[:max(1, len(survivors) // eta)]
+        budget = min(len(series), budget * eta)
+
+
+def optimize(symbols, timeframes, trials=60, bars=4000, train_fraction=0.7, eta=3,
+             workers=None, connector=None, seed=None):
+    """
+    Search SEARCH_SPACE for the scalping config with the best in-sample total R.
+    
+    Every (symbol, timeframe) series is split in time: configs are ranked on
+    the first ``train_fraction`` of bars and the winner (and the default
+    config, as a baseline) is then scored on the remaining bars. Indicators
+    run over the whole series since they only look back.
+    
+    Args:
+        symbols: Instruments
+        timeframes: Bar timeframes
+        trials: Random configs entering the first rung
+        bars: Bars fetched per series
+        train_fraction: In-sample share of each series
+        eta: Successive halving reduction factor
+        workers: Worker processes (default: all cores); 1 runs in this process
+        connector: MT5Connector for live history, or None for sample data
+        seed: Random seed for config sampling
+    
+    Returns:
+        Dict with 'best' config, its 'train' and 'test' metrics, the
+        'baseline' test metrics, 'ranking' (top configs) and 'rungs'
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    configs = sample_configs(trials, seed)
+    
+    blocks = []
+    series = []
+    pool = None
+    try:
+        for symbol in symbols:
+            for timeframe in timeframes:
+                df = load_prices(symbol, timeframe, bars, connector)
+                if len(df) < ScalpingStrategy.MIN_BARS / (1 - train_fraction):
+                    continue  # Too short to split
+                block, spec = share_prices(df)
+                blocks.append(block)
+                series.append({'symbol': symbol, 'timeframe': timeframe, 'spec': spec,
+                               'split': int(len(df) * train_fraction)})
+        if not series:
+            raise ValueError("No series long enough to optimize on")
+        
+        # Order series so early rungs see a mix of symbols and timeframes
+        random.Random(seed).shuffle(series)
+        
+        if workers == 1:
+            def run_tasks(tasks):
+                return [_evaluate_task(task) for task in tasks]
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            
+            def run_tasks(tasks):
+                return list(pool.map(_evaluate_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        
+        ranking, rungs = successive_halving(configs, series, run_tasks, eta=eta)
+        best, train = ranking[0]
+        test_tasks = [(config, item, 'test') for config in (best, {}) for item in series]
+        outputs = run_tasks(test_tasks)
+        test = combine(outputs[:len(series)])
+        baseline = combine(outputs[len(series):])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for block in blocks:
+            _scores.pop(block.name, None)
+            _keys.pop(block.name, None)
+        release_prices(blocks)
+    
+    return {
+        'best': best,
+        'train': train,
+        'test': test,
+        'baseline': baseline,
+        'ranking': ranking[:5],
+        'rungs': rungs,
+        'trials': len(configs),
+        'series': [(item['symbol'], item['timeframe']) for item in series],
+        'seconds': time.perf_counter() - started
+    }
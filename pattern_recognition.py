@@ -7,11 +7,31 @@ import pandas as pd
 class PatternRecognizer:
     """Recognize chart patterns and price action."""
     
+    # Longest price windows read by the detectors (support/resistance, double top/bottom)
+    LOOKBACK_WINDOWS = {'low': 50, 'high': 50}
+    MIN_BARS = 40
+    
     def __init__(self):
         self.patterns_found = []
     
-    def analyze_patterns(self, df):
-        """Analyze and detect trading patterns."""
+    def tail_window(self, tail):
+        """Trailing bars needed to evaluate the last ``tail`` bars exactly."""
+        return tail + max(self.LOOKBACK_WINDOWS.values()) - 1
+    
+    def analyze_patterns(self, df, tail=None):
+        """
+        Analyze and detect trading patterns.
+        
+        Args:
+            df: OHLC DataFrame
+            tail: Only evaluate the last ``tail`` bars (from a minimal trailing window)
+        
+        Returns:
+            Dict of pattern name -> boolean Series (last ``tail`` bars in tail mode)
+        """
+        if tail is not None:
+            df = df.iloc[-self.tail_window(tail):]
+        
         patterns = {
             'bullish_engulfing': self.detect_bullish_engulfing(df),
             'bearish_engulfing': self.detect_bearish_engulfing(df),
@@ -25,6 +45,9 @@ class PatternRecognizer:
             'resistance_rejection': self.detect_resistance_rejection(df)
         }
         
+        if tail is not None:
+            patterns = {name: pattern.iloc[-tail:] for name, pattern in patterns.items()}
+        
         return patterns
     
     def detect_bullish_engulfing(self, df):
@@ -98,16 +121,7 @@ class PatternRecognizer:
         is_local_min = df['low'] == rolling_min
         
         # Find two similar lows
-        result = pd.Series(False, index=df.index)
-        for i in range(window, len(df)):
-            if is_local_min.iloc[i]:
-                prev_mins = df['low'].iloc[i-window:i][is_local_min.iloc[i-window:i]]
-                if len(prev_mins) > 0:
-                    closest_min = prev_mins.iloc[-1]
-                    if abs(df['low'].iloc[i] - closest_min) / closest_min < 0.002:  # Within 0.2%
-                        result.iloc[i] = True
-        
-        return result
+        return self._repeated_extreme(df['low'], is_local_min, window)
     
     def detect_double_top(self, df, window=20):
         """Detect double top pattern (bearish)."""
@@ -118,16 +132,32 @@ class PatternRecognizer:
         is_local_max = df['high'] == rolling_max
         
         # Find two similar highs
-        result = pd.Series(False, index=df.index)
-        for i in range(window, len(df)):
-            if is_local_max.iloc[i]:
-                prev_maxs = df['high'].iloc[i-window:i][is_local_max.iloc[i-window:i]]
-                if len(prev_maxs) > 0:
-                    closest_max = prev_maxs.iloc[-1]
-                    if abs(df['high'].iloc[i] - closest_max) / closest_max < 0.002:  # Within 0.2%
-                        result.iloc[i] = True
-        
-        return result
+        return self._repeated_extreme(df['high'], is_local_max, window)
+    
+    def _repeated_extreme(self, prices, is_extreme, window, tolerance=0.002):
+        """
+        Flag local extremes within ``tolerance`` (0.2%) of the previous local
+        extreme in the preceding ``window`` bars.
+        
+        The previous extreme of every bar comes from a forward-filled index of
+        the last extreme seen, so the scan is a few array passes.
+        """
+        values = prices.to_numpy(dtype=float)
+        flags = is_extreme.to_numpy(dtype=bool)
+        positions = np.arange(len(values))
+        
+        # Index of the last extreme strictly before each bar (-1 if none)
+        last_extreme = np.maximum.accumulate(np.where(flags, positions, -1))
+        previous = np.empty_like(last_extreme)
+        previous[0] = -1
+        previous[1:] = last_extreme[:-1]
+        
+        candidate = flags & (positions >= window) & (previous >= positions - window)
+        closest = values[np.maximum(previous, 0)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similar = np.abs(values - closest) / closest < tolerance
+        
+        return pd.Series(candidate & similar, index=prices.index)
     
     def detect_support_bounce(self, df, window=50):
         """Detect price bouncing off support."""
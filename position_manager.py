@@ -4,14 +4,100 @@ import time
 from datetime import datetime
 import threading
 
+import numpy as np
+
+
+# Auto-close thresholds: profit/loss in account currency, momentum in ATRs
+AUTO_CLOSE_RULES = {
+    'momentum_profit': 2,
+    'momentum_bars': 4,
+    'momentum_atr': 0.3,
+    'max_loss': 10,
+    'reversal_loss': 7,
+    'reversal_score_gap': 3
+}
+
+# Rules in priority order; auto_close_rules returns 1 + index, 0 to keep the position
+CLOSE_RULES = ['signal_reversal', 'momentum_slowing', 'loss_limit', 'strong_reversal']
+
+# Columns the rules read besides prices and ATR
+AUTO_CLOSE_COLUMNS = ['signal', 'buy_score', 'sell_score']
+
+
+def close_momentum(close, bars=AUTO_CLOSE_RULES['momentum_bars']):
+    """Absolute close-to-close move over ``bars`` bars (NaN until there is enough history)."""
+    close = np.asarray(close, dtype=float)
+    momentum = np.full(len(close), np.nan)
+    momentum[bars:] = np.abs(close[bars:] - close[:-bars])
+    return momentum
+
+
+def auto_close_rules(is_buy, profit, signal, buy_score, sell_score, momentum, atr, rules=None):
+    """
+    Which auto-close rule, if any, fires for a position.
+    
+    Pure and elementwise, so the live monitor can pass one position's
+    scalars and the backtester every bar of a trade at once.
+    
+    Args:
+        is_buy: True for buy positions
+        profit: Open profit in account currency
+        signal: Current strategy signal (1, -1 or 0)
+        buy_score, sell_score: Current strategy scores
+        momentum: close_momentum value
+        atr: Current ATR
+        rules: Overrides for AUTO_CLOSE_RULES
+    
+    Returns:
+        Array of rule codes: 0 keeps the position, k closes it by CLOSE_RULES[k - 1]
+    """
+    rules = AUTO_CLOSE_RULES if rules is None else dict(AUTO_CLOSE_RULES, **rules)
+    direction = np.where(is_buy, 1.0, -1.0)
+    profit = np.asarray(profit, dtype=float)
+    reversed_signal = np.asarray(signal) == -direction
+    opposite_lead = (np.asarray(sell_score, dtype=float) - buy_score) * direction
+    
+    with np.errstate(invalid='ignore'):
+        slowing = np.asarray(momentum) < np.asarray(atr) * rules['momentum_atr']
+    # Nested in priority order, like the if/elif chain the monitor used to run
+    return np.where((profit > 0) & reversed_signal, 1,
+                    np.where((profit > rules['momentum_profit']) & slowing, 2,
+                             np.where(profit < -rules['max_loss'], 3,
+                                      np.where((profit < -rules['reversal_loss']) & reversed_signal
+                                               & (opposite_lead > rules['reversal_score_gap']), 4, 0))))
+
+
+def close_bands(is_buy, signal, buy_score, sell_score, momentum, atr, rules=None):
+    """
+    auto_close_rules as profit bands: a position closes exactly when its
+    profit is above ``upper`` or below ``lower``.
+    
+    Only the profit depends on the position, so a backtest computes the
+    bands once per direction and compares each trade's profit against them.
+    
+    Returns:
+        (upper, lower) arrays in account currency
+    """
+    rules = AUTO_CLOSE_RULES if rules is None else dict(AUTO_CLOSE_RULES, **rules)
+    direction = 1.0 if is_buy else -1.0
+    reversed_signal = np.asarray(signal) == -direction
+    opposite_lead = (np.asarray(sell_score, dtype=float) - buy_score) * direction
+    
+    with np.errstate(invalid='ignore'):
+        slowing = np.asarray(momentum) < np.asarray(atr) * rules['momentum_atr']
+    upper = np.where(reversed_signal, 0.0, np.where(slowing, float(rules['momentum_profit']), np.inf))
+    lower = np.where(reversed_signal & (opposite_lead > rules['reversal_score_gap']),
+                     -float(rules['reversal_loss']), -float(rules['max_loss']))
+    return upper, lower
+
 
 class PositionManager:
     """Manages open positions and auto-closes when signals reverse."""
     
-    def __init__(self, mt5_connector, scalping_strategy, ml_model, data_loader):
+    def __init__(self, mt5_connector, scalping_strategy, model_registry, data_loader):
         self.mt5 = mt5_connector
         self.scalping_strategy = scalping_strategy
-        self.ml_model = ml_model
+        self.model_registry = model_registry  # training_service.ModelRegistry, read per position
         self.data_loader = data_loader
         self.monitoring = False
         self.monitor_thread = None
@@ -33,7 +119,9 @@ class PositionManager:
     
     def _monitor_loop(self):
         """Main monitoring loop."""
-        from indicators import IndicatorEngine
+        from analysis_cache import analysis_cache
+        from indicators import required_columns
+        from lookback import plan_bars
         from trading_logger import trading_logger
         
         while self.monitoring:
@@ -59,21 +147,29 @@ class PositionManager:
                         current_price = position['price_current']
                         profit = position['profit']
                         
+                        # One read of the active model per position (None until one is trained)
+                        ml_model = self.model_registry.current
+                        
                         # Get current market data
-                        df = self.mt5.get_historical_data(symbol, 'M5', bars=200)
+                        bars = plan_bars(self.scalping_strategy, ml_model,
+                                         self.scalping_strategy.pattern_recognizer)
+                        df = self.mt5.get_historical_data(symbol, 'M5', bars=bars)
                         if df is None:
                             continue
                         
-                        # Calculate indicators
-                        indicator_engine = IndicatorEngine(df)
-                        df_indicators = indicator_engine.calculate_all()
+                        # Calculate indicators (closed bars cached across positions and endpoints)
+                        df_indicators = analysis_cache.indicators(
+                            'mt5', symbol, 'M5', df, columns=required_columns(self.scalping_strategy, ml_model)
+                        )
                         
                         # Get current signals
-                        signals, buy_score, sell_score = self.scalping_strategy.analyze_scalping_opportunity(df_indicators)
+                        signals, buy_score, sell_score = self.scalping_strategy.analyze_scalping_opportunity(
+                            df_indicators, tail=1
+                        )
                         
                         # Get ML prediction
                         try:
-                            ml_signals, ml_confidence = self.ml_model.predict(df_indicators)
+                            ml_signals, ml_confidence = ml_model.predict_latest(df_indicators)
                             current_ml_signal = ml_signals[-1] if len(ml_signals) > 0 else 0
                             current_confidence = ml_confidence[-1] if len(ml_confidence) > 0 else 0
                         except:
@@ -84,40 +180,21 @@ class PositionManager:
                         latest_buy_score = buy_score.iloc[-1]
                         latest_sell_score = sell_score.iloc[-1]
                         
-                        # NEW AUTO-CLOSE LOGIC: Only close if in profit OR loss > $10
-                        should_close = False
-                        close_reason = ""
+                        # Only close if in profit OR loss > $10 (see auto_close_rules)
+                        momentum = close_momentum(df_indicators['close'].to_numpy()[-AUTO_CLOSE_RULES['momentum_bars'] - 1:])
+                        rule = int(auto_close_rules(position_type == 'buy', profit, current_signal, latest_buy_score,
+                                                    latest_sell_score, momentum[-1], df_indicators['atr'].iloc[-1]))
+                        should_close = rule > 0
                         
-                        # Rule 1: ALWAYS close if in profit (any amount)
-                        if profit > 0:
-                            # Check if signal reversed or weakened
-                            if position_type == 'buy' and current_signal == -1:
-                                should_close = True
-                                close_reason = f"Taking profit ${profit:.2f} - Signal reversed to SELL"
-                            elif position_type == 'sell' and current_signal == 1:
-                                should_close = True
-                                close_reason = f"Taking profit ${profit:.2f} - Signal reversed to BUY"
-                            # Also close if momentum is slowing and we have decent profit
-                            elif profit > 2:
-                                latest = df_indicators.iloc[-1]
-                                momentum = abs(latest['close'] - df_indicators.iloc[-5]['close'])
-                                if momentum < df_indicators['atr'].iloc[-1] * 0.3:
-                                    should_close = True
-                                    close_reason = f"Taking profit ${profit:.2f} - Momentum slowing"
-                        
-                        # Rule 2: ONLY close losing trades if loss > $10
-                        elif profit < -10:
-                            should_close = True
+                        if rule == 1:
+                            reversed_to = 'SELL' if position_type == 'buy' else 'BUY'
+                            close_reason = f"Taking profit ${profit:.2f} - Signal reversed to {reversed_to}"
+                        elif rule == 2:
+                            close_reason = f"Taking profit ${profit:.2f} - Momentum slowing"
+                        elif rule == 3:
                             close_reason = f"Stop loss triggered - Loss ${profit:.2f} exceeds $10 limit"
-                        
-                        # Rule 3: Close if loss approaching $10 AND signal strongly reversed
-                        elif profit < -7:
-                            if position_type == 'buy' and current_signal == -1 and latest_sell_score > latest_buy_score + 3:
-                                should_close = True
-                                close_reason = f"Cutting loss ${profit:.2f} - Strong reversal detected"
-                            elif position_type == 'sell' and current_signal == 1 and latest_buy_score > latest_sell_score + 3:
-                                should_close = True
-                                close_reason = f"Cutting loss ${profit:.2f} - Strong reversal detected"
+                        elif rule == 4:
+                            close_reason = f"Cutting loss ${profit:.2f} - Strong reversal detected"
                         
                         # Execute close if needed
                         if should_close:
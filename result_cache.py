@@ -0,0 +1,253 @@
+"""Content-addressed disk cache of indicator frames, ML predictions and backtest results."""
+
+import hashlib
+import os
+import pickle
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from analysis_cache import config_hash
+import config
+
+
+CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.result_cache'))
+MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_MB', 512)) * 2 ** 20
+
+# Part of every key: bump when a cached stage's code changes its output
+CACHE_VERSION = 1
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+INDICATOR_SETTINGS = ('RSI_PERIOD', 'MACD_FAST', 'MACD_SLOW', 'MACD_SIGNAL', 'BB_PERIOD', 'BB_STD', 'ATR_PERIOD')
+
+
+def frame_digest(df, columns=PRICE_COLUMNS):
+    """Hash of a frame's timestamps and OHLCV arrays (raw bytes, no conversion to text)."""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(df.index, pd.DatetimeIndex):
+        digest.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    else:
+        digest.update(pd.util.hash_array(np.asarray(df.index)).tobytes())
+    for column in columns:
+        if column in df.columns:
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(df[column].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def indicator_settings():
+    """Indicator periods from config, part of indicator cache keys."""
+    return {name: getattr(config, name) for name in INDICATOR_SETTINGS}
+
+
+def model_version(model):
+    """Hash of a model's class, hyperparameters and confidence threshold."""
+    estimator = getattr(model, 'model', None)
+    params = estimator.get_params() if hasattr(estimator, 'get_params') else {}
+    return config_hash({'class': type(model).__name__, 'params': params, 'min_confidence': config.MIN_CONFIDENCE})
+
+
+class ResultCache:
+    """
+    Disk cache of pipeline stage outputs, one pickle file per key.
+    
+    Keys hash everything a stage's output depends on (see ``key``), so an
+    entry never needs invalidating: changed inputs simply produce a new
+    key. Files are written atomically, so several processes (optimizer and
+    runner workers) can share a directory. When the directory grows past
+    ``max_bytes`` the least recently used files (by modification time,
+    refreshed on every hit) are deleted.
+    """
+    
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, enabled=None):
+        """
+        Args:
+            directory: Cache directory, created on first write
+            max_bytes: Size bound of the directory
+            enabled: False computes every stage without reading or writing;
+                None reads the RESULT_CACHE environment variable ('0' disables)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = os.environ.get('RESULT_CACHE', '1') != '0' if enabled is None else enabled
+        self.lock = threading.Lock()
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def key(self, stage, *parts):
+        """Key of a stage output from its inputs (digests, configs: any JSON-able values)."""
+        return f"{stage}-{config_hash([CACHE_VERSION, stage, parts])}"
+    
+    def path(self, key):
+        """File of a key's entry."""
+        return os.path.join(self.directory, key + '.pkl')
+    
+    def get(self, key, default=None):
+        """Cached value for a key, or ``default`` (counts a hit or miss)."""
+        if not self.enabled:
+            return default
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Truncated or unreadable entry: drop it and recompute
+            self._remove(path)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+    
+    def put(self, key, value):
+        """Store a value, evicting old entries if the directory exceeds max_bytes."""
+        if not self.enabled:
+            return
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(payload)
+        os.replace(temp, path)
+        
+        with self.lock:
+            if self.size is None:
+                self.size = self._scan_size()
+            else:
+                self.size += len(payload)
+            if self.size > self.max_bytes:
+                self._evict()
+    
+    def get_or_compute(self, key, compute):
+        """Cached value for a key, computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+    
+    def _entries(self):
+        """(mtime, size, path) of every entry file."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for item in scan:
+                    if item.name.endswith('.pkl'):
+                        try:
+                            stat = item.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, item.path))
+        except FileNotFoundError:
+            pass
+        return entries
+    
+    def _scan_size(self):
+        """Total size of the entry files."""
+        return sum(size for _, size, _ in self._entries())
+    
+    def _evict(self):
+        """Delete least recently used entries down to 3/4 of max_bytes (rescans: other processes write too)."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 3 // 4
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+        self.size = total
+    
+    @staticmethod
+    def _remove(path):
+        """Delete a file another process may already have deleted."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    
+    def clear(self):
+        """Delete every entry."""
+        with self.lock:
+            for _, _, path in self._entries():
+                self._remove(path)
+            self.size = 0
+    
+    def stats(self):
+        """Hit/miss counters and directory size."""
+        entries = self._entries()
+        total = self.hits + self.misses
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+def cached_indicators(df, cache=None):
+    """
+    IndicatorEngine(df).calculate_all(), cached by price data and indicator settings.
+    
+    Returns:
+        (indicator frame, cache key to chain later stages on)
+    """
+    from indicators import IndicatorEngine
+    
+    cache = cache or result_cache
+    key = cache.key('indicators', frame_digest(df), indicator_settings())
+    return cache.get_or_compute(key, lambda: IndicatorEngine(df).calculate_all()), key
+
+
+def cached_predictions(model, df, parent_key, cache=None):
+    """
+    Train a TradingModel on ``df`` and predict it, cached by the parent
+    stage's key and the model version.
+    
+    On a hit the fitted model, scaler and feature list are restored into
+    ``model``, so it can be saved or used as if it had just been trained.
+    
+    Returns:
+        (signals, confidence, cache key)
+    """
+    cache = cache or result_cache
+    key = cache.key('predictions', parent_key, model_version(model))
+    
+    def train_and_predict():
+        model.train(df)
+        signals, confidence = model.predict(df)
+        return {'signals': signals, 'confidence': confidence, 'model': model.model,
+                'scaler': model.scaler, 'features': model.feature_columns}
+    
+    entry = cache.get_or_compute(key, train_and_predict)
+    model.model, model.scaler, model.feature_columns = entry['model'], entry['scaler'], entry['features']
+    model.compiled = None
+    return entry['signals'], entry['confidence'], key
+
+
+def cached_backtest(backtester, df, parent_key, cache=None, **kwargs):
+    """
+    Backtester.run_fast results, cached by the parent stage's key and the
+    backtest settings (``kwargs`` must be JSON-able to be cached across runs).
+    
+    On a hit the backtester's trade_arrays are not filled.
+    """
+    cache = cache or result_cache
+    key = cache.key('backtest', parent_key, backtester.initial_balance, kwargs)
+    return cache.get_or_compute(key, lambda: backtester.run_fast(df, **kwargs))
+
+
+# Global cache instance
+result_cache = ResultCache()
@@ -12,10 +12,18 @@ from scalping_strategy import ScalpingStrategy
 from advanced_ml_model import AdvancedTradingModel
 from mt5_connector import MT5Connector
 from data_loader import DataLoader
+from optimizer import optimize
+from monte_carlo import monte_carlo, summarize
+from backtest_runner import STRATEGY_KEYS, make_job, run_backtests, portfolio_report
 import warnings
 warnings.filterwarnings('ignore')
 
 
+DEPLOYMENT_PAIRS = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD',
+                    'USDCHF', 'NZDUSD', 'XAUUSD', 'EURJPY', 'GBPJPY']
+DEPLOYMENT_TIMEFRAMES = ['M15', 'H1']
+
+
 def fetch_mt5_history(mt5, days=30):
     """Fetch trade history from MT5."""
     if not mt5.connected:
@@ -105,6 +113,9 @@ def analyze_performance(trades):
     returns = df['profit']
     sharpe_ratio = (returns.mean() / returns.std()) * np.sqrt(252) if returns.std() > 0 else 0
     
+    # Drawdown and ruin over resampled trade sequences, not just the order that happened
+    simulation = summarize(monte_carlo(df['profit'].to_numpy(), resamples=10000, seed=0))
+    
     metrics = {
         'total_trades': total_trades,
         'winning_trades': winning_trades,
@@ -117,7 +128,10 @@ def analyze_performance(trades):
         'profit_factor': profit_factor,
         'max_drawdown': max_drawdown,
         'max_drawdown_pct': max_drawdown_pct,
-        'sharpe_ratio': sharpe_ratio
+        'sharpe_ratio': sharpe_ratio,
+        'mc_max_drawdown_95': simulation['max_drawdown'][95],
+        'mc_prob_loss': simulation['prob_loss'],
+        'mc_risk_of_ruin': simulation['risk_of_ruin']
     }
     
     # Print report
@@ -132,6 +146,8 @@ def analyze_performance(trades):
     print(f"\nProfit Factor: {profit_factor:.2f}")
     print(f"Maximum Drawdown: ${max_drawdown:.2f} ({max_drawdown_pct:.2f}%)")
     print(f"Sharpe Ratio: {sharpe_ratio:.2f}")
+    print(f"\nMonte Carlo (10,000 resamples): 95% Drawdown ${simulation['max_drawdown'][95]:.2f} "
+          f"| P(loss) {simulation['prob_loss']*100:.1f}% | Risk of Ruin {simulation['risk_of_ruin']*100:.1f}%")
     
     # Identify weaknesses
     print("\n--- IDENTIFIED WEAKNESSES ---")
@@ -147,6 +163,8 @@ def analyze_performance(trades):
         weaknesses.append(f"High drawdown ({max_drawdown_pct:.1f}%) - Risk management needs tightening")
     if sharpe_ratio < 1.0:
         weaknesses.append(f"Low Sharpe ratio ({sharpe_ratio:.2f}) - Returns not consistent enough")
+    if simulation['risk_of_ruin'] > 0.01:
+        weaknesses.append(f"Risk of ruin {simulation['risk_of_ruin']*100:.1f}% - Position sizes too large for the edge")
     
     for weakness in weaknesses:
         print(f"  - {weakness}")
@@ -157,7 +175,24 @@ def analyze_performance(trades):
     return metrics
 
 
-def optimize_parameters(metrics):
+def strategy_settings(config):
+    """Flatten the strategy knobs of an optimized_parameters config into a strategy config."""
+    settings = {}
+    for section in ('entry_filters', 'risk_management', 'targets'):
+        for key, value in config.get(section, {}).items():
+            if key in STRATEGY_KEYS:
+                settings[key] = value
+    return settings
+
+
+def print_search_metrics(label, metrics):
+    """Print one line of optimizer metrics."""
+    print(f"  {label:<15} trades {metrics['trades']:>5}   win rate {metrics['win_rate']:5.1f}%   "
+          f"total {metrics['total_r']:8.1f}R   expectancy {metrics['expectancy_r']:6.3f}R   "
+          f"PF {metrics['profit_factor']:.2f}")
+
+
+def optimize_parameters(metrics, trials=60, bars=4000, workers=None, connector=None, seed=None):
     """STEP 2: OPTIMIZATION PHASE"""
     print("\n" + "="*70)
     print("STEP 2: OPTIMIZATION PHASE")
@@ -167,6 +202,20 @@ def optimize_parameters(metrics):
         print("No metrics available. Run diagnostic first.")
         return None
     
+    print(f"\nSearching {trials} configurations on {len(DEPLOYMENT_PAIRS)} pairs x "
+          f"{', '.join(DEPLOYMENT_TIMEFRAMES)} (successive halving)...")
+    search = optimize(DEPLOYMENT_PAIRS, DEPLOYMENT_TIMEFRAMES, trials=trials, bars=bars,
+                      workers=workers, connector=connector, seed=seed)
+    best = search['best']
+    
+    for rung in search['rungs']:
+        print(f"  rung: {rung['configs']:>3} configs x {rung['series']:>2} series   "
+              f"best {rung['best_total_r']:.1f}R")
+    print(f"  finished in {search['seconds']:.1f}s")
+    print_search_metrics('in-sample', search['train'])
+    print_search_metrics('out-of-sample', search['test'])
+    print_search_metrics('default (oos)', search['baseline'])
+    
     optimizations = {
         'entry_filters': {},
         'risk_management': {},
@@ -179,20 +228,15 @@ def optimize_parameters(metrics):
     
     # Entry Optimization
     print("\n--- Entry Optimization ---")
+    optimizations['entry_filters']['min_confirmation_score'] = best['min_confirmation_score']
+    optimizations['entry_filters']['min_adx'] = best['min_adx']
+    optimizations['entry_filters']['rsi_range'] = list(best['rsi_range'])
+    print(f"    - Minimum confirmation score: {best['min_confirmation_score']}")
+    print(f"    - Minimum ADX: {best['min_adx']}")
+    print(f"    - RSI range: {best['rsi_range'][0]}-{best['rsi_range'][1]}")
     if metrics['win_rate'] < 50:
-        print("  Tightening entry requirements:")
-        optimizations['entry_filters']['min_confirmation_score'] = 6
         optimizations['entry_filters']['require_higher_tf_alignment'] = True
-        optimizations['entry_filters']['min_adx'] = 25
-        optimizations['entry_filters']['rsi_range'] = (35, 65)
-        print("    - Minimum confirmation score: 6 (was 3)")
         print("    - Require higher timeframe trend alignment")
-        print("    - Minimum ADX: 25 (stronger trends)")
-        print("    - RSI range: 35-65 (avoid overbought/oversold)")
-    else:
-        optimizations['entry_filters']['min_confirmation_score'] = 5
-        optimizations['entry_filters']['min_adx'] = 22
-        optimizations['entry_filters']['rsi_range'] = (30, 70)
     
     # Risk Management
     print("\n--- Risk Management ---")
@@ -205,15 +249,13 @@ def optimize_parameters(metrics):
         print("    - Daily drawdown limit: 2%")
         print("    - Max concurrent trades: 3")
     
-    if metrics['rr_ratio'] < 1.5:
-        print("  Improving risk/reward:")
-        optimizations['risk_management']['min_rr_ratio'] = 2.0
-        optimizations['risk_management']['use_dynamic_targets'] = True
-        optimizations['risk_management']['atr_stop_multiplier'] = 1.2
-        optimizations['risk_management']['atr_target_multiplier'] = 2.5
-        print("    - Minimum R:R ratio: 1:2")
-        print("    - Dynamic ATR-based targets")
-        print("    - Stop: 1.2x ATR, Target: 2.5x ATR")
+    rr_ratio = best['atr_target_multiplier'] / best['atr_stop_multiplier']
+    optimizations['risk_management']['min_rr_ratio'] = round(rr_ratio, 2)
+    optimizations['risk_management']['use_dynamic_targets'] = True
+    optimizations['risk_management']['atr_stop_multiplier'] = best['atr_stop_multiplier']
+    optimizations['risk_management']['atr_target_multiplier'] = best['atr_target_multiplier']
+    print(f"    - R:R ratio: 1:{rr_ratio:.2f}")
+    print(f"    - Stop: {best['atr_stop_multiplier']}x ATR, Target: {best['atr_target_multiplier']}x ATR")
     
     # Trade Filters
     print("\n--- Trade Filters ---")
@@ -244,19 +286,32 @@ def optimize_parameters(metrics):
     
     # Target Adjustments
     print("\n--- Target Adjustments ---")
+    optimizations['targets']['use_trailing_stop'] = best['use_trailing_stop']
+    if best['use_trailing_stop']:
+        optimizations['targets']['trailing_activation'] = best['trailing_activation']
+        optimizations['targets']['trailing_distance'] = best['trailing_distance']
+        print(f"    - Enable trailing stop after 1:{best['trailing_activation']} R:R")
+        print(f"    - Trail at {best['trailing_distance']}x ATR distance")
+    else:
+        print("    - No trailing stop")
     if metrics['profit_factor'] < 1.5:
-        optimizations['targets']['use_trailing_stop'] = True
-        optimizations['targets']['trailing_activation'] = 1.0
-        optimizations['targets']['trailing_distance'] = 0.5
         optimizations['targets']['partial_close'] = {
             'enabled': True,
             'first_target': 1.5,
             'second_target': 2.5
         }
-        print("    - Enable trailing stop after 1:1 R:R")
-        print("    - Trail at 0.5x ATR distance")
         print("    - Partial close: 50% at 1.5:1, rest at 2.5:1")
     
+    # Search results, so the choice can be audited
+    optimizations['validation'] = {
+        'method': 'successive_halving',
+        'trials': search['trials'],
+        'series': [f"{symbol} {timeframe}" for symbol, timeframe in search['series']],
+        'in_sample': search['train'],
+        'out_of_sample': search['test'],
+        'default_out_of_sample': search['baseline']
+    }
+    
     # Save optimizations
     with open('optimized_parameters.json', 'w') as f:
         json.dump(optimizations, f, indent=2)
@@ -266,33 +321,50 @@ def optimize_parameters(metrics):
     return optimizations
 
 
-def backtest_configuration(config):
+def backtest_configuration(config, bars=4000, workers=None, connector=None):
     """STEP 3: BACKTESTING & VALIDATION"""
     print("\n" + "="*70)
     print("STEP 3: BACKTESTING & VALIDATION")
     print("="*70)
     
     print("\nBacktesting optimized configuration...")
-    print("(Using sample data for demonstration)")
+    if connector is None or not connector.connected:
+        print("(Using sample data for demonstration)")
+    
+    strategy = strategy_settings(config)
+    jobs = [make_job(symbol, timeframe, strategy=strategy, costs=True)
+            for symbol in DEPLOYMENT_PAIRS for timeframe in DEPLOYMENT_TIMEFRAMES]
+    report = portfolio_report(run_backtests(jobs, bars=bars, workers=workers, connector=connector))
+    summary = report['summary']
+    
+    # Per-trade Sharpe on the portfolio's pip P&L
+    trade_pips = report['equity'].diff().fillna(report['equity'])
+    sharpe_ratio = (trade_pips.mean() / trade_pips.std()) * np.sqrt(252) if trade_pips.std() > 0 else 0
     
-    # Simulate backtest results
     results = {
-        'total_trades': 150,
-        'win_rate': 58.5,
-        'total_profit': 1250.50,
-        'profit_factor': 1.85,
-        'max_drawdown': 125.30,
-        'sharpe_ratio': 1.42
+        'total_trades': summary['total_trades'],
+        'win_rate': summary['win_rate'],
+        'total_profit': summary['pnl_pips'],
+        'profit_factor': summary['profit_factor'],
+        'max_drawdown': summary['max_drawdown_pips'],
+        'sharpe_ratio': sharpe_ratio
     }
     
     print("\n[BACKTEST RESULTS]")
     print(f"\nTotal Trades: {results['total_trades']}")
     print(f"Win Rate: {results['win_rate']:.1f}%")
-    print(f"Total Profit: ${results['total_profit']:.2f}")
+    print(f"Total Profit: {results['total_profit']:.1f} pips")
     print(f"Profit Factor: {results['profit_factor']:.2f}")
-    print(f"Maximum Drawdown: ${results['max_drawdown']:.2f}")
+    print(f"Maximum Drawdown: {results['max_drawdown']:.1f} pips")
     print(f"Sharpe Ratio: {results['sharpe_ratio']:.2f}")
     
+    validation = config.get('validation')
+    if validation:
+        print("\n[OUT-OF-SAMPLE (last 30% of each series)]")
+        print_search_metrics('optimized', validation['out_of_sample'])
+        print_search_metrics('default', validation['default_out_of_sample'])
+    
+    report['jobs'].to_csv('backtest_results.csv', index=False)
     print("\nResults saved to 'backtest_results.csv'")
     
     return results
@@ -305,9 +377,8 @@ def generate_deployment_config(config):
     print("="*70)
     
     deployment = {
-        'trading_pairs': ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD', 
-                          'USDCHF', 'NZDUSD', 'XAUUSD', 'EURJPY', 'GBPJPY'],
-        'timeframes': ['M15', 'H1'],
+        'trading_pairs': list(DEPLOYMENT_PAIRS),
+        'timeframes': list(DEPLOYMENT_TIMEFRAMES),
         'risk_per_trade': config['risk_management'].get('max_risk_per_trade', 0.01),
         'max_daily_drawdown': config['risk_management'].get('max_daily_drawdown', 0.02),
         'max_concurrent_trades': config['risk_management'].get('max_concurrent_trades', 3),
@@ -316,6 +387,10 @@ def generate_deployment_config(config):
         'rsi_range': config['entry_filters'].get('rsi_range', [30, 70]),
         'min_rr_ratio': config['risk_management'].get('min_rr_ratio', 2.0),
         'use_trailing_stop': config['targets'].get('use_trailing_stop', True),
+        'trailing_activation': config['targets'].get('trailing_activation'),
+        'trailing_distance': config['targets'].get('trailing_distance'),
+        'atr_stop_multiplier': config['risk_management'].get('atr_stop_multiplier', 1.5),
+        'atr_target_multiplier': config['risk_management'].get('atr_target_multiplier'),
         'max_trades_per_day': config['trade_filters'].get('max_trades_per_day', 10)
     }
     
@@ -363,13 +438,16 @@ def main():
         print("Failed to analyze performance")
         return
     
+    # Real price history when MT5 is available, sample data otherwise
+    connector = mt5 if mt5.connected else None
+    
     # Step 2: Optimization
     print("\nOptimizing parameters...")
-    config = optimize_parameters(metrics)
+    config = optimize_parameters(metrics, connector=connector)
     
     # Step 3: Backtesting
     print("\nBacktesting optimized configuration...")
-    results = backtest_configuration(config)
+    results = backtest_configuration(config, connector=connector)
     
     # Step 4: Deployment Config
     print("\nGenerating deployment configuration...")
@@ -1,5 +1,7 @@
 """Advanced scalping strategy with multiple confirmations."""
 
+import itertools
+
 import numpy as np
 import pandas as pd
 from pattern_recognition import PatternRecognizer
@@ -8,33 +10,108 @@ from pattern_recognition import PatternRecognizer
 class ScalpingStrategy:
     """High-frequency scalping strategy for quick profits."""
     
-    def __init__(self):
+    # Indicator columns read by analyze_scalping_opportunity/filter_scalping_signals
+    REQUIRED_COLUMNS = ['ema_12', 'ema_26', 'macd_diff', 'adx', 'rsi', 'stoch_k', 'stoch_d',
+                        'roc', 'tsi', 'bb_high', 'bb_mid', 'bb_low', 'bb_width', 'atr']
+    
+    # Rolling windows applied on top of columns, and the minimum frame length
+    LOOKBACK_WINDOWS = {'atr': 50, 'low': 50, 'high': 50}
+    MIN_BARS = 100
+    
+    # Confirmation score components, in the order they are summed
+    SCORE_COMPONENTS = ('trend', 'momentum', 'volatility', 'pattern')
+    
+    # Tunable entry rules; the defaults reproduce the original hard-coded thresholds
+    DEFAULT_PARAMS = {
+        'min_confirmation_score': 0,  # Winning side's score must reach this
+        'min_score_diff': 2,  # ...and beat the other side by this much
+        'min_adx': 15,  # Filter: no trades below this trend strength
+        'rsi_range': (25, 75),  # Filter: no buys above / sells below this RSI range
+        'min_atr_ratio': 0.5,  # Filter: no trades while ATR is below this share of its 50-bar mean
+        'trend_weight': 3,  # Score points per confirmed component
+        'momentum_weight': 2.5,
+        'volatility_weight': 2,
+        'pattern_weight': 2.5
+    }
+    
+    def __init__(self, params=None):
+        """
+        Args:
+            params: Overrides for DEFAULT_PARAMS
+        """
+        unknown = set(params or {}) - set(self.DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown scalping parameter: {sorted(unknown)[0]}")
+        self.params = dict(self.DEFAULT_PARAMS, **(params or {}))
         self.pattern_recognizer = PatternRecognizer()
         self.min_score = 3  # Lower threshold for aggressive scalping
         
-    def analyze_scalping_opportunity(self, df):
-        """Analyze for scalping opportunities with multiple confirmations."""
-        if len(df) < 100:
-            return pd.Series(0, index=df.index)
+    def tail_window(self, tail):
+        """Trailing bars needed to evaluate the last ``tail`` bars exactly."""
+        return tail + max(self.LOOKBACK_WINDOWS.values()) - 1
+    
+    def analyze_scalping_opportunity(self, df, tail=None):
+        """
+        Analyze for scalping opportunities with multiple confirmations.
+        
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+            tail: Only score the last ``tail`` bars (from a minimal trailing window);
+                the MIN_BARS guard still applies to the full frame
+        
+        Returns:
+            (signals, buy_score, sell_score) Series
+        """
+        if len(df) < self.MIN_BARS:
+            return pd.Series(0, index=df.index if tail is None else df.index[-tail:])
         
-        # Initialize scores
-        buy_score = pd.Series(0, index=df.index)
-        sell_score = pd.Series(0, index=df.index)
+        buy_score, sell_score = self.score_bars(df, tail)
+        signals = self.signals_from_scores(buy_score, sell_score)
+        
+        if tail is not None:
+            return signals.iloc[-tail:], buy_score.iloc[-tail:], sell_score.iloc[-tail:]
+        return signals, buy_score, sell_score
+    
+    def score_bars(self, df, tail=None):
+        """
+        Buy and sell confirmation scores; of the params, these only depend on the weights.
         
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+            tail: Only score the trailing window needed for the last ``tail`` bars
+        
+        Returns:
+            (buy_score, sell_score) Series
+        """
+        if tail is not None:
+            df = df.iloc[-self.tail_window(tail):]
+        buy_masks, sell_masks = self.component_masks(df)
+        return self.scores_from_masks(buy_masks, sell_masks, df.index)
+    
+    def component_masks(self, df):
+        """
+        Per-bar confirmation of each score component; these do not depend on ``params``.
+        
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+        
+        Returns:
+            (buy_masks, sell_masks) bool arrays of shape (len(SCORE_COMPONENTS), len(df))
+        """
         # 1. Trend Analysis (30% weight)
         trend_buy = (
             (df['close'] > df['ema_12']) &
             (df['ema_12'] > df['ema_26']) &
             (df['macd_diff'] > 0) &
             (df['adx'] > 20)  # Strong trend
-        ).astype(int) * 3
+        )
         
         trend_sell = (
             (df['close'] < df['ema_12']) &
             (df['ema_12'] < df['ema_26']) &
             (df['macd_diff'] < 0) &
             (df['adx'] > 20)
-        ).astype(int) * 3
+        )
         
         # 2. Momentum (25% weight)
         momentum_buy = (
@@ -42,31 +119,30 @@ class ScalpingStrategy:
             (df['stoch_k'] > df['stoch_d']) &
             (df['roc'] > 0) &
             (df['tsi'] > 0)
-        ).astype(int) * 2.5
+        )
         
         momentum_sell = (
             (df['rsi'] > 40) & (df['rsi'] < 60) &  # Not oversold
             (df['stoch_k'] < df['stoch_d']) &
             (df['roc'] < 0) &
             (df['tsi'] < 0)
-        ).astype(int) * 2.5
+        )
         
         # 3. Volatility & Entry Timing (20% weight)
         # Look for volatility expansion (good for scalping)
         atr_expanding = df['atr'] > df['atr'].rolling(10).mean()
-        bb_squeeze = (df['bb_high'] - df['bb_low']) < df['bb_width'].rolling(20).mean()
         
         volatility_buy = (
             atr_expanding &
             (df['close'] < df['bb_mid']) &  # Below middle band
             (df['close'] > df['bb_low'])    # Above lower band
-        ).astype(int) * 2
+        )
         
         volatility_sell = (
             atr_expanding &
             (df['close'] > df['bb_mid']) &  # Above middle band
             (df['close'] < df['bb_high'])   # Below upper band
-        ).astype(int) * 2
+        )
         
         # 4. Price Action Patterns (25% weight)
         patterns = self.pattern_recognizer.analyze_patterns(df)
@@ -76,61 +152,147 @@ class ScalpingStrategy:
             patterns['hammer'] |
             patterns['morning_star'] |
             patterns['support_bounce']
-        ).astype(int) * 2.5
+        )
         
         pattern_sell = (
             patterns['bearish_engulfing'] |
             patterns['shooting_star'] |
             patterns['evening_star'] |
             patterns['resistance_rejection']
-        ).astype(int) * 2.5
-        
-        # 5. Volume Confirmation (if available)
-        if 'volume' in df.columns and df['volume'].sum() > 0:
-            volume_increasing = df['volume'] > df['volume'].rolling(10).mean()
-            buy_score += volume_increasing.astype(int) * 0.5
-            sell_score += volume_increasing.astype(int) * 0.5
-        
-        # Combine all scores
-        buy_score = trend_buy + momentum_buy + volatility_buy + pattern_buy
-        sell_score = trend_sell + momentum_sell + volatility_sell + pattern_sell
+        )
         
+        buy_masks = np.array([trend_buy, momentum_buy, volatility_buy, pattern_buy], dtype=bool)
+        sell_masks = np.array([trend_sell, momentum_sell, volatility_sell, pattern_sell], dtype=bool)
+        return buy_masks, sell_masks
+    
+    def scores_from_masks(self, buy_masks, sell_masks, index):
+        """Weighted sums of component masks (see component_masks) as (buy_score, sell_score) Series."""
+        buy_score = 0
+        sell_score = 0
+        for component, buy, sell in zip(self.SCORE_COMPONENTS, buy_masks, sell_masks):
+            weight = self.params[f'{component}_weight']
+            buy_score = buy_score + buy * weight
+            sell_score = sell_score + sell * weight
+        return pd.Series(buy_score, index=index), pd.Series(sell_score, index=index)
+    
+    def signals_from_scores(self, buy_score, sell_score):
+        """Turn confirmation scores into 1/-1/0 signals using ``params``."""
         # Generate signals - Only trade when there's a CLEAR opportunity
         # Require minimum score difference to avoid false signals
-        min_score_diff = 2  # Require at least 2 point difference
+        min_score_diff = self.params['min_score_diff']
+        min_score = self.params['min_confirmation_score']
         
         signals = np.where(
-            (buy_score > sell_score) & (buy_score - sell_score >= min_score_diff), 1,  # Clear BUY
+            (buy_score > sell_score) & (buy_score - sell_score >= min_score_diff) & (buy_score >= min_score), 1,  # Clear BUY
             np.where(
-                (sell_score > buy_score) & (sell_score - buy_score >= min_score_diff), -1,  # Clear SELL
+                (sell_score > buy_score) & (sell_score - buy_score >= min_score_diff) & (sell_score >= min_score), -1,  # Clear SELL
                 0  # No clear signal - don't trade
             )
         )
         
-        return pd.Series(signals, index=df.index), buy_score, sell_score
+        return pd.Series(signals, index=buy_score.index)
     
-    def filter_scalping_signals(self, df, signals):
-        """Apply filters to remove bad signals."""
+    def filter_scalping_signals(self, df, signals, tail=None):
+        """
+        Apply filters to remove bad signals.
+        
+        Args:
+            df: DataFrame with indicator columns
+            signals: Signal Series aligned with df (or with its last ``tail`` bars)
+            tail: Only filter the last ``tail`` bars
+        """
+        window = df
+        if tail is not None:
+            window = df.iloc[-self.tail_window(tail):]
+            df = df.iloc[-tail:]
+            signals = signals.iloc[-tail:]
         filtered = signals.copy()
         
         # Filter 1: Avoid extreme RSI (overbought/oversold)
-        extreme_overbought = df['rsi'] > 75
-        extreme_oversold = df['rsi'] < 25
+        rsi_low, rsi_high = self.params['rsi_range']
+        extreme_overbought = df['rsi'] > rsi_high
+        extreme_oversold = df['rsi'] < rsi_low
         
         # Remove BUY signals when overbought, SELL signals when oversold
         filtered = np.where(extreme_overbought & (filtered == 1), 0, filtered)
         filtered = np.where(extreme_oversold & (filtered == -1), 0, filtered)
         
         # Filter 2: Require minimum ADX (trend strength)
-        weak_trend = df['adx'] < 15
+        weak_trend = df['adx'] < self.params['min_adx']
         filtered = np.where(weak_trend, 0, filtered)
         
         # Filter 3: Avoid trading during very low volatility
-        low_volatility = df['atr'] < df['atr'].rolling(50).mean() * 0.5
+        low_volatility = (window['atr'] < window['atr'].rolling(50).mean() * self.params['min_atr_ratio']).iloc[-len(df):]
         filtered = np.where(low_volatility, 0, filtered)
         
         return pd.Series(filtered, index=df.index)
     
+    def signal_grid(self, df, grid):
+        """
+        Filtered signals for every combination of a parameter grid.
+        
+        Component masks and filter inputs are computed once. Each parameter
+        then gets its own axis: scores are summed over the weight axes,
+        and thresholds and filters are broadcast over the others, so a
+        combination costs a few vector comparisons over the bars instead of
+        a full analyze_scalping_opportunity call.
+        
+        Args:
+            df: DataFrame with OHLCV and indicator columns
+            grid: Dict of DEFAULT_PARAMS name -> list of values; parameters
+                left out keep this strategy's value
+        
+        Returns:
+            (combinations, signals): list of params dicts (itertools.product
+            order over DEFAULT_PARAMS), and an int8 array of shape
+            (len(combinations), len(df)) whose rows match
+            filter_scalping_signals(df, analyze_scalping_opportunity(df)[0])
+            for each combination, ready for Backtester.run_signal_matrix
+        """
+        unknown = set(grid) - set(self.DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown scalping parameter: {sorted(unknown)[0]}")
+        names = list(self.DEFAULT_PARAMS)
+        values = [list(grid.get(name, [self.params[name]])) for name in names]
+        combinations = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+        shape = tuple(len(options) for options in values)
+        if len(df) < self.MIN_BARS:
+            return combinations, np.zeros((len(combinations), len(df)), dtype=np.int8)
+        
+        def axis(name, options=None):
+            """Values of one parameter laid along its own axis (the last axis is bars)."""
+            position = names.index(name)
+            options = np.asarray(values[position] if options is None else options, dtype=float)
+            return options.reshape(position * (1,) + (-1,) + (len(names) - position) * (1,))
+        
+        # Scores vary along the weight axes only, summed in score_bars' order
+        buy_masks, sell_masks = self.component_masks(df)
+        buy_score = 0
+        sell_score = 0
+        for component, buy, sell in zip(self.SCORE_COMPONENTS, buy_masks, sell_masks):
+            weight = axis(f'{component}_weight')
+            buy_score = buy_score + buy * weight
+            sell_score = sell_score + sell * weight
+        
+        min_score_diff = axis('min_score_diff')
+        min_score = axis('min_confirmation_score')
+        signals = np.where(
+            (buy_score > sell_score) & (buy_score - sell_score >= min_score_diff) & (buy_score >= min_score), 1,
+            np.where((sell_score > buy_score) & (sell_score - buy_score >= min_score_diff) & (sell_score >= min_score), -1, 0)
+        ).astype(np.int8)
+        
+        # Filters, as in filter_scalping_signals
+        rsi = df['rsi'].to_numpy(dtype=float)
+        rsi_range = values[names.index('rsi_range')]
+        signals = np.where((rsi > axis('rsi_range', [high for _, high in rsi_range])) & (signals == 1), 0, signals)
+        signals = np.where((rsi < axis('rsi_range', [low for low, _ in rsi_range])) & (signals == -1), 0, signals)
+        signals = np.where(df['adx'].to_numpy(dtype=float) < axis('min_adx'), 0, signals)
+        atr = df['atr'].to_numpy(dtype=float)
+        atr_mean = df['atr'].rolling(50).mean().to_numpy()
+        signals = np.where(atr < atr_mean * axis('min_atr_ratio'), 0, signals)
+        
+        return combinations, np.broadcast_to(signals, shape + (len(df),)).reshape(len(combinations), len(df)).astype(np.int8)
+    
     def calculate_scalping_targets(self, entry_price, signal, atr, buy_score, sell_score):
         """Calculate dynamic stop loss and take profit based on signal strength."""
         # Calculate signal strength
@@ -7,6 +7,17 @@ import pandas as pd
 class SignalGenerator:
     """Generate trading signals from indicators and ML predictions."""
     
+    # Indicator columns read by generate_signals/filter_signals
+    REQUIRED_COLUMNS = ['sma_20', 'sma_50', 'macd_diff', 'adx', 'ichimoku_a', 'psar', 'rsi',
+                        'stoch_k', 'stoch_d', 'roc', 'bb_high', 'bb_low', 'atr', 'kc_high', 'kc_low']
+    
+    # Rolling windows applied on top of columns ('*': the last 4 final signals)
+    LOOKBACK_WINDOWS = {'atr': 20, '*': 4}
+    
+    # Bars of ML output that decide the last bar of filter_signals: filter 4
+    # compares a bar with the 3 before it, each already filtered the same way
+    ML_TAIL = 7
+    
     def __init__(self, df):
         self.df = df
         
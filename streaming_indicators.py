@@ -0,0 +1,568 @@
+"""Streaming (bar-by-bar) version of the IndicatorEngine indicators."""
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_GROUPS, VOLUME_GROUPS, resolve_groups
+
+
+NAN = float('nan')
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _div(a, b):
+    """Divide like pandas does (x/0 -> +-inf, 0/0 -> NaN)."""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _Window:
+    """Fixed-size rolling window with running sum and centred sum of squares."""
+    
+    def __init__(self, size, min_periods=None):
+        self.size = size
+        self.min_periods = size if min_periods is None else min_periods
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.anchor = None
+        self.sq_total = 0.0
+        self.pushes = 0
+    
+    def push(self, x):
+        """Add a value, dropping the oldest one once the window is full."""
+        if self.anchor is None:
+            self.anchor = x
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.sq_total -= (old - self.anchor) ** 2
+        self.values.append(x)
+        self.total += x
+        self.sq_total += (x - self.anchor) ** 2
+        self.pushes += 1
+        if self.pushes % self.size == 0:
+            self._resync()
+    
+    def _resync(self):
+        """Recompute the running sums from scratch so rounding error cannot drift."""
+        self.anchor = self.values[-1]
+        self.total = sum(self.values)
+        self.sq_total = sum((x - self.anchor) ** 2 for x in self.values)
+    
+    @property
+    def ready(self):
+        return len(self.values) >= max(self.min_periods, 1)
+    
+    def mean(self):
+        if not self.ready:
+            return NAN
+        return self.total / len(self.values)
+    
+    def std(self, ddof=0):
+        """Standard deviation over the window (shifted data keeps it stable)."""
+        count = len(self.values)
+        if not self.ready or count - ddof <= 0:
+            return NAN
+        shifted_mean = self.total / count - self.anchor
+        var = (self.sq_total - count * shifted_mean ** 2) / (count - ddof)
+        return math.sqrt(max(var, 0.0))
+
+
+class _Extremum:
+    """Rolling max (or min) over a fixed window using a monotonic deque."""
+    
+    def __init__(self, size, mode='max', min_periods=None):
+        self.size = size
+        self.min_periods = size if min_periods is None else min_periods
+        self.sign = 1 if mode == 'max' else -1
+        self.items = deque()
+        self.count = 0
+    
+    def push(self, x):
+        key = x * self.sign
+        while self.items and self.items[-1][1] * self.sign <= key:
+            self.items.pop()
+        self.items.append((self.count, x))
+        self.count += 1
+        if self.items[0][0] <= self.count - 1 - self.size:
+            self.items.popleft()
+    
+    def value(self):
+        if min(self.count, self.size) < max(self.min_periods, 1):
+            return NAN
+        return self.items[0][1]
+
+
+class _Ema:
+    """Recursive EMA matching ``Series.ewm(adjust=False)``; leading NaNs are skipped."""
+    
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+    
+    def push(self, x):
+        if x != x:
+            return self.current()
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        self.count += 1
+        return self.current()
+    
+    def current(self):
+        return self.value if self.count >= self.min_periods else NAN
+
+
+class StreamingIndicatorEngine:
+    """
+    Keep running indicator state and update it one bar at a time.
+    
+    Produces the same columns (and values, up to float rounding) as
+    ``IndicatorEngine.calculate(columns)`` over the full history seen so
+    far, but each new bar costs O(1) instead of a full recomputation.
+    Only the groups the requested columns resolve to are tracked.
+    """
+    
+    def __init__(self, history=500, include_volume=None, columns=None):
+        """
+        Args:
+            history: Number of recent rows kept for ``frame()``
+            include_volume: Force volume indicators on/off (None = detect in warm_up)
+            columns: Indicator columns (or group names) to compute; None computes all
+        """
+        self.history = history
+        self.include_volume = include_volume
+        self.groups = set(resolve_groups(columns)[0])
+        self._reset()
+    
+    def _reset(self):
+        """Reset all running state."""
+        self.bars_seen = 0
+        self.rows = deque(maxlen=self.history)
+        self.index = deque(maxlen=self.history)
+        self.columns = None
+        self.prev_high = self.prev_low = self.prev_close = NAN
+        self.closes = deque(maxlen=13)
+        
+        # Trend
+        self.sma_20 = _Window(20)
+        self.sma_50 = _Window(50)
+        self.sma_200 = _Window(200)
+        self.ema_12 = _Ema(2 / 13, 12)
+        self.ema_26 = _Ema(2 / 27, 26)
+        self.macd_signal = _Ema(2 / 10, 9)
+        self.adx_trs = self.adx_dip = self.adx_din = 0.0
+        self.adx_dx = []
+        self.adx_value = 0.0
+        self.cci_window = _Window(20)
+        self.high_9 = _Extremum(9, 'max')
+        self.low_9 = _Extremum(9, 'min')
+        self.high_26 = _Extremum(26, 'max')
+        self.low_26 = _Extremum(26, 'min')
+        self.high_52 = _Extremum(52, 'max', min_periods=0)
+        self.low_52 = _Extremum(52, 'min', min_periods=0)
+        self.psar_state = None
+        self.highs = deque(maxlen=2)
+        self.lows = deque(maxlen=2)
+        
+        # Momentum
+        self.rsi_up = _Ema(1 / 14, 14)
+        self.rsi_down = _Ema(1 / 14, 14)
+        self.high_14 = _Extremum(14, 'max')
+        self.low_14 = _Extremum(14, 'min')
+        self.stoch_k = deque(maxlen=3)
+        self.tsi_slow = _Ema(2 / 26, 25)
+        self.tsi_fast = _Ema(2 / 14, 13)
+        self.tsi_abs_slow = _Ema(2 / 26, 25)
+        self.tsi_abs_fast = _Ema(2 / 14, 13)
+        
+        # Volatility
+        self.close_20 = _Window(20)
+        self.true_ranges = []
+        self.atr_value = 0.0
+        self.kc_high = _Window(20, min_periods=0)
+        self.kc_low = _Window(20, min_periods=0)
+        self.high_20 = _Extremum(20, 'max')
+        self.low_20 = _Extremum(20, 'min')
+        
+        # Volume
+        self.obv = 0.0
+        self.cmf_flow = _Window(20)
+        self.cmf_volume = _Window(20)
+        self.fi = _Ema(2 / 14, 13)
+        self.mfi_pos = _Window(14)
+        self.mfi_neg = _Window(14)
+        self.prev_typical = NAN
+    
+    def output_columns(self):
+        """Columns produced for each row (same order as calculate)."""
+        return PRICE_COLUMNS + [col for group, columns in INDICATOR_GROUPS
+                                if group in self.groups and (self.include_volume or group not in VOLUME_GROUPS)
+                                for col in columns]
+    
+    def warm_up(self, df):
+        """
+        Reset state and replay a whole OHLCV frame.
+        
+        Args:
+            df: DataFrame with columns ['open', 'high', 'low', 'close', 'volume']
+        
+        Returns:
+            DataFrame equivalent to ``IndicatorEngine(df).calculate(columns)``
+        """
+        include_volume = self.include_volume
+        self._reset()
+        if include_volume is None:
+            include_volume = 'volume' in df.columns and df['volume'].sum() > 0
+        self.include_volume = bool(include_volume)
+        self.columns = self.output_columns()
+        
+        volume = df['volume'] if 'volume' in df.columns else pd.Series(0.0, index=df.index)
+        values = np.column_stack([
+            df['open'].to_numpy(dtype=float),
+            df['high'].to_numpy(dtype=float),
+            df['low'].to_numpy(dtype=float),
+            df['close'].to_numpy(dtype=float),
+            volume.to_numpy(dtype=float)
+        ]).tolist()
+        
+        out = [self._step(o, h, l, c, v) for o, h, l, c, v in values]
+        for timestamp, row in zip(df.index[-self.history:], out[-self.history:]):
+            self.index.append(timestamp)
+            self.rows.append(row)
+        
+        return pd.DataFrame(out, index=df.index, columns=self.columns)
+    
+    def update(self, bar, timestamp=None):
+        """
+        Feed one new closed bar and return its indicator row.
+        
+        Args:
+            bar: Mapping/Series with open, high, low, close (and volume)
+            timestamp: Bar time (defaults to ``bar.name`` for Series)
+        
+        Returns:
+            Series with the newest indicator values
+        """
+        if self.columns is None:
+            if self.include_volume is None:
+                self.include_volume = float(bar.get('volume', 0) or 0) > 0
+            self.columns = self.output_columns()
+        if timestamp is None:
+            timestamp = getattr(bar, 'name', self.bars_seen)
+        
+        row = self._step(float(bar['open']), float(bar['high']), float(bar['low']),
+                         float(bar['close']), float(bar.get('volume', 0) or 0))
+        self.index.append(timestamp)
+        self.rows.append(row)
+        return pd.Series(row, index=self.columns, name=timestamp)
+    
+    def preview(self, bar, timestamp=None):
+        """
+        Indicator row for a still-forming bar, leaving the running state untouched.
+        
+        Args:
+            bar: Mapping/Series with open, high, low, close (and volume)
+            timestamp: Bar time (defaults to ``bar.name`` for Series)
+        
+        Returns:
+            Series with the values ``update(bar)`` would return
+        """
+        rows, index = self.rows, self.index
+        self.rows = self.index = None
+        try:
+            trial = copy.deepcopy(self)
+        finally:
+            self.rows, self.index = rows, index
+        
+        trial.rows = deque(maxlen=1)
+        trial.index = deque(maxlen=1)
+        return trial.update(bar, timestamp)
+    
+    def frame(self):
+        """Return the most recent ``history`` rows as a DataFrame."""
+        return pd.DataFrame(list(self.rows), index=list(self.index), columns=self.columns)
+    
+    def _step(self, o, h, l, c, v):
+        """Advance the selected indicators by one bar and return the row values."""
+        r = self.bars_seen
+        pc, ph, pl = self.prev_close, self.prev_high, self.prev_low
+        g = self.groups
+        row = [o, h, l, c, v]
+        
+        # --- Trend ---
+        for group, window in (('sma_20', self.sma_20), ('sma_50', self.sma_50), ('sma_200', self.sma_200)):
+            if group in g:
+                window.push(c)
+                row.append(window.mean())
+        macd_on = 'macd' in g
+        if 'ema_12' in g or macd_on:
+            ema_12 = self.ema_12.push(c)
+            if 'ema_12' in g:
+                row.append(ema_12)
+        if 'ema_26' in g or macd_on:
+            ema_26 = self.ema_26.push(c)
+            if 'ema_26' in g:
+                row.append(ema_26)
+        if macd_on:
+            macd = ema_12 - ema_26
+            macd_signal = self.macd_signal.push(macd)
+            row.extend([macd, macd_signal, macd - macd_signal])
+        
+        if 'adx' in g:
+            row.extend(self._step_adx(r, h, l, pc, ph, pl))
+        
+        typical = (h + l + c) / 3.0
+        if 'cci' in g:
+            self.cci_window.push(typical)
+            if self.cci_window.ready:
+                window = self.cci_window.values
+                mean = sum(window) / len(window)
+                mad = sum(abs(x - mean) for x in window) / len(window)
+                row.append(_div(typical - self.cci_window.mean(), 0.015 * mad))
+            else:
+                row.append(NAN)
+        
+        if 'ichimoku' in g:
+            for tracker in (self.high_9, self.high_26, self.high_52):
+                tracker.push(h)
+            for tracker in (self.low_9, self.low_26, self.low_52):
+                tracker.push(l)
+            conv = 0.5 * (self.high_9.value() + self.low_9.value())
+            base = 0.5 * (self.high_26.value() + self.low_26.value())
+            row.extend([0.5 * (conv + base), 0.5 * (self.high_52.value() + self.low_52.value())])
+        
+        if 'psar' in g:
+            row.append(self._step_psar(r, h, l, c))
+        
+        # --- Momentum ---
+        diff = c - pc
+        if 'rsi' in g:
+            emaup = self.rsi_up.push(diff if diff > 0 else 0.0)
+            emadn = self.rsi_down.push(-diff if diff < 0 else 0.0)
+            if emadn == 0:
+                row.append(100.0)
+            elif emadn != emadn:
+                row.append(NAN)
+            else:
+                row.append(100 - (100 / (1 + emaup / emadn)))
+        
+        if 'stoch' in g or 'williams_r' in g:
+            self.high_14.push(h)
+            self.low_14.push(l)
+            high_14, low_14 = self.high_14.value(), self.low_14.value()
+        if 'stoch' in g:
+            stoch_k = _div(100 * (c - low_14), high_14 - low_14)
+            self.stoch_k.append(stoch_k)
+            if len(self.stoch_k) == 3 and all(k == k for k in self.stoch_k):
+                stoch_d = sum(self.stoch_k) / 3
+            else:
+                stoch_d = NAN
+            row.extend([stoch_k, stoch_d])
+        if 'williams_r' in g:
+            row.append(_div(-100 * (high_14 - c), high_14 - low_14))
+        
+        if 'roc' in g:
+            row.append((c - self.closes[-12]) / self.closes[-12] * 100 if len(self.closes) >= 12 else NAN)
+        
+        if 'tsi' in g:
+            smoothed = self.tsi_fast.push(self.tsi_slow.push(diff))
+            smoothed_abs = self.tsi_abs_fast.push(self.tsi_abs_slow.push(abs(diff)))
+            row.append(_div(smoothed, smoothed_abs) * 100)
+        
+        # --- Volatility ---
+        if 'bollinger' in g or 'volatility' in g:
+            self.close_20.push(c)
+        if 'bollinger' in g:
+            bb_mid = self.close_20.mean()
+            bb_std = self.close_20.std(ddof=0)
+            bb_high = bb_mid + 2 * bb_std
+            bb_low = bb_mid - 2 * bb_std
+            row.extend([bb_high, bb_mid, bb_low, _div(bb_high - bb_low, bb_mid) * 100])
+        
+        if 'atr' in g:
+            row.append(self._step_atr(r, h, l, pc))
+        
+        if 'keltner' in g:
+            self.kc_high.push(((4 * h) - (2 * l) + c) / 3.0)
+            self.kc_low.push(((-2 * h) + (4 * l) + c) / 3.0)
+            row.extend([self.kc_high.mean(), self.kc_low.mean()])
+        
+        if 'donchian' in g:
+            self.high_20.push(h)
+            self.low_20.push(l)
+            row.extend([self.high_20.value(), self.low_20.value()])
+        
+        # --- Volume ---
+        if self.include_volume:
+            row.extend(self._step_volume(h, l, c, v, pc, typical))
+        
+        # --- Custom ---
+        if 'price_momentum' in g:
+            row.append(c / self.closes[-10] - 1 if len(self.closes) >= 10 else NAN)
+        if 'volatility' in g:
+            row.append(self.close_20.std(ddof=1))
+        
+        self.closes.append(c)
+        self.prev_high, self.prev_low, self.prev_close = h, l, c
+        self.prev_typical = typical
+        self.bars_seen += 1
+        return row
+    
+    def _step_adx(self, r, h, l, pc, ph, pl, window=14):
+        """Wilder ADX, reproducing ``ta.trend.ADXIndicator`` exactly."""
+        if r == 0:
+            return 0.0, 0.0, 0.0
+        
+        directional_move = max(h, pc) - min(l, pc)
+        diff_up = h - ph
+        diff_down = pl - l
+        pos = diff_up if (diff_up > diff_down and diff_up > 0) else 0.0
+        neg = diff_down if (diff_down > diff_up and diff_down > 0) else 0.0
+        
+        if r <= window:
+            self.adx_trs += directional_move
+            self.adx_dip += pos
+            self.adx_din += neg
+            if r < window:
+                return 0.0, 0.0, 0.0
+        else:
+            self.adx_trs = self.adx_trs - (self.adx_trs / float(window)) + directional_move
+            self.adx_dip = self.adx_dip - (self.adx_dip / float(window)) + pos
+            self.adx_din = self.adx_din - (self.adx_din / float(window)) + neg
+        
+        trs = self.adx_trs
+        dip = 100 * (self.adx_dip / trs) if trs != 0 else 0
+        din = 100 * (self.adx_din / trs) if trs != 0 else 0
+        dx = 100 * abs((dip - din) / (dip + din)) if dip + din != 0 else 0
+        
+        if r < 2 * window - 1:
+            self.adx_dx.append(dx)
+            adx = 0.0
+        elif r == 2 * window - 1:
+            self.adx_dx.append(dx)
+            adx = self.adx_value = float(np.mean(self.adx_dx[-window:]))
+        else:
+            adx = self.adx_value = ((self.adx_value * (window - 1)) + dx) / float(window)
+        
+        # ta leaves +DI/-DI at zero on the first smoothed bar
+        if r == window:
+            return adx, 0.0, 0.0
+        return adx, dip, din
+    
+    def _step_psar(self, r, h, l, c, step=0.02, max_step=0.20):
+        """Parabolic SAR, reproducing ``ta.trend.PSARIndicator``."""
+        highs, lows = self.highs, self.lows
+        if r < 2:
+            if r == 0:
+                self.psar_state = [True, step, h, l, c]
+            else:
+                self.psar_state[4] = c
+            highs.append(h)
+            lows.append(l)
+            return c
+        
+        up_trend, af, up_trend_high, down_trend_low, prev_psar = self.psar_state
+        reversal = False
+        if up_trend:
+            psar = prev_psar + (af * (up_trend_high - prev_psar))
+            if l < psar:
+                reversal = True
+                psar = up_trend_high
+                down_trend_low = l
+                af = step
+            else:
+                if h > up_trend_high:
+                    up_trend_high = h
+                    af = min(af + step, max_step)
+                low1, low2 = lows[-1], lows[-2]
+                if low2 < psar:
+                    psar = low2
+                elif low1 < psar:
+                    psar = low1
+        else:
+            psar = prev_psar - (af * (prev_psar - down_trend_low))
+            if h > psar:
+                reversal = True
+                psar = down_trend_low
+                up_trend_high = h
+                af = step
+            else:
+                if l < down_trend_low:
+                    down_trend_low = l
+                    af = min(af + step, max_step)
+                high1, high2 = highs[-1], highs[-2]
+                if high2 > psar:
+                    psar = high2
+                elif high1 > psar:
+                    psar = high1
+        
+        self.psar_state = [up_trend != reversal, af, up_trend_high, down_trend_low, psar]
+        highs.append(h)
+        lows.append(l)
+        return psar
+    
+    def _step_atr(self, r, h, l, pc, window=14):
+        """Wilder ATR, reproducing ``ta.volatility.AverageTrueRange``."""
+        ranges = [h - l]
+        if pc == pc:
+            ranges += [abs(h - pc), abs(l - pc)]
+        true_range = max(ranges)
+        
+        if r < window - 1:
+            self.true_ranges.append(true_range)
+            return 0.0
+        if r == window - 1:
+            self.true_ranges.append(true_range)
+            self.atr_value = float(np.mean(self.true_ranges))
+            self.true_ranges = []
+        else:
+            self.atr_value = (self.atr_value * (window - 1) + true_range) / float(window)
+        return self.atr_value
+    
+    def _step_volume(self, h, l, c, v, pc, typical):
+        """The selected volume indicators (OBV, Chaikin money flow, force index, MFI) for one bar."""
+        g = self.groups
+        out = []
+        if 'obv' in g:
+            self.obv += -v if c < pc else v
+            out.append(self.obv)
+        
+        if 'cmf' in g:
+            mfv = _div((c - l) - (h - c), h - l)
+            if mfv != mfv:
+                mfv = 0.0
+            self.cmf_flow.push(mfv * v)
+            self.cmf_volume.push(v)
+            out.append(_div(self.cmf_flow.total, self.cmf_volume.total) if self.cmf_volume.ready else NAN)
+        
+        if 'fi' in g:
+            out.append(self.fi.push((c - pc) * v))
+        
+        if 'mfi' in g:
+            if typical > self.prev_typical:
+                money_flow = typical * v
+            elif typical < self.prev_typical:
+                money_flow = -(typical * v)
+            else:
+                money_flow = 0.0
+            self.mfi_pos.push(money_flow if money_flow >= 0.0 else 0.0)
+            self.mfi_neg.push(money_flow if money_flow < 0.0 else 0.0)
+            if self.mfi_pos.ready:
+                ratio = _div(self.mfi_pos.total, abs(self.mfi_neg.total))
+                out.append(100 - (100 / (1 + ratio)))
+            else:
+                out.append(NAN)
+        
+        return out
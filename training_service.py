@@ -0,0 +1,370 @@
+"""Background model training: a process-pool job queue publishing into a versioned model registry."""
+
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from advanced_ml_model import AdvancedTradingModel
+from indicators import IndicatorEngine
+from scalping_strategy import ScalpingStrategy
+
+
+MODEL_DIR = os.environ.get('MODEL_DIR', 'models')
+
+# Fraction of a job done when it enters each stage (fitting the ensemble is one opaque step)
+STAGES = OrderedDict([
+    ('queued', 0.0),
+    ('indicators', 0.05),
+    ('signals', 0.15),
+    ('training', 0.25),
+    ('publishing', 0.95),
+    ('done', 1.0)
+])
+
+# Finished jobs kept for the status endpoints
+MAX_JOBS = 50
+
+# Seconds after a failed job before automatic retraining of the same symbol is tried again
+FAILURE_COOLDOWN = 600
+
+# Progress queue of this (worker) process, set by _init_worker
+_progress = None
+
+
+class ModelRegistry:
+    """
+    Versioned store of trained models with one active version.
+    
+    Every published model is saved as ``<name>-v<version>.pkl`` plus its
+    compiled copy, and listed in ``manifest.json``. The active model is
+    held in one ``active`` tuple that publish replaces in a single
+    assignment, so a reader that takes ``version, model = registry.active``
+    never sees a partly trained or mixed model; a version is never mutated
+    after it is published.
+    """
+    
+    def __init__(self, directory=MODEL_DIR, name='advanced_model', model_class=AdvancedTradingModel, keep=5):
+        """
+        Args:
+            directory: Directory of model files and the manifest
+            name: File name prefix of the versions
+            model_class: Class that loads a saved version
+            keep: Versions whose files are kept on disk (older ones are deleted)
+        """
+        self.directory = directory
+        self.name = name
+        self.model_class = model_class
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.active = (None, None)
+        self.manifest = {'current': None, 'versions': []}
+        self.listeners = []
+    
+    @property
+    def current(self):
+        """Active model, or None before one is loaded or published."""
+        return self.active[1]
+    
+    @property
+    def version(self):
+        """Active version number, or None."""
+        return self.active[0]
+    
+    def on_publish(self, callback):
+        """Call ``callback(version, model, previous_version)`` after every swap."""
+        self.listeners.append(callback)
+    
+    def path(self, version, extension='pkl'):
+        """File of a version."""
+        return os.path.join(self.directory, f"{self.name}-v{version}.{extension}")
+    
+    def _write_manifest(self):
+        """Replace manifest.json atomically."""
+        path = os.path.join(self.directory, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+    
+    def _load_version(self, version):
+        """Model of a saved version, serving from its compiled copy when there is one."""
+        model = self.model_class()
+        model.load(self.path(version))
+        if os.path.exists(self.path(version, 'compiled')):
+            model.load_compiled(self.path(version, 'compiled'))
+        return model
+    
+    def load(self, legacy=None):
+        """
+        Activate the manifest's current version.
+        
+        Args:
+            legacy: Unversioned model file (e.g. 'advanced_model.pkl')
+                activated as version 0 when there is no manifest yet
+        
+        Returns:
+            Active version, or None when nothing could be loaded
+        """
+        path = os.path.join(self.directory, 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            version = self.manifest['current']
+            if version is not None:
+                self._swap(version, self._load_version(version))
+        elif legacy is not None and os.path.exists(legacy):
+            model = self.model_class()
+            model.load(legacy)
+            compiled = os.path.splitext(legacy)[0] + '.compiled'
+            if os.path.exists(compiled):
+                model.load_compiled(compiled)
+            self._swap(0, model)
+        return self.version
+    
+    def publish(self, model, info=None):
+        """
+        Save a trained model as the next version and make it active.
+        
+        Args:
+            model: Trained model (not used by anyone else afterwards)
+            info: JSON-able metadata stored in the manifest (scores, symbol, ...)
+        
+        Returns:
+            New version number
+        """
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            version = max([entry['version'] for entry in self.manifest['versions']] + [0]) + 1
+            model.save(self.path(version))
+            model.save_compiled(self.path(version, 'compiled'))
+            model.load_compiled(self.path(version, 'compiled'))
+            
+            self.manifest['versions'].append(dict(info or {}, version=version, created=datetime.now().isoformat()))
+            self.manifest['current'] = version
+            self._prune()
+            self._write_manifest()
+            self._swap(version, model)
+        return version
+    
+    def _swap(self, version, model):
+        """Replace the active model in one assignment, then notify listeners."""
+        previous = self.active[0]
+        self.active = (version, model)
+        for callback in self.listeners:
+            callback(version, model, previous)
+    
+    def _prune(self):
+        """Delete the files of versions beyond the ``keep`` most recent."""
+        versions = self.manifest['versions']
+        for entry in versions[:-self.keep]:
+            for extension in ('pkl', 'compiled'):
+                try:
+                    os.remove(self.path(entry['version'], extension))
+                except FileNotFoundError:
+                    pass
+        self.manifest['versions'] = versions[-self.keep:]
+    
+    def versions(self):
+        """Manifest entries of the kept versions, oldest first."""
+        return list(self.manifest['versions'])
+
+
+def _init_worker(progress):
+    """Worker process initializer: keep the progress queue."""
+    global _progress
+    _progress = progress
+
+
+def _report(job_id, stage):
+    """Send a stage change to the service (no-op when run in-process)."""
+    if _progress is not None:
+        _progress.put((job_id, stage))
+
+
+def train_job(job_id, df, params=None):
+    """
+    Train an AdvancedTradingModel on raw OHLCV bars (runs in a worker process).
+    
+    Args:
+        job_id: Job id used in progress reports
+        df: OHLCV DataFrame
+        params: ScalpingStrategy parameters used to label signals
+    
+    Returns:
+        (trained model, train score, test score)
+    """
+    _report(job_id, 'indicators')
+    df_indicators = IndicatorEngine(df).calculate_all()
+    
+    _report(job_id, 'signals')
+    signals, _, _ = ScalpingStrategy(params).analyze_scalping_opportunity(df_indicators)
+    df_indicators['signal'] = signals
+    
+    _report(job_id, 'training')
+    model = AdvancedTradingModel()
+    train_score, test_score = model.train(df_indicators)
+    if model.feature_columns is None or not hasattr(model.model, 'classes_'):
+        raise ValueError('Not enough data for training')
+    return model, float(train_score), float(test_score)
+
+
+class TrainingService:
+    """
+    Queue of training jobs run in a process pool.
+    
+    Jobs never block the caller: ``submit`` returns a job id right away,
+    ``status`` reports the job's stage and progress, and a finished model
+    is published into the registry, which swaps it in atomically.
+    """
+    
+    def __init__(self, registry, workers=1):
+        """
+        Args:
+            registry: ModelRegistry finished models are published to
+            workers: Jobs trained at once (each model trains on config.TRAINING_WORKERS cores)
+        """
+        self.registry = registry
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.ids = itertools.count(1)
+        self.pool = None
+        self.progress = None
+        self.listener = None
+    
+    def _start(self):
+        """Create the pool and the progress listener on first use."""
+        # spawn, not fork: the app forks from a process running MT5, Flask and trading threads
+        context = multiprocessing.get_context('spawn')
+        self.progress = context.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                        initializer=_init_worker, initargs=(self.progress,))
+        self.listener = threading.Thread(target=self._listen, daemon=True)
+        self.listener.start()
+    
+    def _listen(self):
+        """Apply worker progress reports until shutdown sends None."""
+        while True:
+            message = self.progress.get()
+            if message is None:
+                break
+            job_id, stage = message
+            with self.lock:
+                job = self.jobs.get(job_id)
+                # Reports can arrive after the job finished
+                if job is None or job['status'] in ('done', 'failed'):
+                    continue
+                if job['status'] == 'queued':
+                    job['status'], job['started'] = 'running', datetime.now().isoformat()
+                job['stage'], job['progress'] = stage, STAGES[stage]
+    
+    def submit(self, df, symbol, timeframe='M5', params=None):
+        """
+        Queue a training job.
+        
+        A job already queued or running for the same symbol and timeframe
+        is returned instead of starting another one.
+        
+        Args:
+            df: OHLCV bars to train on
+            symbol: Instrument (recorded with the published version)
+            timeframe: Bar timeframe
+            params: ScalpingStrategy parameters used to label signals
+        
+        Returns:
+            Job id
+        """
+        with self.lock:
+            for job in self.jobs.values():
+                if job['symbol'] == symbol and job['timeframe'] == timeframe and job['status'] in ('queued', 'running'):
+                    return job['id']
+            if self.pool is None:
+                self._start()
+            
+            job_id = next(self.ids)
+            self.jobs[job_id] = {
+                'id': job_id,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'bars': len(df),
+                'status': 'queued',
+                'stage': 'queued',
+                'progress': STAGES['queued'],
+                'submitted': datetime.now().isoformat(),
+                'started': None,
+                'finished': None,
+                'version': None,
+                'train_score': None,
+                'test_score': None,
+                'error': None
+            }
+            while len(self.jobs) > MAX_JOBS:
+                oldest = next(iter(self.jobs.values()))
+                if oldest['status'] not in ('done', 'failed'):
+                    break
+                self.jobs.popitem(last=False)
+        
+        future = self.pool.submit(train_job, job_id, df, params)
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return job_id
+    
+    def _finish(self, job_id, future):
+        """Publish a finished job's model, or record its error."""
+        job = self.jobs[job_id]
+        try:
+            model, train_score, test_score = future.result()
+            with self.lock:
+                job['stage'], job['progress'] = 'publishing', STAGES['publishing']
+            version = self.registry.publish(model, {
+                'symbol': job['symbol'],
+                'timeframe': job['timeframe'],
+                'bars': job['bars'],
+                'train_score': train_score,
+                'test_score': test_score
+            })
+            update = {'status': 'done', 'stage': 'done', 'progress': STAGES['done'], 'version': version,
+                      'train_score': train_score, 'test_score': test_score}
+        except Exception as e:
+            traceback.print_exc()
+            update = {'status': 'failed', 'error': str(e)}
+        with self.lock:
+            job.update(update, finished=datetime.now().isoformat())
+    
+    def status(self, job_id):
+        """Copy of a job's status dict, or None for an unknown id."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def list_jobs(self):
+        """Status of every kept job, newest first."""
+        with self.lock:
+            return [dict(job) for job in reversed(self.jobs.values())]
+    
+    def pending(self):
+        """Whether any job is queued or running."""
+        with self.lock:
+            return any(job['status'] in ('queued', 'running') for job in self.jobs.values())
+    
+    def recently_failed(self, symbol, timeframe='M5', cooldown=FAILURE_COOLDOWN):
+        """Whether the newest job for the symbol and timeframe failed less than ``cooldown`` seconds ago."""
+        with self.lock:
+            for job in reversed(self.jobs.values()):
+                if job['symbol'] == symbol and job['timeframe'] == timeframe:
+                    if job['status'] != 'failed':
+                        return False
+                    age = datetime.now() - datetime.fromisoformat(job['finished'])
+                    return age.total_seconds() < cooldown
+        return False
+    
+    def shutdown(self, wait=True):
+        """Stop the pool (waiting for running jobs) and the progress listener."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
+            self.progress.put(None)
+            self.pool = None
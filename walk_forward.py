@@ -0,0 +1,286 @@
+"""Walk-forward backtesting with per-fold model retraining."""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from advanced_ml_model import AdvancedTradingModel
+from backtester import Backtester
+from data_loader import DataLoader
+from indicators import IndicatorEngine
+from ml_model import TradingModel
+from online_ml_model import OnlineTradingModel
+from signal_generator import SignalGenerator
+
+
+MODELS = {'basic': TradingModel, 'advanced': AdvancedTradingModel, 'online': OnlineTradingModel}
+
+# Columns a fold needs to combine, filter and backtest its signals
+FRAME_COLUMNS = ['high', 'low', 'close', 'atr', 'adx', 'rsi', 'signal']
+
+# Bars kept in front of each test segment so rolling filters start warm
+FILTER_CONTEXT = 20
+
+# Fewer training rows than this leave a fold without a model (and trades)
+MIN_TRAIN_ROWS = 100
+
+
+def make_folds(n, train_bars, test_bars, anchored=False):
+    """
+    Consecutive, non-overlapping test windows after an initial training window.
+    
+    Args:
+        n: Number of bars
+        train_bars: Bars in each training window (the first one when anchored)
+        test_bars: Bars in each test window
+        anchored: Grow the training window from bar 0 instead of rolling it
+    
+    Returns:
+        List of (train_start, train_end, test_start, test_end) bar positions
+    """
+    folds = []
+    test_start = train_bars
+    while test_start < n:
+        test_end = min(test_start + test_bars, n)
+        train_start = 0 if anchored else test_start - train_bars
+        folds.append((train_start, test_start, test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def _run_group(task):
+    """
+    Train one model and backtest it on the test segments of its folds.
+    
+    Module level so process pools can pickle it; the task only carries the
+    slices of the precomputed features this group needs.
+    """
+    model = MODELS[task['model']]()
+    if hasattr(model, 'set_workers'):
+        model.set_workers(task['model_workers'])
+    trained = len(task['X']) >= MIN_TRAIN_ROWS and task['y'].nunique() > 1
+    train_accuracy = model.fit(task['X'], task['y']) if trained else np.nan
+    
+    outputs = []
+    for test in task['tests']:
+        frame = test['frame']
+        ml_signal = pd.Series(0, index=frame.index)
+        ml_confidence = pd.Series(0.0, index=frame.index)
+        precision = np.nan
+        
+        if trained and len(test['X']):
+            signals, confidence = model.predict_features(test['X'])
+            ml_signal[test['X'].index] = signals
+            ml_confidence[test['X'].index] = confidence
+            taken = signals != 0
+            if taken.any():
+                precision = float((signals[taken] == test['y'].to_numpy()[taken]).mean())
+        
+        signal_gen = SignalGenerator(frame)
+        df_test = signal_gen.combine_with_ml(frame, ml_signal.to_numpy(), ml_confidence.to_numpy())
+        df_test = signal_gen.filter_signals(df_test).iloc[test['context']:]
+        
+        backtester = Backtester()
+        results = backtester.run_fast(df_test, **task['backtest'])
+        
+        outputs.append({
+            'fold': test['fold'],
+            'train_start': task['train_start'],
+            'train_end': task['train_end'],
+            'test_start': df_test.index[0],
+            'test_end': df_test.index[-1],
+            'retrained': test['fold'] == task['first_fold'],
+            'train_rows': len(task['X']),
+            'train_accuracy': train_accuracy,
+            'ml_precision': precision,
+            'results': results,
+            'pnl': backtester.trade_arrays['pnl'],
+            'entry_time': backtester.trade_arrays['entry_time']
+        })
+    return outputs
+
+
+class WalkForward:
+    """Roll train/test windows across a history, retraining the ML model per fold."""
+    
+    def __init__(self, model='basic', train_bars=2000, test_bars=500, anchored=False,
+                 retrain_every=1, purge=5, workers=None, backtest_params=None):
+        """
+        Args:
+            model: 'basic' (TradingModel), 'advanced' (AdvancedTradingModel) or
+                'online' (OnlineTradingModel)
+            train_bars: Bars in each training window
+            test_bars: Bars in each out-of-sample window
+            anchored: Expanding training windows starting at the first bar
+            retrain_every: Train a model every this many folds and reuse it in between
+            purge: Bars dropped from the end of each training window so no
+                target (which looks ahead) overlaps the test window
+            workers: Worker processes (default: all cores); 1 runs in this process
+            backtest_params: Keyword arguments for Backtester.run_fast
+        """
+        if model not in MODELS:
+            raise ValueError(f"Unknown model: {model}")
+        self.model = model
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.anchored = anchored
+        self.retrain_every = max(1, retrain_every)
+        self.purge = purge
+        self.workers = workers or os.cpu_count() or 1
+        self.backtest_params = dict(backtest_params or {})
+    
+    def prepare(self, df):
+        """
+        Indicators, indicator signals, model features and targets over the
+        whole history, computed once and sliced per fold.
+        
+        Every step only looks back, except the target, which the purge keeps
+        out of the test windows.
+        
+        Returns:
+            (df_signals, X, y)
+        """
+        df_indicators = IndicatorEngine(df, backend='numpy').calculate_all()
+        df_signals = SignalGenerator(df_indicators).generate_signals()
+        
+        template = MODELS[self.model]()
+        X = template.prepare_features(df_signals)
+        y = pd.Series(template.create_target(df_signals), index=df_signals.index).loc[X.index]
+        return df_signals, X, y
+    
+    def tasks(self, df_signals, X, y):
+        """One task per training group: its training slice and its folds' test slices."""
+        positions = df_signals.index.get_indexer(X.index)
+        has_target = y.to_numpy() != 0
+        folds = make_folds(len(df_signals), self.train_bars, self.test_bars, self.anchored)
+        
+        tasks = []
+        for first in range(0, len(folds), self.retrain_every):
+            train_start, train_end = folds[first][:2]
+            train_rows = (positions >= train_start) & (positions < train_end - self.purge) & has_target
+            
+            tests = []
+            for number, (_, _, test_start, test_end) in enumerate(folds[first:first + self.retrain_every], first):
+                context = max(0, test_start - FILTER_CONTEXT)
+                test_rows = (positions >= test_start) & (positions < test_end)
+                tests.append({
+                    'fold': number,
+                    'frame': df_signals.iloc[context:test_end][FRAME_COLUMNS],
+                    'context': test_start - context,
+                    'X': X[test_rows],
+                    'y': y[test_rows]
+                })
+            
+            tasks.append({
+                'model': self.model,
+                'first_fold': first,
+                'train_start': df_signals.index[train_start],
+                'train_end': df_signals.index[train_end - 1],
+                'X': X[train_rows],
+                'y': y[train_rows],
+                'tests': tests,
+                'backtest': self.backtest_params
+            })
+        return tasks
+    
+    def run(self, df):
+        """
+        Walk forward over an OHLCV history.
+        
+        Args:
+            df: OHLCV DataFrame, oldest bar first
+        
+        Returns:
+            Dict with 'folds' (DataFrame), 'trades' (DataFrame of out-of-sample
+            trades) and 'summary' (Backtester statistics over all folds)
+        """
+        started = time.perf_counter()
+        tasks = self.tasks(*self.prepare(df))
+        
+        # Groups running side by side share the cores a model may train on
+        processes = 1 if self.workers == 1 or len(tasks) <= 1 else min(self.workers, len(tasks))
+        for task in tasks:
+            task['model_workers'] = max(1, self.workers // processes)
+        
+        if processes == 1:
+            groups = [_run_group(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                groups = list(pool.map(_run_group, tasks))
+        outputs = [output for group in groups for output in group]
+        
+        return self._report(outputs, time.perf_counter() - started)
+    
+    def _report(self, outputs, seconds):
+        """Fold table, out-of-sample trades and combined statistics."""
+        rows = []
+        trades = []
+        for output in outputs:
+            results = output['results']
+            rows.append({
+                'fold': output['fold'],
+                'train_start': output['train_start'],
+                'train_end': output['train_end'],
+                'test_start': output['test_start'],
+                'test_end': output['test_end'],
+                'retrained': output['retrained'],
+                'train_rows': output['train_rows'],
+                'train_accuracy': output['train_accuracy'],
+                'ml_precision': output['ml_precision'],
+                'trades': results['total_trades'],
+                'win_rate': results['win_rate'],
+                'total_pnl': results['total_pnl']
+            })
+            trades.append(pd.DataFrame({'fold': output['fold'], 'entry_time': output['entry_time'], 'pnl': output['pnl']}))
+        
+        pnl = np.concatenate([output['pnl'] for output in outputs]) if outputs else np.empty(0)
+        summary = Backtester()._calculate_statistics_arrays(pnl)
+        summary['folds'] = len(outputs)
+        summary['seconds'] = seconds
+        
+        return {
+            'folds': pd.DataFrame(rows),
+            'trades': pd.concat(trades, ignore_index=True) if trades else pd.DataFrame(columns=['fold', 'entry_time', 'pnl']),
+            'summary': summary
+        }
+    
+    def print_results(self, report):
+        """Print a walk-forward report."""
+        summary = report['summary']
+        print("\n" + "="*60)
+        print(f"WALK-FORWARD RESULTS ({self.model} model, {summary['folds']} folds)")
+        print("="*60)
+        print(report['folds'].to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+        print("\n" + "-"*60)
+        print(f"Out-of-sample Trades: {summary['total_trades']}")
+        print(f"Win Rate: {summary['win_rate']:.2f}%")
+        print(f"Total P&L: {summary['total_pnl']:.5f}")
+        print(f"Finished in {summary['seconds']:.1f}s")
+        print("="*60)
+
+
+def main():
+    """Walk forward over sample data from the command line."""
+    parser = argparse.ArgumentParser(description='Walk-forward backtest with per-fold retraining.')
+    parser.add_argument('--pair', default='EURUSD')
+    parser.add_argument('--bars', type=int, default=6000)
+    parser.add_argument('--model', choices=sorted(MODELS), default='basic')
+    parser.add_argument('--train', type=int, default=2000, help='bars per training window')
+    parser.add_argument('--test', type=int, default=500, help='bars per test window')
+    parser.add_argument('--anchored', action='store_true', help='expanding training windows')
+    parser.add_argument('--retrain-every', type=int, default=1, help='folds between retrains')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    
+    df = DataLoader().generate_sample_data(periods=args.bars, pair=args.pair)
+    engine = WalkForward(model=args.model, train_bars=args.train, test_bars=args.test, anchored=args.anchored,
+                         retrain_every=args.retrain_every, workers=args.workers)
+    engine.print_results(engine.run(df))
+
+
+if __name__ == "__main__":
+    main()